@@ -0,0 +1,88 @@
+import argparse
+import json
+import multiprocessing
+import resource
+import statistics
+import time
+from bs4 import BeautifulSoup
+from modules import parsing, page_cache, leiden, scimago, isc, times, shanghai
+from benchmarks import fixtures
+
+MODULES = {module.SYSTEM: module for module in (leiden, scimago, isc, times, shanghai)}
+
+def css_selector(spec):
+    """تبدیل مشخصات ظرف جدول به انتخابگر CSS برای روش قدیمی"""
+    selector = spec["tag"]
+    if "id" in spec:
+        selector += f"#{spec['id']}"
+    selector += "".join(f".{name}" for name in spec.get("classes", []))
+    if "attribute" in spec:
+        selector += f"[{spec['attribute']}]"
+    return selector
+
+def legacy_rows(html, spec):
+    """روش قبلی: ساخت درخت کامل BeautifulSoup و find_all روی ردیف‌ها و سلول‌ها"""
+    soup = BeautifulSoup(html, 'lxml')
+    return [[cell.text.strip() for cell in row.find_all('td')]
+            for container in soup.select(css_selector(spec)) for row in container.find_all('tr')]
+
+def targeted_rows(html, spec):
+    """روش جدید: پردازش جریانی lxml و استخراج فقط ظرف جدول هدف"""
+    return [[parsing.text(cell) for cell in cells] for _, cells in parsing.find_rows(html, spec)]
+
+APPROACHES = {"legacy": legacy_rows, "targeted": targeted_rows}
+
+def measure(args):
+    """اجرای یک روش روی یک صفحه در پردازش جداگانه؛ خروجی زمان‌ها و افزایش حداکثر RSS (KB)"""
+    approach, html, spec, repeats = args
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    timings = []
+    rows = 0
+    for _ in range(repeats):
+        start = time.perf_counter()
+        rows = len(APPROACHES[approach](html, spec))
+        timings.append(time.perf_counter() - start)
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return {"median_ms": statistics.median(timings) * 1000, "peak_kb": peak - baseline, "rows": rows}
+
+def load_pages(source):
+    """صفحات بنچمارک: صفحات ذخیره‌شده در cache یا صفحات نمونه ساختگی"""
+    pages = []
+    if source in ("cache", "auto"):
+        for ref, html in page_cache.iter_pages():
+            if ref["system"] in MODULES:
+                pages.append((ref["system"], f"{ref['system']} {ref['year']}", html))
+    if not pages and source in ("synthetic", "auto"):
+        for system, make_page in fixtures.PAGES.items():
+            pages.append((system, f"{system} (synthetic)", make_page()))
+    return pages
+
+def main():
+    parser = argparse.ArgumentParser(description="مقایسه زمان و حافظه پردازش جدول‌ها")
+    parser.add_argument("--source", choices=["auto", "cache", "synthetic"], default="auto")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--json", help="مسیر ذخیره نتایج به صورت JSON")
+    args = parser.parse_args()
+
+    results = []
+    # هر اندازه‌گیری در پردازش تازه اجرا می‌شود تا حداکثر RSS روش‌ها روی هم اثر نگذارد
+    context = multiprocessing.get_context("spawn")
+    for system, label, html in load_pages(args.source):
+        spec = MODULES[system].CONTAINER
+        row = {"page": label, "size_kb": len(html.encode('utf-8')) // 1024}
+        for approach in APPROACHES:
+            with context.Pool(1) as pool:
+                row[approach] = pool.apply(measure, ((approach, html, spec, args.repeats),))
+        results.append(row)
+        legacy, targeted = row["legacy"], row["targeted"]
+        print(f"{label:<28} {row['size_kb']:>6} KB  "
+              f"legacy {legacy['median_ms']:8.1f} ms {legacy['peak_kb']:>8} KB  "
+              f"targeted {targeted['median_ms']:8.1f} ms {targeted['peak_kb']:>8} KB  "
+              f"x{legacy['median_ms'] / max(targeted['median_ms'], 1e-6):.1f}  rows {targeted['rows']}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+if __name__ == "__main__":
+    main()
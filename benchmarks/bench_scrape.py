@@ -0,0 +1,207 @@
+import argparse
+import importlib
+import json
+import os
+import resource
+import shutil
+import sys
+import tempfile
+import time
+from dotenv import load_dotenv
+from benchmarks import fixture_server, fixtures
+
+# بارگذاری متغیرهای محیطی
+load_dotenv()
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_FILE = os.path.join(REPO_DIR, "data", "metrics", "bench_results.json")
+BASELINE_FILE = os.path.join(REPO_DIR, "data", "metrics", "bench_baseline.json")
+SYSTEMS = ["leiden", "scimago", "times", "shanghai", "isc"]
+# سال‌هایی که مرحله scrape_year برای هر منبع اجرا می‌کند
+SCRAPE_YEARS = {system: fixture_server.YEARS[-3:] for system in SYSTEMS}
+SCRAPE_YEARS["isc"] = list(fixture_server.ISC_YEARS)[-2:]
+# نشانی پایه هر منبع که به سرور نمونه محلی اشاره می‌کند
+BASE_URL_KEYS = {
+    "leiden": "LEIDEN_BASE_URL",
+    "scimago": "SCIMAGO_BASE_URL",
+    "times": "THE_BASE_URL",
+    "shanghai": "ARWU_BASE_URL",
+    "isc": "ISC_BASE_URL",
+}
+# اختلاف‌های کمتر از این مقدار (ثانیه یا MB) نوسان اندازه‌گیری حساب می‌شوند نه کندی
+MIN_DELTA = {"seconds": 0.05, "peak_rss_mb": 20}
+
+def chrome_available():
+    """وجود Chrome یا Chromium برای مراحلی که به مرورگر نیاز دارند"""
+    return any(shutil.which(name) for name in ("google-chrome", "google-chrome-stable", "chromium", "chromium-browser", "chrome"))
+
+def configure(base_url, workdir, browser):
+    """تنظیم متغیرهای محیطی پیش از import ماژول‌ها تا همه درخواست‌ها به سرور نمونه بروند"""
+    for key in BASE_URL_KEYS.values():
+        os.environ[key] = base_url
+    os.environ["FETCH_MODE"] = "browser" if browser else "auto"
+    # در حالت مرورگر صفحات Leiden در مرورگر بارگذاری می‌شوند، نه از داده کامل
+    os.environ["LEIDEN_BULK_URL"] = "" if browser else f"{base_url}/leiden_bulk.csv"
+    os.environ["LEIDEN_BULK_FILE"] = ""
+    os.environ["ARWU_FIXTURE"] = ""
+    os.environ["THE_FIXTURE"] = ""
+    os.environ["FROM_CACHE"] = "False"
+    os.environ["RATE_LIMIT"] = "False"
+    os.environ["RANKINGS_DB"] = os.path.join(workdir, "data", "rankings.sqlite")
+    os.environ["EVENTS"] = os.path.join(workdir, "events.jsonl")
+    os.chdir(workdir)
+
+def clear_caches(modules):
+    """پاک کردن cache صفحات، داده‌های کامل و سال‌های کشف‌شده برای اجرای سرد"""
+    from modules import leiden_bulk
+    shutil.rmtree("data/cache", ignore_errors=True)
+    for module in modules.values():
+        if hasattr(module, "_datasets"):
+            module._datasets.clear()
+    if leiden_bulk._connection is not None:
+        leiden_bulk._connection.close()
+        leiden_bulk._connection = None
+
+def read_events(path, offset):
+    """رویدادهای نوشته‌شده در فایل پس از offset"""
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        f.seek(offset)
+        return [json.loads(line) for line in f if line.strip()]
+
+def stage_breakdown(records):
+    """زمان دریافت، پردازش و تطبیق از رویدادهای fetched، parsed و matched هر (نظام، سال)"""
+    totals = {"fetch_seconds": 0.0, "parse_seconds": 0.0, "match_seconds": 0.0}
+    fetches = {}
+    last = {}
+    matched = found = 0
+    for record in records:
+        key = (record.get("system"), record.get("year"))
+        event = record["event"]
+        if event == "fetched":
+            fetches[record["source"]] = fetches.get(record["source"], 0) + 1
+            totals["fetch_seconds"] += record.get("seconds", 0)
+        elif event == "parsed" and key in last:
+            totals["parse_seconds"] += record["time"] - last[key]
+        elif event == "matched":
+            matched += 1
+            found += any(rank is not None for rank in record.get("ranks", {}).values())
+            if key in last:
+                totals["match_seconds"] += record["time"] - last[key]
+        last[key] = record["time"]
+    return {
+        **{name: round(value, 3) for name, value in totals.items()},
+        "fetches": fetches,
+        "matched_years": matched,
+        "found_years": found,
+        "browser_launches": sum(1 for record in records if record["event"] == "browser_launched"),
+    }
+
+def run_stage(events_file, tasks, func):
+    """اجرای یک مرحله و خلاصه زمان کل، توان عملیاتی و تفکیک مراحل آن"""
+    offset = os.path.getsize(events_file) if os.path.exists(events_file) else 0
+    start = time.perf_counter()
+    func()
+    seconds = time.perf_counter() - start
+    return {
+        "seconds": round(seconds, 3),
+        "tasks": tasks,
+        "tasks_per_second": round(tasks / seconds, 2) if seconds else None,
+        **stage_breakdown(read_events(events_file, offset)),
+    }
+
+def peak_rss_mb():
+    """حداکثر RSS پردازش اصلی و پردازش‌های فرزند (workerهای Pool و مرورگرها)"""
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                     resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss) / scale, 1)
+
+def bench_system(module, modules, events_file):
+    """مراحل scrape_year، get_rank سرد (بدون cache) و get_rank گرم (با cache) یک منبع"""
+    from modules import driver_pool
+    name = fixtures.TARGET_NAME
+    years = SCRAPE_YEARS[module.SYSTEM]
+    clear_caches(modules)
+    stages = {"scrape_year": run_stage(events_file, len(years), lambda: [module.scrape_year((name, year)) for year in years])}
+    driver_pool.shutdown_driver()
+    clear_caches(modules)
+    all_years = len(module.get_years())
+    stages["get_rank_cold"] = run_stage(events_file, all_years, lambda: module.get_rank(name))
+    stages["get_rank_warm"] = run_stage(events_file, all_years, lambda: module.get_rank(name))
+    return stages
+
+def compare(results, baseline, threshold):
+    """مقایسه با نتایج پایه؛ خروجی فهرست کندی‌هایی که از آستانه نسبی و حداقل اختلاف بیشترند"""
+    regressions = []
+    for system, stages in results["systems"].items():
+        for stage, values in stages.items():
+            previous = baseline.get("systems", {}).get(system, {}).get(stage)
+            if not previous:
+                continue
+            before, after = previous["seconds"], values["seconds"]
+            if after > before * (1 + threshold) and after - before > MIN_DELTA["seconds"]:
+                regressions.append(f"{system} {stage}: {before:.3f} s -> {after:.3f} s")
+    before, after = baseline.get("peak_rss_mb"), results["peak_rss_mb"]
+    if before and after > before * (1 + threshold) and after - before > MIN_DELTA["peak_rss_mb"]:
+        regressions.append(f"peak RSS: {before} MB -> {after} MB")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="بنچمارک سرتاسری scrape_year و get_rank روی سرور نمونه محلی")
+    parser.add_argument("--systems", nargs="+", choices=SYSTEMS, default=SYSTEMS)
+    parser.add_argument("--browser", action="store_true", help="دریافت همه منابع با مرورگر (FETCH_MODE=browser)")
+    parser.add_argument("--rows", type=int, default=2000, help="تعداد ردیف داده کامل هر سال در سرور نمونه")
+    parser.add_argument("--output", default=RESULTS_FILE, help="مسیر ذخیره نتایج")
+    parser.add_argument("--baseline", default=BASELINE_FILE, help="مسیر نتایج پایه برای مقایسه")
+    parser.add_argument("--save-baseline", action="store_true", help="ذخیره نتایج این اجرا به عنوان نتایج پایه")
+    parser.add_argument("--threshold", type=float, default=float(os.getenv('BENCH_REGRESSION_THRESHOLD', 0.25)),
+                        help="حداکثر کندی نسبی مجاز نسبت به نتایج پایه (0.25 یعنی ۲۵٪)")
+    args = parser.parse_args()
+    output, baseline_file = os.path.abspath(args.output), os.path.abspath(args.baseline)
+
+    server, base_url = fixture_server.start(rows=args.rows)
+    workdir = tempfile.mkdtemp(prefix="bench_scrape_")
+    configure(base_url, workdir, args.browser)
+    modules = {system: importlib.import_module(f"modules.{system}") for system in args.systems}
+    from modules import storage, driver_pool
+    events_file = os.environ["EVENTS"]
+
+    results = {"time": time.strftime('%Y-%m-%d %H:%M:%S'), "fetch_mode": os.environ["FETCH_MODE"], "rows": args.rows, "systems": {}}
+    has_chrome = chrome_available()
+    try:
+        for system, module in modules.items():
+            if (args.browser or not module.HTTP_FETCHABLE and system != "leiden") and not has_chrome:
+                print(f"{system:<10} رد شد: به مرورگر نیاز دارد و Chrome یافت نشد")
+                continue
+            results["systems"][system] = stages = bench_system(module, modules, events_file)
+            for stage, values in stages.items():
+                print(f"{system:<10} {stage:<14} {values['seconds']:7.2f} s  {values['tasks_per_second'] or 0:7.2f} tasks/s  "
+                      f"fetch {values['fetch_seconds']:6.2f}  parse {values['parse_seconds']:6.2f}  match {values['match_seconds']:6.2f}  "
+                      f"found {values['found_years']}/{values['matched_years']}  browsers {values['browser_launches']}  {values['fetches']}")
+    finally:
+        driver_pool.shutdown_driver()
+        server.shutdown()
+        os.chdir(REPO_DIR)
+        shutil.rmtree(workdir, ignore_errors=True)
+    results["peak_rss_mb"] = peak_rss_mb()
+    print(f"peak RSS {results['peak_rss_mb']} MB")
+
+    storage.write_json(output, results)
+    if args.save_baseline:
+        storage.write_json(baseline_file, results)
+        print(f"نتایج پایه در {baseline_file} ذخیره شد")
+        return
+    if not os.path.exists(baseline_file):
+        print("نتایج پایه یافت نشد؛ برای ساخت آن با --save-baseline اجرا کنید")
+        return
+    with open(baseline_file, 'r', encoding='utf-8') as f:
+        regressions = compare(results, json.load(f), args.threshold)
+    for regression in regressions:
+        print(f"کندی بیش از {args.threshold:.0%}: {regression}")
+    if regressions:
+        sys.exit(1)
+    print("کندی نسبت به نتایج پایه دیده نشد")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+import csv
+import io
+import json
+import os
+import re
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from benchmarks import fixtures
+
+# سال‌هایی که سرور نمونه منتشر می‌کند و گزینه‌های فهرست year_list فرم ISC
+YEARS = [str(year) for year in range(2019, 2025)]
+ISC_YEARS = {"1399-1400": "14", "1400-1401": "15", "1401-1402": "16"}
+THE_DATA_PATH = "/sites/default/files/the_data_rankings/world_university_rankings_{year}.json"
+# نمونه‌های ثبت‌شده در مخزن (همان فایل‌های اجرای آفلاین) پایه داده‌های کامل سرور هستند و با ردیف‌های ساختگی تا rows پر می‌شوند
+SAMPLE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "fixtures")
+LEIDEN_BULK_SAMPLE = os.path.join(SAMPLE_DIR, "leiden_bulk_sample.csv")
+THE_SAMPLE = os.path.join(SAMPLE_DIR, "the_sample.json")
+ARWU_SAMPLE = os.path.join(SAMPLE_DIR, "arwu_sample.json")
+
+def year_links(path):
+    """پیوند نسخه‌های همه سال‌ها (برای کشف سال‌ها)"""
+    return "<nav>" + "".join(f'<a href="{path.format(year=year)}">{year}</a>' for year in YEARS) + "</nav>"
+
+def index_page(path):
+    """صفحه فهرست نسخه‌ها"""
+    return f"<html><body>{year_links(path)}</body></html>"
+
+def read_sample(path):
+    """محتوای یک فایل نمونه ثبت‌شده"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f) if path.endswith(".json") else list(csv.DictReader(f))
+
+def filler_names(count):
+    """نام ردیف‌های ساختگی بدون دانشگاه هدف برای رساندن نمونه به rows ردیف"""
+    return fixtures.names(max(0, count), -1, fixtures.TARGET_NAME)
+
+def leiden_bulk_csv(rows):
+    """داده کامل CWTS: ردیف‌های نمونه ثبت‌شده هر دوره (پایان دوره = سال نسخه - ۲) به همراه ردیف‌های ساختگی
+
+    سالی که دوره‌اش در نمونه نیست ردیف‌های نزدیک‌ترین دوره نمونه را با دوره خودش می‌گیرد.
+    """
+    sample = read_sample(LEIDEN_BULK_SAMPLE)
+    periods = {}
+    for record in sample:
+        periods.setdefault(record["Period"], []).append(record)
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=list(sample[0]))
+    writer.writeheader()
+    for year in YEARS:
+        end = int(year) - 2
+        period = f"{end - 3}–{end}"
+        nearest = min(periods, key=lambda p: abs(int(p[-4:]) - end))
+        records = [{**record, "Period": period} for record in periods.get(period, periods[nearest])]
+        writer.writerows(records)
+        for i, name in enumerate(filler_names(rows - len(records))):
+            writer.writerow({**records[0], "Field": "All sciences", "Frac_counting": "1", "University": name, "Country": "Iran",
+                             "impact_P": 1000 + i, "PP_top10": f"{0.05 - i / (rows * 100):.4f}"})
+    return out.getvalue()
+
+def scimago_export(rows):
+    """خروجی CSV جدول SCImago (جداکننده ;)"""
+    out = io.StringIO()
+    writer = csv.writer(out, delimiter=";")
+    writer.writerow(["Rank", "Global Rank", "Institution", "Country", "Sector"])
+    for i, name in enumerate(fixtures.names(rows, 5, fixtures.TARGET_NAME)):
+        writer.writerow([i + 1, 1000 + i * 10, name, "IRN", "Higher educ."])
+    return out.getvalue()
+
+def scimago_index():
+    """صفحه rankings.php بدون سال با فهرست کشویی سال داده (سال نسخه - ۵)"""
+    options = "".join(f'<option value="{int(year) - 5}">{int(year) - 5}</option>' for year in YEARS)
+    return f'<html><body><select name="year">{options}</select></body></html>'
+
+def the_json(rows):
+    """داده JSON جدول THE: نمونه ثبت‌شده به همراه ردیف‌های ساختگی پس از آن"""
+    data = read_sample(THE_SAMPLE)["data"]
+    return json.dumps({"data": data + [
+        {"rank": str(len(data) + i + 1), "name": name, "location": "Iran"}
+        for i, name in enumerate(filler_names(rows - len(data)))
+    ]})
+
+def the_page(year):
+    """صفحه رتبه‌بندی THE که آدرس داده JSON و جدول را دارد"""
+    page = fixtures.times_page(filler_kb=50)
+    return page.replace("<body>", f'<body><script>var data = "{THE_DATA_PATH.format(year=year)}";</script>', 1)
+
+def arwu_json(rows):
+    """پاسخ API ARWU: نمونه ثبت‌شده به همراه ردیف‌های ساختگی پس از آن"""
+    sample = read_sample(ARWU_SAMPLE)
+    rankings = sample["data"]["rankings"]
+    return json.dumps({**sample, "data": {"rankings": rankings + [
+        {"ranking": str(len(rankings) + i + 1), "univNameEn": name, "region": "Iran"}
+        for i, name in enumerate(filler_names(rows - len(rankings)))
+    ]}})
+
+def arwu_page():
+    """صفحه ARWU با کادر جستجو، جدول نتایج و پیوند نسخه‌ها"""
+    page = fixtures.shanghai_page(filler_kb=50)
+    return page.replace("<body>", f'<body><input class="search-input">{year_links("/rankings/arwu/{year}")}', 1)
+
+def isc_form():
+    """فرم RankIranUniv با فهرست نوع دانشگاه و سال، کادر جستجو و جدول نتایج"""
+    years = "".join(f'<option value="{value}">{year}</option>' for year, value in ISC_YEARS.items())
+    controls = (
+        '<select id="univ_type_list"><option value="1">1</option><option value="2">2</option></select>'
+        f'<select id="year_list">{years}</select><input id="filter">'
+    )
+    return fixtures.isc_page(filler_kb=50).replace("<body>", f"<body>{controls}", 1)
+
+def build_routes(rows):
+    """پاسخ‌های از پیش ساخته‌شده سرور (مسیر، پارامترها) -> (نوع محتوا، بدنه)"""
+    html = "text/html; charset=utf-8"
+    leiden_page = fixtures.leiden_page(rows=rows, filler_kb=100)
+    scimago_page = fixtures.scimago_page(filler_kb=100)
+    the_data = the_json(rows)
+    arwu_data = arwu_json(rows)
+    the_data_paths = {THE_DATA_PATH.format(year=year) for year in YEARS}
+
+    def route(path, query):
+        if path == "/ranking":
+            return html, index_page("/ranking/{year}")
+        if re.fullmatch(r"/ranking/\d{4}", path):
+            return html, leiden_page
+        if path == "/leiden_bulk.csv":
+            return "text/csv", leiden_bulk_csv(rows)
+        if path == "/rankings.php":
+            if query.get("out") == ["xls"]:
+                return "text/csv", scimago_export(rows)
+            return html, scimago_page if "year" in query else scimago_index()
+        if path == "/world-university-rankings/latest/world-ranking":
+            return html, index_page("/world-university-rankings/{year}/world-ranking")
+        match = re.fullmatch(r"/world-university-rankings/(\d{4})/world-ranking", path)
+        if match:
+            return html, the_page(match.group(1))
+        if path in the_data_paths:
+            return "application/json", the_data
+        if path == "/api/pub/v1/arwu/rank":
+            return "application/json", arwu_data
+        if re.fullmatch(r"/rankings/arwu/\d{4}", path):
+            return html, arwu_page()
+        if path == "/Home/RankIranUniv":
+            return html, isc_form()
+        return None
+
+    return route
+
+def start(rows=2000, port=0):
+    """اجرای سرور نمونه در thread پس‌زمینه؛ خروجی (سرور، نشانی پایه)"""
+    route = build_routes(rows)
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            parsed = urlparse(self.path)
+            found = route(parsed.path, parse_qs(parsed.query))
+            if found is None:
+                self.send_error(404)
+                return
+            content_type, body = found
+            data = body.encode('utf-8')
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
@@ -0,0 +1,77 @@
+import random
+
+# نام دانشگاهی که در صفحات نمونه جاسازی می‌شود
+TARGET_NAME = "Ferdowsi University of Mashhad"
+TARGET_PERSIAN_NAME = "دانشگاه فردوسی مشهد"
+
+def _filler(size_kb):
+    """اسکریپت و استایل حجیم برای شبیه‌سازی صفحات واقعی"""
+    script = "var x = " + "[" + ",".join(str(i) for i in range(size_kb * 40)) + "];"
+    style = ".c{color:#000}" * (size_kb * 20)
+    return f"<head><style>{style}</style><script>{script}</script></head>"
+
+def names(rows, target_index, target_name):
+    """نام ردیف‌ها با یک دانشگاه هدف در جایگاه مشخص"""
+    return [target_name if i == target_index else f"University {i} of Somewhere" for i in range(rows)]
+
+def leiden_page(rows=1500, target_rank=487, filler_kb=400):
+    """صفحه نمونه Leiden با جدول pagedtable ranking"""
+    body = []
+    for i, name in enumerate(names(rows, target_rank - 1, TARGET_NAME)):
+        body.append(
+            f'<tr><td class="rank">{i + 1}</td>'
+            f'<td class="university"><span data-tooltip="{name}">{name}</span></td>'
+            f'<td class="country">IR</td><td>{random.randint(1000, 9000)}</td><td>{random.uniform(1, 30):.1f}%</td></tr>'
+        )
+    return (f"<html>{_filler(filler_kb)}<body><div class='nav'>menu</div>"
+            f"<table class=\"pagedtable ranking\"><tbody>{''.join(body)}</tbody></table></body></html>")
+
+def scimago_page(rows=80, target_rank=2395, filler_kb=400):
+    """صفحه نمونه SCImago با div#tablewrapper"""
+    body = []
+    for i, name in enumerate(names(rows, 5, TARGET_NAME)):
+        global_rank = target_rank if i == 5 else 1000 + i * 10
+        body.append(
+            f'<tr><td>{i + 1}</td><td class="ranknumber">{i + 1} <span class="global_ranking">({global_rank})</span></td>'
+            f'<td>{name}</td><td>IRN</td></tr>'
+        )
+    return (f"<html>{_filler(filler_kb)}<body><div id=\"tablewrapper\"><table>"
+            f"{''.join(body)}</table></div></body></html>")
+
+def times_page(rows=80, target_rank="801–1000", filler_kb=400):
+    """صفحه نمونه THE با table#datatable-1"""
+    body = []
+    for i, name in enumerate(names(rows, 10, TARGET_NAME)):
+        rank = target_rank if i == 10 else f"{i + 1}"
+        body.append(f'<tr><td class="rank sorting_1">{rank}</td><td class="name">{name} Iran</td></tr>')
+    return (f"<html>{_filler(filler_kb)}<body><table id=\"datatable-1\"><tbody>"
+            f"{''.join(body)}</tbody></table></body></html>")
+
+def shanghai_page(rows=30, target_rank="801-900", filler_kb=400):
+    """صفحه نمونه ARWU با tbody[data-v-ae1ab4a8]"""
+    body = []
+    for i, name in enumerate(names(rows, 3, TARGET_NAME)):
+        rank = target_rank if i == 3 else f"{i + 1}"
+        body.append(
+            f'<tr data-v-ae1ab4a8=""><td data-v-ae1ab4a8=""><div class="ranking">{rank}</div></td>'
+            f'<td data-v-ae1ab4a8=""><span class="univ-name">{name}</span></td></tr>'
+        )
+    return (f"<html>{_filler(filler_kb)}<body><table><tbody data-v-ae1ab4a8=\"\">"
+            f"{''.join(body)}</tbody></table></body></html>")
+
+def isc_page(rows=20, target_rank="3", filler_kb=400):
+    """صفحه نمونه ISC با جدول رتبه دانشگاه‌های جامع"""
+    body = []
+    for i, name in enumerate(names(rows, 2, TARGET_PERSIAN_NAME)):
+        rank = target_rank if i == 2 else f"{i + 1}"
+        body.append(f'<tr><td><span class="FractionTop">{rank}</span></td><td>{i + 1}</td><td>{name}</td></tr>')
+    return (f"<html>{_filler(filler_kb)}<body><table>"
+            f"{''.join(body)}</table></body></html>")
+
+PAGES = {
+    "leiden": leiden_page,
+    "scimago": scimago_page,
+    "times": times_page,
+    "shanghai": shanghai_page,
+    "isc": isc_page,
+}
@@ -0,0 +1,34 @@
+import argparse
+import json
+from modules import metrics
+
+def fmt(value, pattern):
+    """قالب‌بندی مقدار اختیاری برای جدول گزارش"""
+    return pattern.format(value) if value is not None else "-"
+
+def main():
+    parser = argparse.ArgumentParser(description="مقایسه زمان دریافت صفحات با HTTP و با مرورگر (با و بدون حذف منابع غیرضروری)")
+    parser.add_argument("--file", default=metrics.PAGE_LOADS_FILE, help="مسیر فایل JSONL زمان‌بندی صفحات")
+    parser.add_argument("--json", help="مسیر ذخیره خلاصه به صورت JSON")
+    args = parser.parse_args()
+
+    summary = metrics.summarize_page_loads(metrics.load_records(args.file))
+    if not summary:
+        print(f"رکوردی در {args.file} یافت نشد؛ یک بار با BLOCK_RESOURCES=False و یک بار با True اجرا کنید")
+    for system, modes in summary.items():
+        for mode, values in modes.items():
+            print(f"{system:<10} {mode:<8} n={values['samples']:<4} "
+                  f"fetch {fmt(values['fetch_seconds'], '{:7.2f}')} s  "
+                  f"load {fmt(values['load_ms'], '{:8.0f}')} ms  "
+                  f"bytes {fmt(values['bytes'], '{:>10.0f}')}")
+        baseline = modes.get("full", {}).get("fetch_seconds")
+        for mode in ("blocked", "http"):
+            if baseline and modes.get(mode, {}).get("fetch_seconds"):
+                print(f"{system:<10} {mode} speedup x{baseline / modes[mode]['fetch_seconds']:.2f}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, indent=2, ensure_ascii=False)
+
+if __name__ == "__main__":
+    main()
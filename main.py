@@ -1,8 +1,9 @@
-import json
+import argparse
 import logging
 import os
+import sys
 from dotenv import load_dotenv
-from modules import leiden, scimago, times, shanghai, isc
+from modules import scheduler, planner, universities, async_engine, browser_contexts, storage
 
 # بارگذاری متغیرهای محیطی
 load_dotenv()
@@ -17,48 +18,96 @@ logging.basicConfig(
 
 UNIVERSITY_NAME = "Ferdowsi University of Mashhad"
 JSON_FILE = "data/university_rankings.json"
+BATCH_JSON_FILE = "data/batch_rankings.json"
 
-def load_previous_rankings():
-    """خواندن رتبه‌های قبلی از فایل JSON"""
-    if os.path.exists(JSON_FILE):
-        try:
-            with open(JSON_FILE, 'r', encoding='utf-8') as f:
-                return json.load(f).get("rankings", {})
-        except Exception as e:
-            logging.error(f"خطا در خواندن فایل JSON: {str(e)}")
-            return {}
-    return {}
+def load_previous_rankings(university_names):
+    """خواندن آخرین رتبه‌های ذخیره‌شده دانشگاه‌ها از جدول رتبه‌ها (یک بار در هر اجرا)"""
+    try:
+        return storage.load_rankings(university_names)
+    except Exception as e:
+        logging.error(f"خطا در خواندن جدول رتبه‌ها: {str(e)}")
+        return {}
+
+def export_rankings(rankings, university_names):
+    """خروجی JSON از جدول رتبه‌ها پس از پایان اجرا؛ سال‌هایی از وظایف که رتبه‌ای در جدول ندارند null می‌مانند
+
+    رتبه null ذخیره‌شده (خارج شدن از رتبه‌بندی) جایگزین رتبه قدیمی می‌شود، چون خروجی فقط نمایی از جدول است.
+    """
+    stored = storage.load_rankings(university_names)
+    results = []
+    for name in university_names:
+        systems = {system: dict(years) for system, years in rankings[name].items()}
+        for system, years in stored.get(name, {}).items():
+            systems.setdefault(system, {}).update(years)
+        # سال‌ها به ترتیب سال مرتب می‌شوند
+        results.append({"university": name, "rankings": {system: dict(sorted(years.items())) for system, years in systems.items()}})
+    return results
+
+def parse_args():
+    """خواندن گزینه‌های خط فرمان"""
+    parser = argparse.ArgumentParser(description="استخراج رتبه‌های دانشگاه از نظام‌های رتبه‌بندی")
+    parser.add_argument("--incremental", action="store_true",
+                        help="سال‌های نهایی‌شده از داده ذخیره‌شده خوانده شوند و فقط سال‌های ناقص یا جاری استخراج شوند")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="فقط برنامه اجرا و هزینه تخمینی وظایف چاپ شود")
+    parser.add_argument("--from-cache", action="store_true",
+                        help="فقط صفحات ذخیره‌شده در cache پردازش شوند و هیچ مرورگری اجرا نشود")
+    parser.add_argument("--batch", action="store_true",
+                        help="همه دانشگاه‌های فایل data/universities.json با یک بار بارگذاری هر صفحه استخراج شوند")
+    parser.add_argument("--engine", choices=["pool", "async", "contexts"], default=None,
+                        help="موتور اجرا: pool (یک مرورگر برای هر پردازش)، async (دریافت‌های HTTP هم‌زمان در یک حلقه رویداد) یا contexts (یک مرورگر با چند زمینه مستقل)؛ پیش‌فرض ENGINE در .env")
+    parser.add_argument("--resume", action="store_true",
+                        help="ادامه آخرین اجرای ناتمام: فقط وظایفی که نقطه بازیابی ندارند دوباره اجرا شوند")
+    parser.add_argument("--events", metavar="PATH", default=None,
+                        help="جریان رویدادهای وظایف (started، fetched، parsed، matched، completed، failed) به صورت JSON Lines در فایل PATH یا با '-' در stdout")
+    return parser.parse_args()
 
 def main():
+    args = parse_args()
+    if args.from_cache:
+        # متغیر محیطی به workerهای Pool هم به ارث می‌رسد
+        os.environ['FROM_CACHE'] = 'True'
+    if args.events:
+        os.environ['EVENTS'] = args.events
     try:
         # خواندن رتبه‌های قبلی
-        previous_ranks = load_previous_rankings()
+        university_names = universities.get_names() if args.batch else [UNIVERSITY_NAME]
+        previous_ranks = load_previous_rankings(university_names)
+
+        # برنامه‌ریزی وظایف با توجه به سیاست تازگی هر نظام
+        tasks, skipped = planner.plan_tasks(university_names, previous_ranks, incremental=args.incremental)
+
+        # هر وظیفه تکمیل‌شده در جدول رتبه‌ها نقطه بازیابی دارد؛ با --resume فقط وظایف ناتمام اجرا می‌شوند
+        run_id = storage.unfinished_run() if args.resume else None
+        if run_id is not None:
+            tasks = scheduler.remove_completed(tasks, storage.completed_tasks(run_id))
+        elif args.resume:
+            logging.warning("اجرای ناتمامی برای ادامه یافت نشد؛ اجرای تازه شروع می‌شود")
+        if args.dry_run:
+            # با رویدادها در stdout، برنامه در stderr چاپ می‌شود تا جریان JSON Lines خالص بماند
+            planner.print_plan(tasks, skipped, sys.stderr if args.events == '-' else None)
+            return
+        storage.start_run(run_id)
 
-        # جمع‌آوری رتبه‌ها از هر نظام
-        result = {
-            "university": UNIVERSITY_NAME,
-            "rankings": {
-                "leiden": leiden.get_rank(UNIVERSITY_NAME),
-                "scimago": scimago.get_rank(UNIVERSITY_NAME),
-                "isc": isc.get_rank(UNIVERSITY_NAME),
-                "times": times.get_rank(UNIVERSITY_NAME),
-                "shanghai": shanghai.get_rank(UNIVERSITY_NAME)
-            }
-        }
+        # جمع‌آوری رتبه‌ها از همه نظام‌ها با یک زمان‌بند مشترک
+        engine = args.engine or os.getenv('ENGINE', 'pool')
+        if engine == "async":
+            rankings = async_engine.run(university_names, tasks=tasks)
+        elif engine == "contexts":
+            rankings = browser_contexts.run(university_names, tasks=tasks)
+        else:
+            rankings = scheduler.run(university_names, tasks=tasks)
+        results = export_rankings(rankings, university_names)
 
-        # ادغام با رتبه‌های قبلی
-        for system in result["rankings"]:
-            if system in previous_ranks:
-                for year, rank in previous_ranks[system].items():
-                    if year not in result["rankings"][system] or result["rankings"][system][year] is None:
-                        result["rankings"][system][year] = rank
+        # خروجی JSON نمایی از جدول رتبه‌هاست و با جایگزینی اتمی نوشته می‌شود
+        output_file = BATCH_JSON_FILE if args.batch else JSON_FILE
+        output = {"universities": results} if args.batch else results[0]
+        storage.write_json(output_file, output)
+        storage.finish_run()
 
-        # ذخیره خروجی
-        os.makedirs(os.path.dirname(JSON_FILE), exist_ok=True)
-        with open(JSON_FILE, "w", encoding='utf-8') as f:
-            json.dump(result, f, indent=2, ensure_ascii=False)
-        
-        print(result)
+        # با رویدادها در stdout، خروجی فقط در فایل نوشته می‌شود تا جریان JSON Lines خالص بماند
+        if args.events != '-':
+            print(output)
 
     except Exception as e:
         logging.error(f"خطا در اجرای اصلی: {str(e)}")
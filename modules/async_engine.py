@@ -0,0 +1,142 @@
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dotenv import load_dotenv
+from modules import scheduler, driver_pool, page_cache, http_client, metrics, retry, events, storage
+
+# بارگذاری متغیرهای محیطی
+load_dotenv()
+
+# تعداد پردازش‌های پردازش HTML (کار وابسته به CPU)
+PARSE_PROCESSES = int(os.getenv('PARSE_PROCESSES', 2))
+
+def parse_task(args):
+    """پردازش پاسخ HTTP و استخراج رتبه‌ها در پردازش جداگانه؛ خروجی (صفحه فشرده، رتبه‌ها، شاخص‌های اضافه) یا (None، None، None)"""
+    system, year, raw, universities = args
+    module = scheduler.SYSTEMS[system]
+    storage.take_indicators()
+    page = module.parse_http(raw, year)
+    if page is None:
+        return None, None, None
+    return page, module.parse_page(page, universities, year), storage.take_indicators()
+
+def cached_ranks(task):
+    """رتبه‌ها و شاخص‌های اضافه وظیفه از صفحه ذخیره‌شده در cache؛ در نبود صفحه (None، None)"""
+    module = scheduler.SYSTEMS[task["system"]]
+    url, state = module.http_key(task["year"])
+    html = page_cache.get(task["system"], task["year"], url, state)
+    if html is None:
+        return None, None
+    storage.take_indicators()
+    return module.parse_page(html, task["universities"], task["year"]), storage.take_indicators()
+
+async def run_http_task(task, client, semaphore, parse_pool, breakers):
+    """دریافت ناهمگام یک وظیفه با HTTP و پردازش آن در pool؛ در صورت شکست None (برای اجرا با مرورگر)
+
+    نتیجه دریافت HTTP با دسته خطای آن در مدار میزبان ثبت می‌شود تا میزبانی که با HTTP پیاپی شکست می‌خورد مدارش باز شود.
+    """
+    loop = asyncio.get_running_loop()
+    module = scheduler.SYSTEMS[task["system"]]
+    start_time = time.time()
+    try:
+        ranks, indicators = await loop.run_in_executor(None, cached_ranks, task)
+    except Exception as e:
+        logging.warning(f"پردازش صفحه ذخیره‌شده {task['system']} سال {task['year']} ناموفق بود: {str(e)}")
+        ranks = None
+    if ranks is None:
+        if page_cache.from_cache_only():
+            return None
+        try:
+            async with semaphore:
+                fetch_start = time.time()
+                raw = await module.fetch_http_async(client, task["year"])
+            if raw is None:
+                return None
+            metrics.record_http_fetch(task["system"], task["year"], time.time() - fetch_start, len(raw))
+        except Exception as e:
+            category = retry.classify(e)
+            retry.record_result(breakers, module.HOST, category)
+            logging.warning(f"خطای {category} در دریافت HTTP {task['system']} سال {task['year']}؛ از مرورگر استفاده می‌شود: {str(e)}")
+            return None
+        retry.record_result(breakers, module.HOST, None)
+        try:
+            page, ranks, indicators = await loop.run_in_executor(
+                parse_pool, parse_task, (task["system"], task["year"], raw, task["universities"])
+            )
+        except Exception as e:
+            # خطای پردازش یا از کار افتادن pool فقط همین وظیفه را به مرورگر می‌فرستد، نه کل اجرا را متوقف کند
+            logging.warning(f"پردازش پاسخ HTTP {task['system']} سال {task['year']} ناموفق بود و از مرورگر استفاده می‌شود: {str(e)}")
+            return None
+        if page is None:
+            return None
+        url, state = module.http_key(task["year"])
+        # نوشتن cache قفل فایل شمارنده حجم را می‌گیرد و نباید حلقه رویداد را مسدود کند
+        await loop.run_in_executor(None, page_cache.put, task["system"], task["year"], url, page, state)
+    return {**task, "ranks": {task["year"]: ranks}, "indicators": indicators, "error": None, "category": None,
+            "duration": time.time() - start_time}
+
+async def run_browser_task(task, semaphore, browser_pool, breakers):
+    """اجرای یک وظیفه مرورگری در pool مرورگرها با رعایت سقف هم‌زمانی میزبان؛ با مدار باز میزبان بدون اجرا رد می‌شود"""
+    loop = asyncio.get_running_loop()
+    async with semaphore:
+        if retry.circuit_open(breakers, scheduler.SYSTEMS[task["system"]].HOST):
+            return scheduler.circuit_outcome(task)
+        try:
+            outcome = await loop.run_in_executor(browser_pool, scheduler.run_task, task)
+        except Exception as e:
+            outcome = {**task, "ranks": {}, "error": str(e), "category": retry.classify(e), "duration": 0.0}
+        scheduler.record_circuit(breakers, outcome)
+        return outcome
+
+async def run_task(task, client, semaphores, parse_pool, browser_pool, breakers):
+    """اجرای یک وظیفه: ابتدا HTTP ناهمگام (در صورت امکان) و در غیر این صورت مرورگر"""
+    module = scheduler.SYSTEMS[task["system"]]
+    events.emit("started", system=task["system"], year=task["year"], universities=len(task["universities"]))
+    if retry.circuit_open(breakers, module.HOST):
+        return scheduler.circuit_outcome(task)
+    if "years" not in task and module.HTTP_FETCHABLE and http_client.http_enabled():
+        outcome = await run_http_task(task, client, semaphores[module.HOST], parse_pool, breakers)
+        if outcome is not None:
+            return outcome
+    return await run_browser_task(task, semaphores[module.HOST], browser_pool, breakers)
+
+async def run_async(universities, systems=None, tasks=None):
+    """اجرای هم‌زمان همه وظایف در یک حلقه رویداد با semaphore هر میزبان"""
+    durations = scheduler.load_durations()
+    if tasks is None:
+        tasks = scheduler.build_tasks(universities, systems)
+    tasks = scheduler.group_sessions(tasks)
+    tasks = sorted(tasks, key=lambda t: scheduler.task_duration(durations, t), reverse=True)
+    rankings = scheduler.empty_rankings(universities, systems, tasks)
+    semaphores = {
+        module.HOST: asyncio.Semaphore(scheduler.host_limit(module.HOST))
+        for module in scheduler.SYSTEMS.values()
+    }
+    breakers = {}
+    start_time = time.time()
+
+    # فقط وظایف مرورگری پردازش جداگانه و مرورگر دارند؛ دریافت‌های HTTP همه در همین پردازش انجام می‌شوند
+    with ProcessPoolExecutor(max_workers=int(os.getenv('NUM_PROCESSES', 3)), initializer=driver_pool.init_worker) as browser_pool, \
+            ProcessPoolExecutor(max_workers=PARSE_PROCESSES) as parse_pool:
+        async with http_client.async_client() as client:
+            pending = {asyncio.create_task(run_task(task, client, semaphores, parse_pool, browser_pool, breakers)) for task in tasks}
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    # سال‌های بی‌نتیجه وظیفه جلسه‌ای به صورت وظایف جداگانه و موازی اجرا می‌شوند
+                    outcome, retries = scheduler.split_session(future.result())
+                    scheduler.record_outcome(outcome, durations, rankings)
+                    pending |= {asyncio.create_task(run_task(task, client, semaphores, parse_pool, browser_pool, breakers)) for task in retries}
+
+    try:
+        scheduler.save_durations(durations)
+    except Exception as e:
+        logging.error(f"خطا در ذخیره مدت وظایف: {str(e)}")
+    logging.info(f"اجرای ناهمگام {len(tasks)} وظیفه برای {len(universities)} دانشگاه تکمیل شد. زمان اجرا: {time.time() - start_time:.2f} ثانیه")
+    return rankings
+
+def run(universities, systems=None, tasks=None):
+    """نقطه ورود همگام موتور asyncio با همان خروجی scheduler.run"""
+    return asyncio.run(run_async(universities, systems, tasks))
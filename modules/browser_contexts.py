@@ -0,0 +1,125 @@
+import logging
+import os
+import socket
+import threading
+from multiprocessing.pool import ThreadPool
+from dotenv import load_dotenv
+from modules import scheduler, driver_pool, readiness
+
+# بارگذاری متغیرهای محیطی
+load_dotenv()
+
+# تعداد زمینه‌های هم‌زمان (تب‌های مستقل) در تنها مرورگر این پردازش
+BROWSER_CONTEXTS = int(os.getenv('BROWSER_CONTEXTS', 6))
+
+# مرورگر مشترک، sessionهای متصل به آن و نسل مرورگر (پس از بازسازی، sessionهای قدیمی دوباره متصل می‌شوند)
+_lock = threading.Lock()
+_browser = None
+_address = None
+_generation = 0
+_sessions = []
+_local = threading.local()
+
+def free_port():
+    """یک درگاه آزاد محلی برای remote debugging"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def ensure_browser():
+    """اجرای تنها مرورگر این پردازش یا بازسازی آن در صورت خرابی؛ خروجی (آدرس، نسل)"""
+    global _browser, _address, _generation
+    with _lock:
+        if _browser is not None and not driver_pool.is_healthy(_browser):
+            logging.warning("مرورگر مشترک پاسخ نمی‌دهد و بازسازی می‌شود")
+            close_sessions()
+            try:
+                _browser.quit()
+            except Exception as e:
+                logging.error(f"خطا در بستن مرورگر مشترک: {str(e)}")
+            _browser = None
+        if _browser is None:
+            port = free_port()
+            _browser = driver_pool.setup_driver(debugging_port=port)
+            _address = f"127.0.0.1:{port}"
+            _generation += 1
+        return _address, _generation
+
+def close_sessions():
+    """بستن sessionهای متصل (خود مرورگر مشترک بسته نمی‌شود)"""
+    while _sessions:
+        session = _sessions.pop()
+        try:
+            session.quit()
+        except Exception as e:
+            logging.debug(f"خطا در بستن session متصل: {str(e)}")
+
+def thread_session():
+    """session اختصاصی این thread که به مرورگر مشترک متصل است"""
+    address, generation = ensure_browser()
+    if getattr(_local, "generation", None) != generation:
+        session = driver_pool.attach_driver(address)
+        with _lock:
+            _sessions.append(session)
+        _local.session = session
+        _local.generation = generation
+    return _local.session
+
+def open_context(session):
+    """ساخت زمینه مستقل (کوکی و storage جدا) با یک تب و رفتن session به آن تب"""
+    context_id = session.execute_cdp_cmd("Target.createBrowserContext", {"disposeOnDetach": True})["browserContextId"]
+    target_id = session.execute_cdp_cmd("Target.createTarget", {"url": "about:blank", "browserContextId": context_id})["targetId"]
+    # در chromedriver شناسه پنجره همان targetId است
+    session.switch_to.window(target_id)
+    readiness.install(session)
+    return context_id, target_id
+
+def close_context(session, context_id, target_id):
+    """بستن تب و حذف زمینه به همراه کوکی‌ها و storage آن"""
+    try:
+        session.execute_cdp_cmd("Target.closeTarget", {"targetId": target_id})
+        session.execute_cdp_cmd("Target.disposeBrowserContext", {"browserContextId": context_id})
+    except Exception as e:
+        logging.warning(f"بستن زمینه مرورگر ناموفق بود: {str(e)}")
+
+def run_task(task):
+    """اجرای یک وظیفه؛ هر بار که وظیفه مرورگر بخواهد زمینه تازه‌ای از مرورگر مشترک ساخته می‌شود
+
+    وظایفی که از cache یا HTTP پاسخ می‌گیرند هیچ زمینه‌ای نمی‌سازند.
+    """
+    opened = []
+
+    def provider():
+        session = thread_session()
+        opened.append((session, *open_context(session)))
+        return session
+
+    driver_pool.use_provider(provider)
+    try:
+        return scheduler.run_task(task)
+    finally:
+        driver_pool.use_provider(None)
+        for session, context_id, target_id in opened:
+            close_context(session, context_id, target_id)
+
+def shutdown():
+    """بستن sessionها و مرورگر مشترک"""
+    global _browser
+    with _lock:
+        close_sessions()
+        if _browser is not None:
+            try:
+                _browser.quit()
+            except Exception as e:
+                logging.error(f"خطا در بستن مرورگر مشترک: {str(e)}")
+        _browser = None
+
+def run(universities, systems=None, tasks=None):
+    """اجرای وظایف با یک مرورگر و BROWSER_CONTEXTS زمینه هم‌زمان به جای یک مرورگر برای هر پردازش"""
+    pool = ThreadPool(processes=BROWSER_CONTEXTS)
+    try:
+        return scheduler.run(universities, systems, tasks, pool=pool, workers=BROWSER_CONTEXTS, runner=run_task)
+    finally:
+        pool.close()
+        pool.join()
+        shutdown()
@@ -0,0 +1,169 @@
+import logging
+import os
+import threading
+from functools import partial
+from multiprocessing import Pool, util
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.chrome.service import Service
+from webdriver_manager.chrome import ChromeDriverManager
+from dotenv import load_dotenv
+from modules import resource_policy, readiness, events
+
+# بارگذاری متغیرهای محیطی
+load_dotenv()
+
+# تعداد صفحاتی که یک مرورگر پیش از بازسازی باز می‌کند
+MAX_PAGES_PER_DRIVER = int(os.getenv('DRIVER_MAX_PAGES', 50))
+
+# وضعیت مرورگر هر پردازش (هر worker یک مرورگر دارد)
+_driver = None
+_pages_served = 0
+_finalizer_registered = False
+# تأمین‌کننده مرورگر هر thread در پشتیبان چندزمینه‌ای (یک تب در زمینه مستقل داخل مرورگر مشترک)
+_local = threading.local()
+
+def setup_driver(debugging_port=None):
+    """تنظیم WebDriver با سرکوب کامل لاگ‌ها (با debugging_port، sessionهای دیگر هم می‌توانند به همین مرورگر متصل شوند)"""
+    chrome_options = Options()
+    chrome_options.add_argument("--headless=new")  # استفاده از headless جدید
+    if debugging_port is not None:
+        chrome_options.add_argument(f"--remote-debugging-port={debugging_port}")
+    chrome_options.add_argument("--disable-gpu")
+    chrome_options.add_argument("--disable-extensions")
+    chrome_options.add_argument("--disable-notifications")
+    chrome_options.add_argument("--no-sandbox")
+    chrome_options.add_argument("--disable-dev-shm-usage")
+    chrome_options.add_argument("--ignore-certificate-errors")
+    chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/91.0.4472.124")
+    chrome_options.add_argument("--log-level=3")
+    chrome_options.add_argument("--mute-audio")
+    chrome_options.add_argument("--disable-features=VoiceTranscription,MediaSession,MediaSessionService")
+    chrome_options.add_argument("--disable-logging")  # غیرفعال کردن لاگ‌های اضافی
+    chrome_options.add_argument("--disable-background-timer-throttling")
+    chrome_options.add_argument("--disable-backgrounding-occluded-windows")
+    chrome_options.add_argument("--disable-renderer-backgrounding")
+    chrome_options.add_experimental_option('excludeSwitches', ['enable-logging', 'enable-automation'])
+    chrome_options.add_experimental_option('prefs', {
+        'loggingPrefs': {'browser': 'OFF', 'driver': 'OFF', 'server': 'OFF'},  # غیرفعال کردن لاگ‌های مرورگر
+        'profile.default_content_setting_values.media_stream': 2,  # غیرفعال کردن دسترسی به رسانه
+    })
+    try:
+        driver_path = ChromeDriverManager(log_level=0).install()  # log_level=0 برای سرکوب لاگ‌های webdriver-manager
+        service = Service(driver_path, log_output=os.devnull)
+        driver = webdriver.Chrome(service=service, options=chrome_options)
+        events.emit("browser_launched", port=debugging_port)
+        return driver
+    except PermissionError as e:
+        logging.error(f"خطای دسترسی در نصب درایور کروم: {str(e)}")
+        raise
+
+def attach_driver(debugger_address):
+    """اتصال یک session جدید WebDriver به مرورگر در حال اجرا (بدون اجرای Chrome جدید)"""
+    chrome_options = Options()
+    chrome_options.debugger_address = debugger_address
+    try:
+        driver_path = ChromeDriverManager(log_level=0).install()
+        service = Service(driver_path, log_output=os.devnull)
+        return webdriver.Chrome(service=service, options=chrome_options)
+    except PermissionError as e:
+        logging.error(f"خطای دسترسی در نصب درایور کروم: {str(e)}")
+        raise
+
+def init_worker():
+    """مقداردهی اولیه worker در Pool: ثبت بستن مرورگر هنگام خروج پردازش"""
+    global _finalizer_registered
+    if not _finalizer_registered:
+        # Finalize برخلاف atexit در خروج عادی workerهای multiprocessing هم اجرا می‌شود
+        util.Finalize(None, shutdown_driver, exitpriority=10)
+        _finalizer_registered = True
+
+def is_healthy(driver):
+    """بررسی سلامت مرورگر با یک فرمان سبک"""
+    try:
+        driver.execute_script("return 1")
+        return len(driver.window_handles) > 0
+    except Exception as e:
+        logging.warning(f"مرورگر پاسخ نمی‌دهد و بازسازی می‌شود: {str(e)}")
+        return False
+
+def reset_driver(driver):
+    """پاک‌سازی وضعیت مرورگر بین دو وظیفه (کوکی‌ها، storage و تب‌های اضافه)"""
+    handles = driver.window_handles
+    for handle in handles[1:]:
+        driver.switch_to.window(handle)
+        driver.close()
+    driver.switch_to.window(handles[0])
+    try:
+        driver.execute_script("window.localStorage.clear(); window.sessionStorage.clear();")
+    except Exception as e:
+        # روی صفحه‌های about:blank یا data: دسترسی به storage مجاز نیست
+        logging.debug(f"پاک‌سازی storage انجام نشد: {str(e)}")
+    driver.execute_cdp_cmd("Network.clearBrowserCookies", {})
+    driver.get("about:blank")
+
+def shutdown_driver():
+    """بستن مرورگر فعلی این پردازش"""
+    global _driver, _pages_served
+    if _driver is not None:
+        try:
+            _driver.quit()
+        except Exception as e:
+            logging.error(f"خطا در بستن WebDriver: {str(e)}")
+    _driver = None
+    _pages_served = 0
+
+def use_provider(provider):
+    """تعیین تأمین‌کننده مرورگر این thread؛ تا زمان پاک شدن (None) به جای مرورگر پردازش استفاده می‌شود"""
+    _local.provider = provider
+
+def acquire_driver(system=None):
+    """گرفتن مرورگر سالم این پردازش؛ در صورت نبود، خرابی یا رسیدن به سقف صفحات، مرورگر تازه ساخته می‌شود
+
+    مرورگر بین منابع مشترک است، بنابراین سیاست حذف منابع هر منبع در هر بار گرفتن مرورگر دوباره اعمال می‌شود.
+    """
+    global _driver, _pages_served
+    provider = getattr(_local, "provider", None)
+    if provider is not None:
+        driver = provider()
+        if system is not None:
+            resource_policy.apply(driver, system)
+        return driver
+    init_worker()
+    if _driver is not None and (_pages_served >= MAX_PAGES_PER_DRIVER or not is_healthy(_driver)):
+        logging.info(f"بازسازی مرورگر پس از {_pages_served} صفحه")
+        shutdown_driver()
+    if _driver is None:
+        _driver = setup_driver()
+        readiness.install(_driver)
+        _pages_served = 0
+    _pages_served += 1
+    if system is not None:
+        resource_policy.apply(_driver, system)
+    return _driver
+
+def release_driver(driver):
+    """بازگرداندن مرورگر به pool پس از پایان وظیفه (زمینه‌های مستقل را پشتیبان چندزمینه‌ای می‌بندد)"""
+    if driver is not _driver:
+        return
+    try:
+        reset_driver(driver)
+    except Exception as e:
+        logging.warning(f"پاک‌سازی مرورگر ناموفق بود و مرورگر بسته می‌شود: {str(e)}")
+        shutdown_driver()
+
+def keyed_call(func, args):
+    """اجرای func روی (دانشگاه‌ها، سال) و برگرداندن (سال، نتیجه)"""
+    return args[1], func(args)
+
+def stream_years(func, args, pool=None):
+    """مولد (سال، نتیجه) هر سال به محض پایان آن با imap_unordered؛ بدون pool یک Pool موقت ساخته می‌شود"""
+    call = partial(keyed_call, func)
+    if pool is not None:
+        yield from pool.imap_unordered(call, args)
+        return
+    with Pool(processes=int(os.getenv('NUM_PROCESSES', 3)), initializer=init_worker) as own_pool:
+        yield from own_pool.imap_unordered(call, args)
+        # بستن منظم workerها تا مرورگر هر worker هنگام خروج بسته شود
+        own_pool.close()
+        own_pool.join()
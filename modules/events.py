@@ -0,0 +1,32 @@
+import json
+import logging
+import os
+import time
+from dotenv import load_dotenv
+
+# بارگذاری متغیرهای محیطی
+load_dotenv()
+
+# مقصد رویدادها: خالی (غیرفعال)، '-' برای stdout یا مسیر فایل JSONL؛ workerهای Pool آن را از محیط به ارث می‌برند
+EVENTS_TARGET = 'EVENTS'
+
+def emit(event, **fields):
+    """نوشتن یک رویداد (started، fetched، parsed، matched، completed، failed) به صورت یک خط JSON"""
+    target = os.getenv(EVENTS_TARGET)
+    if not target:
+        return
+    record = {"event": event, "time": round(time.time(), 3), **fields}
+    line = (json.dumps(record, ensure_ascii=False, default=str) + "\n").encode('utf-8')
+    try:
+        # هر رویداد با یک فراخوانی write (و O_APPEND برای فایل) نوشته می‌شود تا خطوط پردازش‌های مختلف در هم نروند
+        if target == '-':
+            os.write(1, line)
+        else:
+            os.makedirs(os.path.dirname(target) or ".", exist_ok=True)
+            fd = os.open(target, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+            try:
+                os.write(fd, line)
+            finally:
+                os.close(fd)
+    except Exception as e:
+        logging.error(f"خطا در نوشتن رویداد {event}: {str(e)}")
@@ -0,0 +1,56 @@
+import json
+import logging
+import os
+from dotenv import load_dotenv
+
+# بارگذاری متغیرهای محیطی
+load_dotenv()
+
+# نشانه ابتدای خروجی فشرده استخراج‌کننده جاوااسکریپت (در برابر HTML کامل صفحه)
+ROWS_PREFIX = '{"rows":'
+
+def js_mode():
+    """حالت استخراج در مرورگر: فقط ردیف‌ها به صورت JSON از مرورگر گرفته می‌شوند نه کل page_source"""
+    return os.getenv('EXTRACT_MODE', 'html') == 'js'
+
+def page_state(state=""):
+    """وضعیت cache با در نظر گرفتن حالت استخراج (خروجی JSON و HTML جداگانه ذخیره می‌شوند)"""
+    return f"{state};extract=js" if js_mode() else state
+
+def run_extractor(driver, script):
+    """اجرای استخراج‌کننده جاوااسکریپت منبع؛ در صورت خطا None برمی‌گرداند"""
+    try:
+        rows = driver.execute_script(script)
+        if isinstance(rows, list):
+            return [[str(value).strip() if value is not None else "" for value in row] for row in rows]
+        logging.warning(f"خروجی استخراج‌کننده جاوااسکریپت فهرست نیست: {type(rows).__name__}")
+    except Exception as e:
+        logging.warning(f"خطا در اجرای استخراج‌کننده جاوااسکریپت: {str(e)}")
+    return None
+
+def dump_rows(rows):
+    """تبدیل ردیف‌های استخراج‌شده به متن JSON فشرده برای cache"""
+    return ROWS_PREFIX + json.dumps(rows, ensure_ascii=False, separators=(',', ':')) + "}"
+
+def capture(driver, script):
+    """گرفتن محتوای صفحه: در حالت js فقط ردیف‌ها و در غیر این صورت (یا در صورت خطا) HTML کامل"""
+    if js_mode() and script:
+        rows = run_extractor(driver, script)
+        if rows:
+            return dump_rows(rows)
+        logging.info("استخراج در مرورگر نتیجه‌ای نداشت؛ از page_source استفاده می‌شود")
+    return driver.page_source
+
+def load_rows(page, parse_rows, year):
+    """ردیف‌های (رتبه، نام، شاخص) از خروجی JSON استخراج‌کننده یا از پردازش HTML
+
+    اگر ردیفی یافت نشود (جدول نیست یا ساختار آن تغییر کرده) ValueError برانگیخته می‌شود تا نبود دانشگاه در
+    جدولی که پردازش نشده به عنوان خارج شدن از رتبه‌بندی (null) ذخیره نشود.
+    """
+    if page.startswith(ROWS_PREFIX):
+        rows = [tuple(row) for row in json.loads(page)["rows"]]
+    else:
+        rows = parse_rows(page, year)
+    if not rows:
+        raise ValueError(f"ردیفی از جدول رتبه‌بندی سال {year} خوانده نشد")
+    return rows
@@ -0,0 +1,90 @@
+import logging
+import os
+import threading
+import time
+from multiprocessing import util
+from urllib.parse import urlparse
+import httpx
+from dotenv import load_dotenv
+from modules import rate_limit
+
+# بارگذاری متغیرهای محیطی
+load_dotenv()
+
+HTTP_TIMEOUT = float(os.getenv('HTTP_TIMEOUT', 20))
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0 Safari/537.36"
+# اتصال‌های باز نگه‌داشته‌شده برای بازاستفاده بین درخواست‌های یک پردازش
+LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10, keepalive_expiry=60)
+
+# کلاینت هر پردازش (اتصال‌ها بین وظایف یک worker بازاستفاده می‌شوند)
+_client = None
+_client_lock = threading.Lock()
+
+def http_enabled():
+    """مجاز بودن دریافت مستقیم با HTTP؛ FETCH_MODE=browser همه منابع را به مرورگر می‌فرستد"""
+    return os.getenv('FETCH_MODE', 'auto') != 'browser'
+
+def http2_available():
+    """HTTP/2 فقط در صورت نصب بودن بسته h2 و فعال بودن HTTP2 در .env"""
+    if os.getenv('HTTP2', 'True') != 'True':
+        return False
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+def client_options():
+    """تنظیمات مشترک کلاینت‌های همگام و ناهمگام"""
+    # httpx در صورت نصب بودن brotli خودکار br را به Accept-Encoding اضافه می‌کند
+    return {
+        "http2": http2_available(),
+        "limits": LIMITS,
+        "timeout": HTTP_TIMEOUT,
+        "follow_redirects": True,
+        "headers": {"User-Agent": USER_AGENT, "Accept-Language": "en-US,en;q=0.9"},
+    }
+
+def get_client():
+    """کلاینت HTTP مشترک این پردازش با اتصال‌های keep-alive، HTTP/2 و فشرده‌سازی gzip/brotli"""
+    global _client
+    # در پشتیبان چندزمینه‌ای چند thread هم‌زمان به کلاینت نیاز دارند
+    with _client_lock:
+        if _client is None:
+            _client = httpx.Client(**client_options())
+            util.Finalize(None, close_client, exitpriority=10)
+    return _client
+
+def async_client():
+    """کلاینت ناهمگام با همان تنظیمات برای موتور asyncio (با async with بسته می‌شود)"""
+    return httpx.AsyncClient(**client_options())
+
+def close_client():
+    """بستن کلاینت و اتصال‌های باز این پردازش"""
+    global _client
+    if _client is not None:
+        try:
+            _client.close()
+        except Exception as e:
+            logging.error(f"خطا در بستن کلاینت HTTP: {str(e)}")
+    _client = None
+
+def get(url, **kwargs):
+    """درخواست GET با کلاینت مشترک و محدودیت نرخ میزبان؛ پاسخ خطا (4xx/5xx) استثنا ایجاد می‌کند"""
+    start = time.time()
+    with rate_limit.request(urlparse(url).hostname):
+        response = get_client().get(url, **kwargs)
+    response.raise_for_status()
+    logging.debug(f"دریافت {url} با {response.http_version} در {time.time() - start:.2f} ثانیه ({len(response.content)} بایت)")
+    return response
+
+async def get_async(client, url, **kwargs):
+    """درخواست GET ناهمگام با محدودیت نرخ میزبان؛ پاسخ خطا (4xx/5xx) استثنا ایجاد می‌کند"""
+    async with rate_limit.request_async(urlparse(url).hostname):
+        response = await client.get(url, **kwargs)
+    response.raise_for_status()
+    return response
+
+def get_text(url, **kwargs):
+    """متن پاسخ یک آدرس"""
+    return get(url, **kwargs).text
@@ -1,20 +1,15 @@
 import logging
+import re
 import time
 import json
 import os
-from multiprocessing import Pool
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import Select
 from selenium.webdriver.common.keys import Keys
-from bs4 import BeautifulSoup
-import random
 from dotenv import load_dotenv
+from modules import driver_pool, page_cache, parsing, extraction, metrics, resource_policy, readiness, retry, rate_limit, storage, events, year_discovery, http_client
+from modules.matcher import assign_ranks
+from modules.universities import search_term as university_search_term
 
 # بارگذاری متغیرهای محیطی
 load_dotenv()
@@ -28,8 +23,38 @@ logging.basicConfig(
 )
 
 UNIVERSITY_NAME = "Ferdowsi University of Mashhad"
-MAX_RETRIES = 3
-JSON_FILE = "data/university_rankings.json"
+HOST = "ur.isc.ac"
+# نشانی پایه سایت (ISC_BASE_URL برای اجرا روی سرور نمونه محلی)
+BASE_URL = os.getenv('ISC_BASE_URL') or f"https://{HOST}"
+SYSTEM = "isc"
+# داده این منبع فقط پس از اجرای جاوااسکریپت و تعامل با صفحه در دسترس است
+HTTP_FETCHABLE = False
+# ظرف(های) جدول نتایج جستجو
+CONTAINER = {"tag": "table", "all": True}
+# ردیف‌هایی که آماده بودن صفحه با پایدار شدن تعداد آن‌ها سنجیده می‌شود
+ROW_SELECTOR = "table tr"
+# استخراج‌کننده درون مرورگر: فقط (رتبه، نام، ستون دوم) ردیف‌های جدول نتیجه برگردانده می‌شود
+JS_EXTRACTOR = """
+const rows = [];
+document.querySelectorAll('table tr').forEach(tr => {
+    const cells = tr.querySelectorAll(':scope > td');
+    if (cells.length > 2) {
+        const span = cells[0].querySelector('span.FractionTop');
+        if (span && span.textContent.trim()) {
+            rows.push([span.textContent.trim(), cells[2].textContent.replace(/\\s+/g, ' ').trim(), cells[1].textContent.trim()]);
+        }
+    }
+});
+return rows;
+"""
+# آدرس‌های XHR شناسایی‌شده فرم
+ENDPOINTS_FILE = "data/cache/isc_endpoints.json"
+ENDPOINT_SCRIPT = """
+return performance.getEntriesByType('resource')
+    .filter(entry => entry.initiatorType === 'xmlhttprequest' || entry.initiatorType === 'fetch')
+    .map(entry => entry.name);
+"""
+# نگاشت پیش‌فرض سال به مقدار گزینه year_list در صورت ناموفق بودن کشف گزینه‌های فرم
 YEAR_MAPPING = {
     "1391-1392": "2",
     "1392-1393": "3",
@@ -44,180 +69,326 @@ YEAR_MAPPING = {
     "1401-1402": "16"
 }
 
-def load_previous_rankings():
-    """خواندن رتبه‌های قبلی از فایل JSON"""
-    if os.path.exists(JSON_FILE):
+def load_previous_rankings(university_name):
+    """خواندن آخرین رتبه‌های ذخیره‌شده یک دانشگاه در این نظام از جدول رتبه‌ها"""
+    try:
+        return storage.system_rankings(university_name, SYSTEM)
+    except Exception as e:
+        logging.error(f"خطا در خواندن جدول رتبه‌ها: {str(e)}")
+        return {}
+
+def year_options(html):
+    """نگاشت سال (مانند 1401-1402) به مقدار گزینه از گزینه‌های فهرست year_list"""
+    mapping = {}
+    for value, text in year_discovery.select_options(html, "year_list"):
+        found = re.search(r'(\d{4})\s*[-–/]\s*(\d{4})', text)
+        if value and found:
+            mapping[f"{found.group(1)}-{found.group(2)}"] = value
+    return mapping
+
+def discover_years():
+    """بازسازی نگاشت سال‌ها از گزینه‌های year_list در HTML فرم"""
+    mapping = year_options(http_client.get_text(page_url(None)))
+    return list(mapping), mapping
+
+def year_mapping():
+    """نگاشت سال به مقدار گزینه فرم (کشف‌شده با cache دارای TTL یا YEAR_MAPPING)"""
+    return year_discovery.discover(SYSTEM, discover_years, list(YEAR_MAPPING), YEAR_MAPPING)[1]
+
+def record_year_options(driver):
+    """به‌روزرسانی نگاشت سال‌ها از فهرست year_list فرم بارگذاری‌شده در مرورگر (بدون بارگذاری اضافه)"""
+    try:
+        year_select = driver.find_element(By.ID, "year_list")
+        mapping = year_options(year_select.get_attribute('outerHTML'))
+        if mapping and mapping != year_mapping():
+            year_discovery.store(SYSTEM, sorted(mapping), mapping)
+            logging.info(f"نگاشت سال‌های ISC از فرم به‌روزرسانی شد: {mapping}")
+    except Exception as e:
+        logging.debug(f"خواندن گزینه‌های year_list ناموفق بود: {str(e)}")
+
+def get_years():
+    """فهرست سال‌هایی که باید استخراج شوند"""
+    return sorted(year_mapping())
+
+def page_url(year):
+    """آدرس فرم رتبه‌بندی ISC (برای همه سال‌ها یکسان است)"""
+    return f"{BASE_URL}/Home/RankIranUniv"
+
+def page_state(universities):
+    """وضعیت تعامل فرم (نوع دانشگاه و عبارت‌های جستجو) که بخشی از کلید cache است"""
+    terms = sorted({university_search_term(name, SYSTEM) for name in universities})
+    return f"univ_type=2;filter={'|'.join(terms)}"
+
+def session_sweep_enabled():
+    """حالت جلسه: فرم یک بار بارگذاری می‌شود و همه سال‌ها در همان جلسه مرور می‌شوند (ISC_SESSION_SWEEP در .env)"""
+    return os.getenv('ISC_SESSION_SWEEP', 'True') == 'True'
+
+def open_form(driver):
+    """بارگذاری فرم و انتخاب نوع دانشگاه (دانشگاه‌های جامع)؛ در صورت خطا False برمی‌گرداند"""
+    with rate_limit.request(HOST):
+        driver.get(page_url(None))
+    readiness.wait_for_element(driver, SYSTEM, "load", (By.ID, "year_list"))
+    try:
+        univ_type_select = readiness.wait_for_element(driver, SYSTEM, "univ_type", (By.ID, "univ_type_list"), 5)
+        Select(univ_type_select).select_by_value("2")  # دانشگاه‌های جامع
+        logging.debug("نوع دانشگاه به 'دانشگاه‌های جامع' تنظیم شد")
+        readiness.wait_for_element(driver, SYSTEM, "year_list", (By.ID, "year_list"), 3)
+    except Exception as e:
+        logging.warning(f"خطا در تنظیم نوع دانشگاه: {str(e)}")
+        return False
+    record_year_options(driver)
+    return True
+
+def select_year(driver, year):
+    """انتخاب سال در فرم بارگذاری‌شده؛ در صورت خطا False برمی‌گرداند"""
+    try:
+        year_select = readiness.wait_for_element(driver, SYSTEM, "year_list", (By.ID, "year_list"), 5)
+        Select(year_select).select_by_value(year_mapping()[year])
+        logging.debug(f"سال {year} انتخاب شد")
+        readiness.wait_for_element(driver, SYSTEM, "filter", (By.ID, "filter"), 5)
+    except Exception as e:
+        logging.warning(f"خطا در انتخاب سال {year}: {str(e)}")
+        return False
+    return True
+
+def search_tables(driver, year, universities):
+    """جستجوی نام هر دانشگاه در سال انتخاب‌شده؛ خروجی HTML جدول‌های نتیجه، ردیف‌های JSON یا None است"""
+    fragments = []
+    rows = []
+    for term in sorted({university_search_term(name, SYSTEM) for name in universities}):
         try:
-            with open(JSON_FILE, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                return data.get("rankings", {}).get("isc", {})
+            search_input = readiness.wait_for_element(driver, SYSTEM, "filter", (By.ID, "filter"), 5)
+            search_input.clear()
+            search_input.send_keys(term)
+            # هر جستجو یک درخواست XHR به میزبان است
+            with rate_limit.request(HOST):
+                search_input.send_keys(Keys.RETURN)
+            logging.debug(f"جستجو برای '{term}' در سال {year} انجام شد")
+            # تا پایان درخواست جستجو و پایدار شدن ردیف‌ها صبر می‌شود تا نتیجه جستجوی قبلی خوانده نشود
+            readiness.wait_for_rows(driver, SYSTEM, "search", ROW_SELECTOR, 5)
+            table = driver.find_element(By.TAG_NAME, "table")
+            if extraction.js_mode():
+                # در حالت js فقط ردیف‌ها نگه داشته می‌شوند؛ در صورت خطای استخراج‌کننده، همان جدول در پایتون پردازش می‌شود
+                rows.extend(extraction.run_extractor(driver, JS_EXTRACTOR) or parse_rows(table.get_attribute('outerHTML'), year))
+            else:
+                fragments.append(table.get_attribute('outerHTML'))
         except Exception as e:
-            logging.error(f"خطا در خواندن فایل JSON: {str(e)}")
-            return {}
-    return {}
-
-def setup_driver():
-    """تنظیم WebDriver با سرکوب کامل لاگ‌ها"""
-    chrome_options = Options()
-    chrome_options.add_argument("--headless=new")  # استفاده از headless جدید
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--disable-extensions")
-    chrome_options.add_argument("--disable-notifications")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--ignore-certificate-errors")
-    chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/91.0.4472.124")
-    chrome_options.add_argument("--log-level=3")
-    chrome_options.add_argument("--mute-audio")
-    chrome_options.add_argument("--disable-features=VoiceTranscription,MediaSession,MediaSessionService")
-    chrome_options.add_argument("--disable-logging")  # غیرفعال کردن لاگ‌های اضافی
-    chrome_options.add_argument("--disable-background-timer-throttling")
-    chrome_options.add_argument("--disable-backgrounding-occluded-windows")
-    chrome_options.add_argument("--disable-renderer-backgrounding")
-    chrome_options.add_experimental_option('excludeSwitches', ['enable-logging', 'enable-automation'])
-    chrome_options.add_experimental_option('prefs', {
-        'loggingPrefs': {'browser': 'OFF', 'driver': 'OFF', 'server': 'OFF'},  # غیرفعال کردن لاگ‌های مرورگر
-        'profile.default_content_setting_values.media_stream': 2,  # غیرفعال کردن دسترسی به رسانه
-    })
+            logging.warning(f"خطا در جستجوی '{term}' برای سال {year}: {str(e)}")
+    if rows:
+        return extraction.dump_rows(rows)
+    if not fragments:
+        return None
+
+    return "<html><body>" + "".join(fragments) + "</body></html>"
+
+def fetch_page(driver, year, universities):
+    """بارگذاری فرم، انتخاب نوع دانشگاه و سال و جستجوی هر دانشگاه؛ خروجی HTML جدول‌های نتیجه، ردیف‌های JSON یا None است"""
+    if not open_form(driver) or not select_year(driver, year):
+        return None
+    return search_tables(driver, year, universities)
+
+def record_endpoints(driver):
+    """ثبت آدرس‌های XHR/fetch که فرم برای به‌روزرسانی جدول فراخوانی کرده است (برای دریافت مستقیم بدون مرورگر)"""
     try:
-        driver_path = ChromeDriverManager(log_level=0).install()  # log_level=0 برای سرکوب لاگ‌های webdriver-manager
-        service = Service(driver_path, log_output=os.devnull)
-        return webdriver.Chrome(service=service, options=chrome_options)
-    except PermissionError as e:
-        logging.error(f"خطای دسترسی در نصب درایور کروم: {str(e)}")
-        raise
+        urls = driver.execute_script(ENDPOINT_SCRIPT) or []
+        endpoints = {}
+        if os.path.exists(ENDPOINTS_FILE):
+            with open(ENDPOINTS_FILE, 'r', encoding='utf-8') as f:
+                endpoints = json.load(f)
+        for url in urls:
+            endpoints[url] = endpoints.get(url, 0) + 1
+        os.makedirs(os.path.dirname(ENDPOINTS_FILE), exist_ok=True)
+        with open(ENDPOINTS_FILE, 'w', encoding='utf-8') as f:
+            json.dump(endpoints, f, indent=2, ensure_ascii=False)
+        if urls:
+            logging.info(f"درخواست‌های XHR فرم ISC: {urls}")
+    except Exception as e:
+        logging.debug(f"ثبت درخواست‌های XHR فرم ISC ناموفق بود: {str(e)}")
+
+def fetch_years(driver, years, universities):
+    """مرور همه سال‌ها در یک جلسه: فرم یک بار بارگذاری و برای هر سال فقط سال انتخاب و جستجو می‌شود
+
+    خروجی مولد (سال، صفحه) است؛ اگر انتخاب یک سال شکست بخورد فرم یک بار دوباره بارگذاری می‌شود.
+    """
+    if not open_form(driver):
+        return
+    for year in years:
+        if not select_year(driver, year):
+            if not open_form(driver) or not select_year(driver, year):
+                yield year, None
+                continue
+        yield year, search_tables(driver, year, universities)
+    record_endpoints(driver)
+
+def parse_rows(html, year):
+    """ردیف‌های (رتبه، نام، ستون دوم) جدول‌های نتیجه از HTML"""
+    rows = parsing.find_rows(html, CONTAINER)
+    if not rows:
+        logging.warning(f"جدول رتبه‌بندی برای سال {year} یافت نشد")
+        return []
+
+    logging.debug(f"تعداد ردیف‌ها در جدول سال {year}: {len(rows)}")
+    candidates = []
+    for row, cells in rows:
+        try:
+            if len(cells) > 2:
+                rank_text = parsing.text(parsing.find_by_class(cells[0], 'span', 'FractionTop'))
+                if rank_text:
+                    candidates.append((rank_text, parsing.text(cells[2]), parsing.text(cells[1])))
+        except Exception as e:
+            logging.error(f"خطا در پردازش ردیف برای سال {year}: {str(e)}")
+            continue
+    return candidates
+
+def parse_page(page, universities, year):
+    """استخراج رتبه دانشگاه‌ها از صفحه یک سال (HTML یا خروجی استخراج‌کننده جاوااسکریپت) با یک اسکن خطی"""
+    rows = extraction.load_rows(page, parse_rows, year)
+    events.emit("parsed", system=SYSTEM, year=year, rows=len(rows))
+    ranks = {}
+    for name, row in assign_ranks(rows, universities).items():
+        ranks[name] = row[0] if row else None
+        if row:
+            logging.info(f"رتبه {name} برای سال {year}: {row[0]} (ردیف: {row[1]})")
+        else:
+            logging.warning(f"دانشگاه {name} در سال {year} یافت نشد")
+    events.emit("matched", system=SYSTEM, year=year, ranks=ranks)
+    return ranks
 
 def scrape_year(args):
     """اسکریپینگ رتبه برای یک سال خاص"""
     university_name, year = args
-    logging.info(f"استخراج رتبه برای سال {year} (ISC)")
-    driver = None
-    result = {year: None}
-    
-    for attempt in range(MAX_RETRIES):
+    return {year: scrape_year_batch(([university_name], year))[university_name]}
+
+def scrape_year_batch(args):
+    """اسکریپینگ رتبه چند دانشگاه برای یک سال خاص با یک بار بارگذاری صفحه"""
+    universities, year = args
+    logging.info(f"استخراج رتبه {len(universities)} دانشگاه برای سال {year} (ISC)")
+    result = {name: None for name in universities}
+
+    # در صورت وجود صفحه معتبر در cache، مرورگری اجرا نمی‌شود
+    url = page_url(year)
+    state = extraction.page_state(page_state(universities))
+    html = page_cache.get(SYSTEM, year, url, state)
+    if html is None and page_cache.from_cache_only():
+        page_cache.report_miss(SYSTEM, year)
+        return result
+
+    def attempt():
+        if html is not None:
+            return parse_page(html, universities, year)
+        driver = driver_pool.acquire_driver(SYSTEM)
         try:
-            driver = setup_driver()
-            url = "https://ur.isc.ac/Home/RankIranUniv"
-            driver.get(url)
-            WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.ID, "year_list"))
-            )
-
-            # انتخاب نوع دانشگاه (دانشگاه‌های جامع)
-            try:
-                univ_type_select = WebDriverWait(driver, 5).until(
-                    EC.presence_of_element_located((By.ID, "univ_type_list"))
-                )
-                Select(univ_type_select).select_by_value("2")  # دانشگاه‌های جامع
-                logging.debug(f"نوع دانشگاه به 'دانشگاه‌های جامع' برای سال {year} تنظیم شد")
-                WebDriverWait(driver, 3).until(
-                    EC.presence_of_element_located((By.ID, "year_list"))
-                )
-            except Exception as e:
-                logging.warning(f"خطا در تنظیم نوع دانشگاه برای سال {year}: {str(e)}")
-                return result
+            fetch_start = time.time()
+            page = fetch_page(driver, year, universities)
+            metrics.record_page_load(driver, SYSTEM, year, time.time() - fetch_start, resource_policy.blocking_enabled())
+        finally:
+            driver_pool.release_driver(driver)
+        if page is None:
+            # صفحه‌ای بارگذاری نشد؛ رتبه‌ها نامعلوم‌اند و نباید به عنوان null ذخیره شوند
+            raise TimeoutError(f"صفحه سال {year} بارگذاری نشد")
+        # صفحه فقط پس از پردازش موفق جدول در cache ذخیره می‌شود
+        ranks = parse_page(page, universities, year)
+        page_cache.put(SYSTEM, year, url, page, state)
+        return ranks
 
-            # انتخاب سال
-            try:
-                year_select = WebDriverWait(driver, 5).until(
-                    EC.presence_of_element_located((By.ID, "year_list"))
-                )
-                Select(year_select).select_by_value(YEAR_MAPPING[year])
-                logging.debug(f"سال {year} انتخاب شد")
-                WebDriverWait(driver, 5).until(
-                    EC.presence_of_element_located((By.ID, "filter"))
-                )
-            except Exception as e:
-                logging.warning(f"خطا در انتخاب سال {year}: {str(e)}")
-                return result
+    # تکرار فقط برای خطاهای گذرا و پایان مهلت رندر؛ خطای دائمی بلافاصله گزارش می‌شود
+    try:
+        return retry.call(attempt, SYSTEM, year)
+    except Exception:
+        logging.error(f"تلاش‌های مجدد برای سال {year} به پایان رسید")
+        return result
+
+def scrape_years_batch(args):
+    """اسکریپینگ رتبه چند دانشگاه برای چند سال در یک جلسه مرورگر؛ خروجی {سال: {دانشگاه: رتبه}}"""
+    universities, years = args
+    logging.info(f"استخراج رتبه {len(universities)} دانشگاه برای {len(years)} سال در یک جلسه (ISC)")
+    result = {year: {name: None for name in universities} for year in years}
 
-            # جستجوی نام دانشگاه
+    # سال‌هایی که صفحه معتبرشان در cache هست بدون مرورگر پردازش می‌شوند
+    state = extraction.page_state(page_state(universities))
+    missing = []
+    for year in years:
+        html = page_cache.get(SYSTEM, year, page_url(year), state)
+        if html is not None:
             try:
-                search_input = WebDriverWait(driver, 5).until(
-                    EC.presence_of_element_located((By.ID, "filter"))
-                )
-                search_input.clear()
-                search_input.send_keys("فردوسی")
-                search_input.send_keys(Keys.RETURN)
-                logging.debug(f"جستجو برای 'فردوسی' در سال {year} انجام شد")
-                WebDriverWait(driver, 5).until(
-                    EC.presence_of_element_located((By.TAG_NAME, "table"))
-                )
+                result[year] = parse_page(html, universities, year)
+                continue
             except Exception as e:
-                logging.warning(f"خطا در جستجوی دانشگاه برای سال {year}: {str(e)}")
-                return result
-
-            # استخراج HTML
-            soup = BeautifulSoup(driver.page_source, 'lxml')
-            table = soup.find('table')
-            if not table:
-                logging.warning(f"جدول رتبه‌بندی برای سال {year} یافت نشد")
-                return result
-
-            rows = table.find_all('tr')
-            logging.debug(f"تعداد ردیف‌ها در جدول سال {year}: {len(rows)}")
-            found = False
-            for row in rows:
+                logging.warning(f"صفحه ذخیره‌شده ISC سال {year} پردازش نشد: {str(e)}")
+        missing.append(year)
+    if missing and page_cache.from_cache_only():
+        page_cache.report_miss(SYSTEM, ", ".join(missing))
+        return result
+
+    attempt = 0
+    while missing:
+        driver = None
+        try:
+            driver = driver_pool.acquire_driver(SYSTEM)
+            fetch_start = time.time()
+            for year, html in fetch_years(driver, list(missing), universities):
+                metrics.record_page_load(driver, SYSTEM, year, time.time() - fetch_start, resource_policy.blocking_enabled())
+                fetch_start = time.time()
+                if html is None:
+                    continue
                 try:
-                    cells = row.find_all('td')
-                    if len(cells) >= 2:
-                        rank_span = cells[0].find('span', class_='FractionTop')
-                        rank = rank_span.text.strip() if rank_span else None
-                        university_cell = cells[2].text.lower().strip() if len(cells) > 2 else ""
-                        logging.debug(f"نام دانشگاه در ردیف: {university_cell}")
-                        keywords = [
-                            university_name.lower(), "ferdowsi univ", "ferdowsi university",
-                            "ferdowsi", "mashhad", "mashhad university", "um.ac.ir",
-                            "ferdosi", "ferdousi", "ferdowsi mashhad", "دانشگاه فردوسی"
-                        ]
-                        if any(keyword in university_cell for keyword in keywords):
-                            if rank:
-                                result[year] = rank
-                                logging.info(f"رتبه برای سال {year}: {rank}")
-                                found = True
-                                break
-                except Exception as e:
-                    logging.error(f"خطا در پردازش ردیف برای سال {year}: {str(e)}")
+                    result[year] = parse_page(html, universities, year)
+                except ValueError as e:
+                    # جدول سال خوانده نشد؛ سال در missing می‌ماند تا نتیجه نامعلومش null ذخیره نشود
+                    logging.warning(f"جدول ISC سال {year} پردازش نشد: {str(e)}")
                     continue
-
-            if not found:
-                logging.warning(f"دانشگاه {university_name} در سال {year} یافت نشد")
-            break
+                page_cache.put(SYSTEM, year, page_url(year), html, state)
+                missing.remove(year)
+            if missing:
+                # فرم یا انتخاب سال آماده نشد؛ مانند پایان مهلت رندر با بودجه تلاش همان دسته تکرار می‌شود
+                raise TimeoutError(f"سال‌های {missing} در جلسه ISC صفحه‌ای نداشتند")
 
         except Exception as e:
-            logging.error(f"خطا در اسکریپینگ برای سال {year}، تلاش {attempt + 1}: {str(e)}")
-            if attempt < MAX_RETRIES - 1:
-                time.sleep(random.uniform(3, 5))
-                continue
-            else:
-                logging.error(f"تلاش‌های مجدد برای سال {year} به پایان رسید")
+            category = retry.classify(e)
+            logging.error(f"خطای {category} در جلسه ISC، تلاش {attempt + 1}: {str(e)}")
+            attempt += 1
+            if attempt >= retry.MAX_ATTEMPTS[category]:
+                retry.fail(category, e)
                 break
+            time.sleep(retry.delay(attempt - 1))
         finally:
             if driver:
-                try:
-                    driver.quit()
-                except Exception as e:
-                    logging.error(f"خطا در بستن WebDriver برای سال {year}: {str(e)}")
+                driver_pool.release_driver(driver)
 
+    if missing:
+        logging.error(f"سال‌های {missing} در جلسه ISC استخراج نشدند")
     return result
 
-def get_rank(university_name):
-    """تابع اصلی برای استخراج رتبه‌ها با ادغام نتایج قبلی"""
-    previous_ranks = load_previous_rankings()
-    logging.info(f"رتبه‌های قبلی لود شدند: {previous_ranks}")
+def iter_ranks(universities, pool=None):
+    """مولد (سال، {دانشگاه: رتبه}) هر سال به محض پایان استخراج آن"""
+    years = get_years()
+    if session_sweep_enabled():
+        # همه سال‌ها در یک جلسه مرورگر؛ در صورت ارسال pool، مرورگر یکی از workerها استفاده می‌شود
+        batch = pool.apply(scrape_years_batch, ((universities, years),)) if pool is not None else scrape_years_batch((universities, years))
+        yield from batch.items()
+        return
+    yield from driver_pool.stream_years(scrape_year_batch, [(universities, year) for year in years], pool)
 
-    years = list(YEAR_MAPPING.keys())
-    ranks = {year: previous_ranks.get(year, None) for year in years}
+def get_ranks(universities, pool=None):
+    """استخراج رتبه چند دانشگاه؛ هر صفحه فقط یک بار بارگذاری و پردازش می‌شود"""
+    years = get_years()
+    ranks = {name: {year: None for year in years} for name in universities}
 
     start_time = time.time()
-    with Pool(processes=int(os.getenv('NUM_PROCESSES', 3))) as pool:
-        args = [(university_name, year) for year in years]
-        results = pool.map(scrape_year, args)
-    
-    for result in results:
-        for year, rank in result.items():
-            if rank is not None:
-                ranks[year] = rank
-    
-    logging.info(f"استخراج رتبه‌های ISC برای {university_name} تکمیل شد. زمان اجرا: {time.time() - start_time:.2f} ثانیه")
-    return ranks
\ No newline at end of file
+    for year, result in iter_ranks(universities, pool):
+        for name, rank in result.items():
+            ranks[name][year] = rank
+
+    logging.info(f"استخراج رتبه‌های ISC برای {len(universities)} دانشگاه تکمیل شد. زمان اجرا: {time.time() - start_time:.2f} ثانیه")
+    return ranks
+
+def get_rank(university_name, pool=None):
+    """تابع اصلی برای استخراج رتبه‌ها با ادغام نتایج قبلی (در صورت ارسال pool، مرورگرهای workerهای آن بازاستفاده می‌شوند)"""
+    previous_ranks = load_previous_rankings(university_name)
+    logging.info(f"رتبه‌های قبلی لود شدند: {previous_ranks}")
+
+    ranks = get_ranks([university_name], pool)[university_name]
+    for year, rank in ranks.items():
+        if rank is None:
+            ranks[year] = previous_ranks.get(year, None)
+    return ranks
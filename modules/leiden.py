@@ -1,19 +1,11 @@
 import logging
 import time
-import json
 import os
-from multiprocessing import Pool
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import Select
-from bs4 import BeautifulSoup
-import random
 from dotenv import load_dotenv
+from modules import driver_pool, page_cache, parsing, extraction, metrics, resource_policy, readiness, retry, rate_limit, storage, events, leiden_bulk, year_discovery, http_client
+from modules.matcher import assign_ranks
 
 # بارگذاری متغیرهای محیطی
 load_dotenv()
@@ -27,159 +19,186 @@ logging.basicConfig(
 )
 
 FIELD = "All sciences"
-MAX_RETRIES = 3
-JSON_FILE = "data/university_rankings.json"
+HOST = "www.leidenranking.com"
+# نشانی پایه سایت (LEIDEN_BASE_URL برای اجرا روی سرور نمونه محلی)
+BASE_URL = os.getenv('LEIDEN_BASE_URL') or f"https://{HOST}"
+SYSTEM = "leiden"
+# داده این منبع فقط پس از اجرای جاوااسکریپت و تعامل با صفحه در دسترس است
+HTTP_FETCHABLE = False
+# وضعیت تعامل صفحه که بخشی از کلید cache است
+PAGE_STATE = "indicator=PP(top 10%)"
+# ظرف جدول رتبه‌بندی در صفحه
+CONTAINER = {"tag": "table", "classes": ["pagedtable", "ranking"], "all": True}
+# ردیف‌هایی که آماده بودن صفحه با پایدار شدن تعداد آن‌ها سنجیده می‌شود
+ROW_SELECTOR = "table.pagedtable.ranking tr"
+# استخراج‌کننده درون مرورگر: فقط (رتبه، نام و تولتیپ، PP(top 10%)) ردیف‌های جدول برگردانده می‌شود
+JS_EXTRACTOR = """
+const rows = [];
+document.querySelectorAll('table.pagedtable.ranking tr').forEach(tr => {
+    const cells = tr.querySelectorAll(':scope > td');
+    if (cells.length >= 5 && cells[0].classList.contains('rank') && cells[1].classList.contains('university')) {
+        const rank = cells[0].textContent.trim();
+        if (/^\\d+$/.test(rank)) {
+            const span = cells[1].querySelector('span[data-tooltip]');
+            const tooltip = span ? span.getAttribute('data-tooltip').trim() : '';
+            rows.push([rank, cells[1].textContent.replace(/\\s+/g, ' ').trim() + ' | ' + tooltip, cells[4].textContent.trim()]);
+        }
+    }
+});
+return rows;
+"""
 
-def load_previous_rankings():
-    """خواندن رتبه‌های قبلی از فایل JSON"""
-    if os.path.exists(JSON_FILE):
+def load_previous_rankings(university_name):
+    """خواندن آخرین رتبه‌های ذخیره‌شده یک دانشگاه در این نظام از جدول رتبه‌ها"""
+    try:
+        return storage.system_rankings(university_name, SYSTEM)
+    except Exception as e:
+        logging.error(f"خطا در خواندن جدول رتبه‌ها: {str(e)}")
+        return {}
+
+# فهرست سال‌ها در صورت ناموفق بودن کشف سال‌های منتشرشده
+DEFAULT_YEARS = [str(year) for year in range(2013, 2025)]
+INDEX_URL = f"{BASE_URL}/ranking"
+
+def discover_years():
+    """سال‌های منتشرشده از پیوندهای نسخه‌ها در صفحه رتبه‌بندی و سال‌های داده کامل CWTS"""
+    years = year_discovery.link_years(http_client.get_text(INDEX_URL), r'/ranking/(\d{4})\b')
+    return sorted(set(years) | set(leiden_bulk.years())), {}
+
+def get_years():
+    """فهرست سال‌هایی که باید استخراج شوند (کشف‌شده از سایت با cache دارای TTL)"""
+    return year_discovery.discover(SYSTEM, discover_years, DEFAULT_YEARS)[0]
+
+def page_url(year):
+    """آدرس صفحه رتبه‌بندی یک سال"""
+    return f"{BASE_URL}/ranking/{year}"
+
+def fetch_page(driver, year):
+    """بارگذاری صفحه یک سال در مرورگر و انتخاب شاخص PP(top 10%)؛ خروجی HTML صفحه یا ردیف‌های JSON است"""
+    with rate_limit.request(HOST):
+        driver.get(page_url(year))
+    readiness.wait_for_rows(driver, SYSTEM, "load", ROW_SELECTOR)
+
+    # انتخاب شاخص PP(top 10%)
+    try:
+        select = readiness.wait_for_element(driver, SYSTEM, "indicator_select", (By.ID, "indicator_select"), 5)
+        Select(select).select_by_value('PP(top 10%)')
+        readiness.wait_for_rows(driver, SYSTEM, "indicator", ROW_SELECTOR, 5)
+    except Exception as e:
+        logging.info(f"شاخص PP(top 10%) به‌صورت پیش‌فرض انتخاب شده یا منو یافت نشد در سال {year}: {str(e)}")
+
+    return extraction.capture(driver, JS_EXTRACTOR)
+
+def parse_rows(html, year):
+    """ردیف‌های (رتبه، نام و تولتیپ، PP(top 10%)) جدول از HTML صفحه"""
+    rows = parsing.find_rows(html, CONTAINER)
+    if not rows:
+        logging.warning(f"جداول با کلاس 'pagedtable ranking' برای سال {year} یافت نشدند")
+        return []
+
+    logging.debug(f"تعداد ردیف‌ها در جدول سال {year}: {len(rows)}")
+    candidates = []
+    for row, cells in rows:
         try:
-            with open(JSON_FILE, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                return data.get("rankings", {}).get("leiden", {})
+            if len(cells) >= 5:
+                rank_text = parsing.text(cells[0])
+                if parsing.has_class(cells[0], 'rank') and parsing.has_class(cells[1], 'university') and rank_text.isdigit():
+                    university_span = cells[1].find('.//span[@data-tooltip]')
+                    university_tooltip = university_span.get('data-tooltip').strip() if university_span is not None else ""
+                    candidates.append((rank_text, f"{parsing.text(cells[1])} | {university_tooltip}", parsing.text(cells[4])))
         except Exception as e:
-            logging.error(f"خطا در خواندن فایل JSON: {str(e)}")
-            return {}
-    return {}
-
-def setup_driver():
-    """تنظیم WebDriver با سرکوب کامل لاگ‌ها"""
-    chrome_options = Options()
-    chrome_options.add_argument("--headless=new")  # استفاده از headless جدید
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--disable-extensions")
-    chrome_options.add_argument("--disable-notifications")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--ignore-certificate-errors")
-    chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/91.0.4472.124")
-    chrome_options.add_argument("--log-level=3")
-    chrome_options.add_argument("--mute-audio")
-    chrome_options.add_argument("--disable-features=VoiceTranscription,MediaSession,MediaSessionService")
-    chrome_options.add_argument("--disable-logging")  # غیرفعال کردن لاگ‌های اضافی
-    chrome_options.add_argument("--disable-background-timer-throttling")
-    chrome_options.add_argument("--disable-backgrounding-occluded-windows")
-    chrome_options.add_argument("--disable-renderer-backgrounding")
-    chrome_options.add_experimental_option('excludeSwitches', ['enable-logging', 'enable-automation'])
-    chrome_options.add_experimental_option('prefs', {
-        'loggingPrefs': {'browser': 'OFF', 'driver': 'OFF', 'server': 'OFF'},  # غیرفعال کردن لاگ‌های مرورگر
-        'profile.default_content_setting_values.media_stream': 2,  # غیرفعال کردن دسترسی به رسانه
-    })
-    try:
-        driver_path = ChromeDriverManager(log_level=0).install()  # log_level=0 برای سرکوب لاگ‌های webdriver-manager
-        service = Service(driver_path, log_output=os.devnull)
-        return webdriver.Chrome(service=service, options=chrome_options)
-    except PermissionError as e:
-        logging.error(f"خطای دسترسی در نصب درایور کروم: {str(e)}")
-        raise
+            logging.error(f"خطا در پردازش ردیف برای سال {year}: {str(e)}")
+            continue
+    return candidates
+
+def parse_page(page, universities, year):
+    """استخراج رتبه دانشگاه‌ها از صفحه یک سال (HTML یا خروجی استخراج‌کننده جاوااسکریپت) با یک اسکن خطی"""
+    rows = extraction.load_rows(page, parse_rows, year)
+    events.emit("parsed", system=SYSTEM, year=year, rows=len(rows))
+    ranks = {}
+    for name, row in assign_ranks(rows, universities).items():
+        ranks[name] = int(row[0]) if row else None
+        if row:
+            logging.info(f"رتبه {name} برای سال {year}: {row[0]} (PP(top 10%): {row[2]}، ردیف: {row[1]})")
+        else:
+            logging.warning(f"دانشگاه {name} در سال {year} یافت نشد")
+    events.emit("matched", system=SYSTEM, year=year, ranks=ranks)
+    return ranks
 
 def scrape_year(args):
     """اسکریپینگ رتبه برای یک سال خاص"""
     university_name, year = args
-    logging.info(f"استخراج رتبه برای سال {year} (Leiden)")
-    driver = None
-    result = {year: None}
-    
-    for attempt in range(MAX_RETRIES):
-        try:
-            driver = setup_driver()
-            url = f"https://www.leidenranking.com/ranking/{year}"
-            driver.get(url)
-            WebDriverWait(driver, 10).until(
-                EC.presence_of_all_elements_located((By.CLASS_NAME, "pagedtable.ranking"))
-            )
-
-            # انتخاب شاخص PP(top 10%)
-            try:
-                select = WebDriverWait(driver, 5).until(
-                    EC.presence_of_element_located((By.ID, "indicator_select"))
-                )
-                Select(select).select_by_value('PP(top 10%)')
-                WebDriverWait(driver, 5).until(
-                    EC.presence_of_all_elements_located((By.CLASS_NAME, "pagedtable.ranking"))
-                )
-            except Exception as e:
-                logging.info(f"شاخص PP(top 10%) به‌صورت پیش‌فرض انتخاب شده یا منو یافت نشد در سال {year}: {str(e)}")
-
-            # استخراج HTML
-            soup = BeautifulSoup(driver.page_source, 'lxml')
-            tables = soup.find_all('table', class_='pagedtable ranking')
-            if not tables:
-                logging.warning(f"جداول با کلاس 'pagedtable ranking' برای سال {year} یافت نشدند")
-                return result
-
-            found = False
-            for table in tables:
-                try:
-                    rows = table.find_all('tr')
-                    logging.debug(f"تعداد ردیف‌ها در جدول سال {year}: {len(rows)}")
-                    for row in rows:
-                        cells = row.find_all('td')
-                        if len(cells) >= 5:
-                            rank_cell = cells[0].get('class', [])
-                            university_cell = cells[1].get('class', [])
-                            if 'rank' in rank_cell and 'university' in university_cell:
-                                university_span = cells[1].find('span', {'data-tooltip': True})
-                                university_text = cells[1].text.lower().strip()
-                                university_tooltip = university_span['data-tooltip'].lower().strip() if university_span else ""
-                                logging.debug(f"نام دانشگاه در ردیف: {university_text}, تولتیپ: {university_tooltip}")
-                                keywords = [
-                                    university_name.lower(), "ferdowsi univ", "ferdowsi university",
-                                    "ferdowsi", "mashhad", "mashhad university", "um.ac.ir",
-                                    "ferdosi", "ferdousi", "ferdowsi mashhad"
-                                ]
-                                if any(keyword in university_text or keyword in university_tooltip for keyword in keywords):
-                                    rank = cells[0].text.strip() if cells[0].text.strip().isdigit() else None
-                                    pp_top10 = cells[4].text.strip()
-                                    if rank:
-                                        result[year] = int(rank)
-                                        logging.info(f"رتبه برای سال {year}: {result[year]} (PP(top 10%): {pp_top10})")
-                                        found = True
-                                        break
-                    if found:
-                        break
-                except Exception as e:
-                    logging.error(f"خطا در پردازش جدول برای سال {year}: {str(e)}")
-                    continue
-
-            if not found:
-                logging.warning(f"دانشگاه {university_name} در سال {year} یافت نشد")
-            break
+    return {year: scrape_year_batch(([university_name], year))[university_name]}
 
-        except Exception as e:
-            logging.error(f"خطا در اسکریپینگ برای سال {year}، تلاش {attempt + 1}: {str(e)}")
-            if attempt < MAX_RETRIES - 1:
-                time.sleep(random.uniform(3, 5))
-                continue
-            else:
-                logging.error(f"تلاش‌های مجدد برای سال {year} به پایان رسید")
-                break
+def scrape_year_batch(args):
+    """اسکریپینگ رتبه چند دانشگاه برای یک سال خاص با یک بار بارگذاری صفحه"""
+    universities, year = args
+    logging.info(f"استخراج رتبه {len(universities)} دانشگاه برای سال {year} (Leiden)")
+    result = {name: None for name in universities}
+
+    # با داده کامل CWTS (LEIDEN_BULK_FILE یا LEIDEN_BULK_URL) رتبه بدون مرورگر از جدول محلی خوانده می‌شود
+    ranks = leiden_bulk.lookup(universities, year, FIELD)
+    if ranks is not None:
+        events.emit("matched", system=SYSTEM, year=year, ranks=ranks, source="bulk")
+        return ranks
+
+    # در صورت وجود صفحه معتبر در cache، مرورگری اجرا نمی‌شود
+    url = page_url(year)
+    state = extraction.page_state(PAGE_STATE)
+    html = page_cache.get(SYSTEM, year, url, state)
+    if html is None and page_cache.from_cache_only():
+        page_cache.report_miss(SYSTEM, year)
+        return result
+
+    def attempt():
+        if html is not None:
+            return parse_page(html, universities, year)
+        driver = driver_pool.acquire_driver(SYSTEM)
+        try:
+            fetch_start = time.time()
+            page = fetch_page(driver, year)
+            metrics.record_page_load(driver, SYSTEM, year, time.time() - fetch_start, resource_policy.blocking_enabled())
         finally:
-            if driver:
-                try:
-                    driver.quit()
-                except Exception as e:
-                    logging.error(f"خطا در بستن WebDriver برای سال {year}: {str(e)}")
+            driver_pool.release_driver(driver)
+        if page is None:
+            # صفحه‌ای بارگذاری نشد؛ رتبه‌ها نامعلوم‌اند و نباید به عنوان null ذخیره شوند
+            raise TimeoutError(f"صفحه سال {year} بارگذاری نشد")
+        # صفحه فقط پس از پردازش موفق جدول در cache ذخیره می‌شود
+        ranks = parse_page(page, universities, year)
+        page_cache.put(SYSTEM, year, url, page, state)
+        return ranks
 
-    return result
+    # تکرار فقط برای خطاهای گذرا و پایان مهلت رندر؛ خطای دائمی بلافاصله گزارش می‌شود
+    try:
+        return retry.call(attempt, SYSTEM, year)
+    except Exception:
+        logging.error(f"تلاش‌های مجدد برای سال {year} به پایان رسید")
+        return result
 
-def get_rank(university_name):
-    """تابع اصلی برای استخراج رتبه‌ها با ادغام نتایج قبلی"""
-    previous_ranks = load_previous_rankings()
-    logging.info(f"رتبه‌های قبلی لود شدند: {previous_ranks}")
+def iter_ranks(universities, pool=None):
+    """مولد (سال، {دانشگاه: رتبه}) هر سال به محض پایان استخراج آن (بدون انتظار برای کندترین سال)"""
+    yield from driver_pool.stream_years(scrape_year_batch, [(universities, year) for year in get_years()], pool)
 
-    years = [str(year) for year in range(2013, 2025)]
-    ranks = {year: previous_ranks.get(year, None) for year in years}
+def get_ranks(universities, pool=None):
+    """استخراج رتبه چند دانشگاه؛ هر صفحه فقط یک بار بارگذاری و پردازش می‌شود"""
+    years = get_years()
+    ranks = {name: {year: None for year in years} for name in universities}
 
     start_time = time.time()
-    with Pool(processes=int(os.getenv('NUM_PROCESSES', 3))) as pool:
-        args = [(university_name, year) for year in years]
-        results = pool.map(scrape_year, args)
-    
-    for result in results:
-        for year, rank in result.items():
-            if rank is not None:
-                ranks[year] = rank
-    
-    logging.info(f"استخراج رتبه‌های Leiden برای {university_name} تکمیل شد. زمان اجرا: {time.time() - start_time:.2f} ثانیه")
-    return ranks
\ No newline at end of file
+    for year, result in iter_ranks(universities, pool):
+        for name, rank in result.items():
+            ranks[name][year] = rank
+
+    logging.info(f"استخراج رتبه‌های Leiden برای {len(universities)} دانشگاه تکمیل شد. زمان اجرا: {time.time() - start_time:.2f} ثانیه")
+    return ranks
+
+def get_rank(university_name, pool=None):
+    """تابع اصلی برای استخراج رتبه‌ها با ادغام نتایج قبلی (در صورت ارسال pool، مرورگرهای workerهای آن بازاستفاده می‌شوند)"""
+    previous_ranks = load_previous_rankings(university_name)
+    logging.info(f"رتبه‌های قبلی لود شدند: {previous_ranks}")
+
+    ranks = get_ranks([university_name], pool)[university_name]
+    for year, rank in ranks.items():
+        if rank is None:
+            ranks[year] = previous_ranks.get(year, None)
+    return ranks
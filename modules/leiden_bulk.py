@@ -0,0 +1,224 @@
+import csv
+import logging
+import os
+import sqlite3
+from dotenv import load_dotenv
+from modules import http_client
+from modules.matcher import assign_ranks
+
+# بارگذاری متغیرهای محیطی
+load_dotenv()
+
+INDEX_FILE = "data/cache/leiden_bulk.sqlite"
+DOWNLOAD_DIR = "data/cache"
+# فایل نمونه برای اجرای آفلاین (LEIDEN_BULK_FILE=data/fixtures/leiden_bulk_sample.csv)
+FIXTURE_FILE = "data/fixtures/leiden_bulk_sample.csv"
+FIELD = "All sciences"
+# شاخص پیش‌فرض جدول سایت (PP(top 10%)) و شمارش کسری که سایت به طور پیش‌فرض نشان می‌دهد
+INDICATOR = "PP_top10"
+FRAC_COUNTING = "1"
+# ستون‌هایی که شاخص نیستند
+KEY_COLUMNS = {"university", "country", "region", "field", "period", "frac_counting", "year", "edition"}
+# فاصله سال نسخه رتبه‌بندی از پایان دوره انتشار (نسخه ۲۰۲۴ دوره ۲۰۱۹–۲۰۲۲ را پوشش می‌دهد)
+EDITION_OFFSET = 2
+# ستون‌های رتبه منتشرشده که در صورت وجود در فایل به جای رتبه محاسبه‌شده به کار می‌روند
+RANK_COLUMNS = ("rank_{indicator}", "rank")
+# ستون تعداد انتشارات برای حداقل انتشارات (LEIDEN_MIN_PUBLICATIONS، مانند فیلتر Min. publication output سایت)
+PUBLICATIONS_COLUMN = "impact_p"
+
+_connection = None
+
+def bulk_file():
+    """مسیر فایل داده کامل CWTS: فایل محلی LEIDEN_BULK_FILE یا یک بار دانلود از LEIDEN_BULK_URL"""
+    path = os.getenv('LEIDEN_BULK_FILE')
+    if path:
+        if os.path.exists(path):
+            return path
+        logging.warning(f"فایل داده Leiden یافت نشد: {path}")
+    url = os.getenv('LEIDEN_BULK_URL')
+    if not url:
+        return None
+    extension = ".xlsx" if url.lower().split('?')[0].endswith(".xlsx") else ".csv"
+    path = os.path.join(DOWNLOAD_DIR, f"leiden_bulk{extension}")
+    if not os.path.exists(path):
+        try:
+            response = http_client.get(url)
+            os.makedirs(DOWNLOAD_DIR, exist_ok=True)
+            tmp_file = f"{path}.{os.getpid()}.tmp"
+            with open(tmp_file, 'wb') as f:
+                f.write(response.content)
+            os.replace(tmp_file, path)
+        except Exception as e:
+            logging.error(f"دانلود داده Leiden ناموفق بود: {str(e)}")
+            return None
+    return path
+
+def read_records(path):
+    """ردیف‌های فایل CSV یا XLSX به صورت دیکشنری با نام ستون‌های حروف کوچک"""
+    if path.lower().endswith(".xlsx"):
+        try:
+            from openpyxl import load_workbook
+        except ImportError:
+            logging.error("خواندن فایل XLSX به بسته openpyxl نیاز دارد (pip install openpyxl)")
+            return
+        workbook = load_workbook(path, read_only=True, data_only=True)
+        # داده نتایج در برگه Results یا اولین برگه است
+        sheet = workbook["Results"] if "Results" in workbook.sheetnames else workbook.worksheets[0]
+        rows = sheet.iter_rows(values_only=True)
+        header = [str(value or "").strip().lower() for value in next(rows, [])]
+        for row in rows:
+            yield {header[i]: "" if value is None else str(value).strip() for i, value in enumerate(row) if i < len(header)}
+        workbook.close()
+    else:
+        with open(path, 'r', encoding='utf-8-sig', newline='') as f:
+            for row in csv.DictReader(f):
+                yield {key.strip().lower(): (value or "").strip() for key, value in row.items() if key}
+
+def edition_year(record):
+    """سال نسخه رتبه‌بندی یک ردیف: ستون Year/Edition یا پایان دوره انتشار به علاوه دو سال"""
+    for column in ("year", "edition"):
+        if record.get(column):
+            return str(int(float(record[column])))
+    period = record.get("period", "")
+    return str(int(period.split("–")[-1].split("-")[-1].strip()) + EDITION_OFFSET)
+
+def signature(path):
+    """امضای فایل منبع (مسیر، اندازه، زمان تغییر) برای تشخیص نیاز به بارگذاری دوباره"""
+    stat = os.stat(path)
+    return f"{os.path.abspath(path)}:{stat.st_size}:{int(stat.st_mtime)}"
+
+def ingest(path):
+    """ساخت جدول محلی (دانشگاه، سال، حوزه، شاخص) از فایل کامل؛ فقط آخرین دوره هر نسخه و شمارش کسری نگه داشته می‌شود"""
+    latest_period = {}
+    records = []
+    for record in read_records(path):
+        if not record.get("university"):
+            continue
+        if record.get("frac_counting", FRAC_COUNTING) != FRAC_COUNTING:
+            continue
+        try:
+            year = edition_year(record)
+        except ValueError:
+            continue
+        records.append((year, record))
+        period = record.get("period", "")
+        if period > latest_period.get((year, record.get("field", FIELD)), ""):
+            latest_period[(year, record.get("field", FIELD))] = period
+
+    os.makedirs(os.path.dirname(INDEX_FILE), exist_ok=True)
+    # ساخت در فایل موقت و جایگزینی اتمیک تا workerهای دیگر هرگز جدول نیمه‌کاره نبینند
+    tmp_file = f"{INDEX_FILE}.{os.getpid()}.tmp"
+    if os.path.exists(tmp_file):
+        os.remove(tmp_file)
+    connection = sqlite3.connect(tmp_file)
+    connection.execute("CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT)")
+    connection.execute(
+        "CREATE TABLE indicators (university TEXT, year TEXT, field TEXT, indicator TEXT, value REAL, country TEXT, "
+        "PRIMARY KEY (university, year, field, indicator))"
+    )
+    count = 0
+    for year, record in records:
+        field = record.get("field", FIELD)
+        if record.get("period", "") != latest_period[(year, field)]:
+            continue
+        for column, value in record.items():
+            if column in KEY_COLUMNS or value in ("", None):
+                continue
+            try:
+                number = float(value)
+            except ValueError:
+                continue
+            connection.execute(
+                "INSERT OR REPLACE INTO indicators VALUES (?, ?, ?, ?, ?, ?)",
+                (record["university"], year, field, column, number, record.get("country", "")),
+            )
+            count += 1
+    connection.execute("CREATE INDEX ranking ON indicators (year, field, indicator, value)")
+    connection.execute("INSERT INTO meta VALUES ('signature', ?)", (signature(path),))
+    connection.commit()
+    connection.close()
+    os.replace(tmp_file, INDEX_FILE)
+    logging.info(f"{count} مقدار شاخص Leiden از {path} بارگذاری شد")
+
+def connect():
+    """اتصال به جدول محلی؛ در صورت تغییر فایل منبع جدول دوباره ساخته می‌شود. بدون فایل منبع None"""
+    global _connection
+    if _connection is not None:
+        return _connection
+    path = bulk_file()
+    if path is None:
+        return None
+    try:
+        stored = None
+        if os.path.exists(INDEX_FILE):
+            with sqlite3.connect(INDEX_FILE) as connection:
+                row = connection.execute("SELECT value FROM meta WHERE key = 'signature'").fetchone()
+                stored = row[0] if row else None
+        if stored != signature(path):
+            ingest(path)
+        _connection = sqlite3.connect(INDEX_FILE, check_same_thread=False)
+    except Exception as e:
+        logging.error(f"خطا در ساخت جدول محلی Leiden: {str(e)}")
+        return None
+    return _connection
+
+def years():
+    """سال‌هایی که در جدول محلی داده دارند"""
+    connection = connect()
+    if connection is None:
+        return []
+    return [row[0] for row in connection.execute("SELECT DISTINCT year FROM indicators ORDER BY year")]
+
+def min_publications():
+    """حداقل تعداد انتشارات دانشگاه‌هایی که در رتبه محاسبه‌شده شمرده می‌شوند (پیش‌فرض بدون فیلتر)"""
+    return float(os.getenv('LEIDEN_MIN_PUBLICATIONS') or 0)
+
+def published_ranking(connection, year, field, indicator):
+    """ردیف‌های (رتبه، نام، مقدار) از ستون رتبه منتشرشده در فایل؛ در نبود آن ستون فهرست خالی"""
+    for column in RANK_COLUMNS:
+        rows = connection.execute(
+            "SELECT r.university, r.value, v.value FROM indicators AS r "
+            "LEFT JOIN indicators AS v ON v.university = r.university AND v.year = r.year AND v.field = r.field AND v.indicator = ? "
+            "WHERE r.year = ? AND r.field = ? AND r.indicator = ? ORDER BY r.value, r.university",
+            (indicator.lower(), str(year), field, column.format(indicator=indicator.lower())),
+        ).fetchall()
+        if rows:
+            return [(str(int(rank)), university, value) for university, rank, value in rows]
+    return []
+
+def ranking(year, field=FIELD, indicator=INDICATOR):
+    """ردیف‌های (رتبه، نام، مقدار) یک سال: رتبه منتشرشده فایل یا رتبه محاسبه‌شده از مرتب‌سازی نزولی شاخص
+
+    در رتبه محاسبه‌شده مقدارهای برابر رتبه یکسان می‌گیرند (۱، ۲، ۲، ۴) و دانشگاه‌های با انتشارات کمتر از
+    LEIDEN_MIN_PUBLICATIONS کنار گذاشته می‌شوند.
+    """
+    connection = connect()
+    if connection is None:
+        return []
+    published = published_ranking(connection, year, field, indicator)
+    if published:
+        return published
+    rows = connection.execute(
+        "SELECT i.university, i.value FROM indicators AS i "
+        "LEFT JOIN indicators AS p ON p.university = i.university AND p.year = i.year AND p.field = i.field AND p.indicator = ? "
+        "WHERE i.year = ? AND i.field = ? AND i.indicator = ? AND (p.value IS NULL OR p.value >= ?) "
+        "ORDER BY i.value DESC, i.university",
+        (PUBLICATIONS_COLUMN, str(year), field, indicator.lower(), min_publications()),
+    ).fetchall()
+    result = []
+    for index, (university, value) in enumerate(rows):
+        rank = result[-1][0] if result and value == result[-1][2] else str(index + 1)
+        result.append((rank, university, value))
+    return result
+
+def lookup(universities, year, field=FIELD, indicator=INDICATOR):
+    """رتبه چند دانشگاه در یک سال از جدول محلی؛ اگر سال در داده نباشد None (برای بازگشت به مرورگر)"""
+    rows = ranking(year, field, indicator)
+    if not rows:
+        return None
+    ranks = {}
+    for name, row in assign_ranks(rows, universities).items():
+        ranks[name] = int(row[0]) if row else None
+        if row:
+            logging.info(f"رتبه {name} برای سال {year} از داده کامل Leiden: {row[0]} ({indicator}: {row[2]})")
+    return ranks
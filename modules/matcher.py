@@ -0,0 +1,164 @@
+import re
+import unicodedata
+from bisect import bisect_right
+from modules.universities import get_university
+
+# یکسان‌سازی حروف عربی و فارسی و حذف نیم‌فاصله و کشیده
+CHAR_MAP = str.maketrans({
+    "\u064a": "\u06cc",  # ي → ی
+    "\u0649": "\u06cc",  # ى → ی
+    "\u0643": "\u06a9",  # ك → ک
+    "\u0629": "\u0647",  # ة → ه
+    "\u06c0": "\u0647",  # ۀ → ه
+    "\u0623": "\u0627",  # أ → ا
+    "\u0625": "\u0627",  # إ → ا
+    "\u0671": "\u0627",  # ٱ → ا
+    "\u0624": "\u0648",  # ؤ → و
+    "\u200c": " ",  # نیم‌فاصله
+    "\u200f": None,  # نشانه راست‌به‌چپ
+    "\u0640": None,  # کشیده
+})
+# اعراب عربی که در مقایسه نام‌ها نادیده گرفته می‌شوند
+DIACRITICS = re.compile("[\u064b-\u065f\u0670]")
+WHITESPACE = re.compile(r"\s+")
+# جداکننده ردیف‌ها هنگام اسکن یکجای جدول؛ هیچ الگویی از آن عبور نمی‌کند
+ROW_SEPARATOR = "\n"
+# نویسه کلمه برای بررسی مرز پایان نام‌ها
+WORD = re.compile(r"\w")
+# نوع هر نام در درخت پیشوندی: نام جایگزین دانشگاه یا الگوی استثنای آن
+ALIAS = "alias"
+EXCLUDE = "exclude"
+
+_compiled = {}
+
+def normalize(text):
+    """یکسان‌سازی یونیکد، حروف کوچک و حروف عربی/فارسی برای مقایسه نام‌ها"""
+    text = unicodedata.normalize("NFKC", text or "").casefold().translate(CHAR_MAP)
+    text = DIACRITICS.sub("", text)
+    return WHITESPACE.sub(" ", text).strip()
+
+def _alternation(patterns):
+    """ساخت یک الگوی جایگزینی با اولویت الگوهای طولانی‌تر"""
+    patterns = sorted({normalize(p) for p in patterns if normalize(p)}, key=len, reverse=True)
+    return "|".join(re.escape(p) for p in patterns)
+
+def _add_term(trie, term, output):
+    """افزودن نام نرمال‌شده به درخت پیشوندی؛ کلید None در گره پایانی فهرست (نوع، دانشگاه) است"""
+    node = trie
+    for char in term:
+        node = node.setdefault(char, {})
+    node.setdefault(None, []).append(output)
+
+def compile_matcher(universities):
+    """کامپایل نام‌های جایگزین و الگوهای استثنای همه دانشگاه‌ها در یک عبارت منظم و یک درخت پیشوندی (یک بار در هر اجرا)
+
+    عبارت منظم فقط مکان‌هایی را پیدا می‌کند که یکی از نام‌ها از آنجا شروع می‌شود؛ همه نام‌هایی که از آن مکان
+    شروع می‌شوند (حتی هم‌پوشان) با پیمایش درخت پیشوندی خوانده می‌شوند.
+    """
+    key = tuple(universities)
+    if key in _compiled:
+        return _compiled[key]
+
+    trie = {}
+    terms = set()
+    exact = {}
+    for name in universities:
+        university = get_university(name)
+        for kind, values in ((ALIAS, [name] + university.get("aliases", [])), (EXCLUDE, university.get("exclude", []))):
+            for term in {normalize(value) for value in values} - {""}:
+                _add_term(trie, term, (kind, name))
+                terms.add(term)
+        for value in university.get("exact", []):
+            exact[normalize(value)] = name
+
+    matcher = {
+        "names": list(universities),
+        "starts": re.compile(f"(?<!\\w)(?=(?:{_alternation(terms)})(?!\\w))") if terms else None,
+        "trie": trie,
+        "exact": exact,
+    }
+    _compiled[key] = matcher
+    return matcher
+
+def _terms_at(trie, document, start):
+    """همه نام‌های درخت که در مکان start شروع می‌شوند و به مرز کلمه ختم می‌شوند؛ خروجی (طول، نوع، دانشگاه)"""
+    node = trie
+    for end in range(start, len(document)):
+        node = node.get(document[end])
+        if node is None:
+            return
+        if None in node and not WORD.match(document, end + 1):
+            for kind, name in node[None]:
+                yield end + 1 - start, kind, name
+
+def scan(matcher, texts):
+    """اسکن خطی همه ردیف‌های یک جدول با یک عبارت منظم؛ خروجی {اندیس ردیف: [نام دانشگاه‌ها]}
+
+    همه تطابق‌های هم‌پوشان جمع‌آوری می‌شوند تا نتیجه به ترتیب فهرست دانشگاه‌ها وابسته نباشد؛ ردیفی که با الگوی
+    استثنای یک دانشگاه مطابقت دارد برای آن دانشگاه کنار گذاشته می‌شود. اگر یک ردیف با چند دانشگاه مطابقت کند،
+    دانشگاهی که نام کامل (exact) یا طولانی‌ترین نام جایگزینش پیدا شده انتخاب می‌شود.
+    """
+    normalized = [normalize(text).replace(ROW_SEPARATOR, " ") for text in texts]
+    candidates = {}
+    excluded = set()
+    for row, text in enumerate(normalized):
+        if text in matcher["exact"]:
+            candidates.setdefault(row, {})[matcher["exact"][text]] = len(text) + 1
+
+    if matcher["starts"] is not None and normalized:
+        starts = []
+        offset = 0
+        for text in normalized:
+            starts.append(offset)
+            offset += len(text) + len(ROW_SEPARATOR)
+        document = ROW_SEPARATOR.join(normalized)
+        for found in matcher["starts"].finditer(document):
+            row = bisect_right(starts, found.start()) - 1
+            for length, kind, name in _terms_at(matcher["trie"], document, found.start()):
+                if kind == EXCLUDE:
+                    excluded.add((row, name))
+                else:
+                    found_names = candidates.setdefault(row, {})
+                    found_names[name] = max(found_names.get(name, 0), length)
+
+    results = {}
+    for row, found in candidates.items():
+        # ردیف‌های مستثنا پیش از رقابت با دانشگاه‌های دیگر کنار گذاشته می‌شوند
+        found = {name: length for name, length in found.items() if (row, name) not in excluded}
+        if found:
+            longest = max(found.values())
+            results[row] = [name for name in matcher["names"] if found.get(name) == longest]
+    return results
+
+def build_index(rows):
+    """نمایه نام نرمال‌شده به اولین ردیف، برای جستجوی مستقیم در داده کامل یک سال"""
+    index = {}
+    for row in rows:
+        index.setdefault(normalize(row[1]), row)
+    return index
+
+def lookup_rows(index, rows, universities):
+    """ردیف هر دانشگاه: ابتدا جستجوی مستقیم نام و نام‌های جایگزین در نمایه و سپس اسکن خطی برای بقیه"""
+    assigned = {}
+    missing = []
+    for name in universities:
+        university = get_university(name)
+        for alias in [name] + university.get("exact", []) + university.get("aliases", []):
+            if normalize(alias) in index:
+                assigned[name] = index[normalize(alias)]
+                break
+        else:
+            missing.append(name)
+    if missing:
+        assigned.update(assign_ranks(rows, missing))
+    return assigned
+
+def assign_ranks(rows, universities):
+    """نسبت دادن اولین ردیف مطابق به هر دانشگاه؛ rows فهرست (رتبه، نام، شاخص) است"""
+    assigned = {name: None for name in universities}
+    matches = scan(compile_matcher(universities), [row[1] for row in rows])
+    for index in sorted(matches):
+        for name in matches[index]:
+            if assigned[name] is None:
+                assigned[name] = rows[index]
+    return assigned
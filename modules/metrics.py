@@ -0,0 +1,99 @@
+import json
+import logging
+import os
+import statistics
+import time
+from modules import events
+
+METRICS_DIR = "data/metrics"
+PAGE_LOADS_FILE = os.path.join(METRICS_DIR, "page_loads.jsonl")
+
+# زمان‌بندی بارگذاری صفحه و حجم منابع از Navigation/Resource Timing API مرورگر
+TIMING_SCRIPT = """
+const nav = performance.getEntriesByType('navigation')[0];
+const resources = performance.getEntriesByType('resource');
+return {
+    load_ms: nav ? nav.loadEventEnd - nav.startTime : null,
+    dom_ms: nav ? nav.domContentLoadedEventEnd - nav.startTime : null,
+    document_bytes: nav ? nav.transferSize : null,
+    resource_count: resources.length,
+    resource_bytes: resources.reduce((total, entry) => total + (entry.transferSize || 0), 0)
+};
+"""
+
+def append_record(path, record):
+    """افزودن یک رکورد JSON به فایل JSONL (نوشتن با O_APPEND بین پردازش‌ها تداخل ندارد)"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'a', encoding='utf-8') as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+def record_page_load(driver, system, year, fetch_seconds, blocking):
+    """ثبت زمان بارگذاری و حجم دریافتی یک صفحه برای مقایسه قبل و بعد از حذف منابع"""
+    try:
+        timing = driver.execute_script(TIMING_SCRIPT) or {}
+    except Exception as e:
+        logging.debug(f"خواندن زمان‌بندی صفحه {system} سال {year} ناموفق بود: {str(e)}")
+        timing = {}
+    events.emit("fetched", system=system, year=str(year), source="browser", seconds=round(fetch_seconds, 3))
+    try:
+        append_record(PAGE_LOADS_FILE, {
+            "system": system, "year": str(year), "blocking": blocking,
+            "fetch_seconds": round(fetch_seconds, 3), "recorded_at": time.time(), **timing,
+        })
+    except Exception as e:
+        logging.error(f"خطا در ثبت زمان‌بندی صفحه: {str(e)}")
+
+def record_http_fetch(system, year, fetch_seconds, size):
+    """ثبت زمان دریافت یک صفحه با HTTP برای مقایسه با مرورگر"""
+    events.emit("fetched", system=system, year=str(year), source="http", seconds=round(fetch_seconds, 3), bytes=size)
+    try:
+        append_record(PAGE_LOADS_FILE, {
+            "system": system, "year": str(year), "transport": "http",
+            "fetch_seconds": round(fetch_seconds, 3), "resource_bytes": size, "recorded_at": time.time(),
+        })
+    except Exception as e:
+        logging.error(f"خطا در ثبت زمان‌بندی صفحه: {str(e)}")
+
+def load_records(path=PAGE_LOADS_FILE):
+    """خواندن همه رکوردهای یک فایل JSONL"""
+    records = []
+    if os.path.exists(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+    return records
+
+def summarize_page_loads(records=None):
+    """میانه زمان‌ها و حجم دریافتی به تفکیک منبع و روش دریافت (HTTP، مرورگر با یا بدون حذف منابع)"""
+    groups = {}
+    for record in records if records is not None else load_records():
+        if record.get("transport") == "http":
+            mode = "http"
+        else:
+            mode = "blocked" if record.get("blocking") else "full"
+        groups.setdefault((record["system"], mode), []).append(record)
+    summary = {}
+    for (system, mode), items in sorted(groups.items()):
+        def median(key):
+            values = [item[key] for item in items if item.get(key) is not None]
+            return statistics.median(values) if values else None
+        summary.setdefault(system, {})[mode] = {
+            "samples": len(items),
+            "fetch_seconds": median("fetch_seconds"),
+            "load_ms": median("load_ms"),
+            "bytes": median("resource_bytes"),
+        }
+    return summary
+
+def percentile(values, q):
+    """صدک q (بین ۰ و ۱۰۰) با درون‌یابی خطی"""
+    values = sorted(values)
+    if not values:
+        return None
+    position = (len(values) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
@@ -0,0 +1,205 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import time
+from dotenv import load_dotenv
+from modules import events, rate_limit, retry
+
+# بارگذاری متغیرهای محیطی
+load_dotenv()
+
+CACHE_DIR = "data/cache/pages"
+BLOB_DIR = os.path.join(CACHE_DIR, "blobs")
+REF_DIR = os.path.join(CACHE_DIR, "refs")
+# مدت اعتبار صفحات ذخیره‌شده هر منبع (روز)
+SOURCE_TTL_DAYS = {
+    "leiden": 30,
+    "scimago": 30,
+    "isc": 7,
+    "times": 7,
+    "shanghai": 7,
+}
+DEFAULT_TTL_DAYS = 7
+# حجم ثبت‌شده blobها که با هر نوشتن به‌روز می‌شود تا پیمایش کامل cache فقط هنگام عبور از سقف لازم باشد
+SIZE_FILE = os.path.join(CACHE_DIR, "size.json")
+# پاک‌سازی حجم را تا این کسر از سقف پایین می‌آورد تا نوشتن‌های بعدی بلافاصله دوباره پاک‌سازی نکنند
+EVICT_TARGET = 0.9
+
+def from_cache_only():
+    """حالت --from-cache: فقط صفحات ذخیره‌شده خوانده می‌شوند و هیچ مرورگری اجرا نمی‌شود"""
+    return os.getenv('FROM_CACHE') == 'True'
+
+def report_miss(system, year):
+    """نبود صفحه در حالت --from-cache به عنوان شکست وظیفه (دسته CACHE_MISS) ثبت می‌شود تا نه ذخیره شود و نه نقطه بازیابی بگیرد"""
+    message = f"صفحه {system} سال {year} در cache یافت نشد"
+    logging.warning(message)
+    retry.fail(retry.CACHE_MISS, message)
+
+def max_cache_bytes():
+    """سقف حجم کل cache بر حسب بایت"""
+    return int(float(os.getenv('PAGE_CACHE_MAX_MB', 500)) * 1024 * 1024)
+
+def cache_key(system, year, url, state=""):
+    """کلید یکتای صفحه بر اساس (نظام، سال، URL، وضعیت تعامل)"""
+    raw = json.dumps([system, str(year), url, state], ensure_ascii=False)
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+def _write_atomic(path, data):
+    """نوشتن اتمی فایل تا پردازش‌های هم‌زمان فایل نیمه‌کاره نبینند"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+def blob_sizes():
+    """حجم هر blob بر حسب بایت با کلید هش محتوا"""
+    if not os.path.isdir(BLOB_DIR):
+        return {}
+    sizes = {}
+    for name in os.listdir(BLOB_DIR):
+        if name.endswith('.html.gz'):
+            try:
+                sizes[name[:-len('.html.gz')]] = os.path.getsize(os.path.join(BLOB_DIR, name))
+            except FileNotFoundError:
+                continue
+    return sizes
+
+def update_size(delta=0, total=None):
+    """افزودن delta به حجم ثبت‌شده cache (یا جایگزینی آن با total) زیر قفل فایل؛ خروجی حجم جدید
+
+    اگر شمارنده هنوز ساخته نشده باشد، یک بار با پیمایش blobها (که blob تازه را هم شامل می‌شود) ساخته می‌شود.
+    """
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    with open(SIZE_FILE, 'a+', encoding='utf-8') as f:
+        rate_limit.lock_file(f)
+        try:
+            if total is None:
+                f.seek(0)
+                try:
+                    total = json.loads(f.read())["bytes"] + delta
+                except (ValueError, KeyError, TypeError):
+                    total = sum(blob_sizes().values())
+            f.seek(0)
+            f.truncate()
+            f.write(json.dumps({"bytes": total}))
+            f.flush()
+        finally:
+            rate_limit.unlock_file(f)
+    return total
+
+def get(system, year, url, state=""):
+    """خواندن HTML صفحه از cache؛ در صورت نبود یا انقضا None برمی‌گرداند"""
+    ref_path = os.path.join(REF_DIR, f"{cache_key(system, year, url, state)}.json")
+    try:
+        with open(ref_path, 'r', encoding='utf-8') as f:
+            ref = json.load(f)
+        ttl = SOURCE_TTL_DAYS.get(system, DEFAULT_TTL_DAYS) * 86400
+        if not from_cache_only() and time.time() - ref["fetched_at"] > ttl:
+            logging.debug(f"صفحه ذخیره‌شده {system} سال {year} منقضی شده است")
+            return None
+        with gzip.open(os.path.join(BLOB_DIR, f"{ref['content']}.html.gz"), 'rt', encoding='utf-8') as f:
+            html = f.read()
+        # زمان تغییر ref به عنوان زمان آخرین دسترسی برای LRU به‌روز می‌شود
+        os.utime(ref_path)
+        events.emit("fetched", system=system, year=str(year), source="cache")
+        return html
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logging.error(f"خطا در خواندن cache برای {system} سال {year}: {str(e)}")
+        return None
+
+def put(system, year, url, html, state=""):
+    """ذخیره فشرده HTML صفحه؛ محتوای تکراری فقط یک بار ذخیره می‌شود"""
+    try:
+        os.makedirs(BLOB_DIR, exist_ok=True)
+        os.makedirs(REF_DIR, exist_ok=True)
+        content = hashlib.sha256(html.encode('utf-8')).hexdigest()
+        blob_path = os.path.join(BLOB_DIR, f"{content}.html.gz")
+        new_size = 0
+        if not os.path.exists(blob_path):
+            data = gzip.compress(html.encode('utf-8'))
+            _write_atomic(blob_path, data)
+            new_size = len(data)
+        ref = {"system": system, "year": str(year), "url": url, "state": state,
+               "content": content, "fetched_at": time.time()}
+        ref_path = os.path.join(REF_DIR, f"{cache_key(system, year, url, state)}.json")
+        _write_atomic(ref_path, json.dumps(ref, ensure_ascii=False).encode('utf-8'))
+        # پیمایش و پاک‌سازی cache فقط وقتی حجم ثبت‌شده از سقف بگذرد
+        if new_size and update_size(new_size) > max_cache_bytes():
+            evict()
+    except Exception as e:
+        logging.error(f"خطا در ذخیره cache برای {system} سال {year}: {str(e)}")
+
+def evict():
+    """حذف blobهای بی‌مرجع و کم‌استفاده‌ترین صفحات (LRU) تا حجم cache به EVICT_TARGET سقف برسد؛ شمارنده حجم اصلاح می‌شود"""
+    if not os.path.isdir(REF_DIR):
+        return
+    refs = []
+    for name in os.listdir(REF_DIR):
+        if not name.endswith('.json'):
+            continue
+        path = os.path.join(REF_DIR, name)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                refs.append((os.path.getmtime(path), path, json.load(f)["content"]))
+        except Exception:
+            continue
+    sizes = blob_sizes()
+    live = {}
+    for _, _, content in refs:
+        live[content] = live.get(content, 0) + 1
+    # محتوایی که دیگر هیچ کلیدی به آن اشاره نمی‌کند (مثلاً پس از بازنویسی صفحه) حذف می‌شود
+    # محتوای تازه نوشته‌شده‌ای که ref آن هنوز توسط پردازش دیگری نوشته نشده نگه داشته می‌شود
+    for content in [c for c in sizes if c not in live]:
+        blob_path = os.path.join(BLOB_DIR, f"{content}.html.gz")
+        try:
+            if time.time() - os.path.getmtime(blob_path) < 60:
+                continue
+            os.remove(blob_path)
+        except FileNotFoundError:
+            pass
+        del sizes[content]
+
+    total = sum(sizes.values())
+    if total <= max_cache_bytes():
+        update_size(total=total)
+        return
+    limit = max_cache_bytes() * EVICT_TARGET
+
+    refs.sort()
+    for _, path, content in refs:
+        if total <= limit:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        live[content] -= 1
+        if live[content] == 0 and content in sizes:
+            try:
+                os.remove(os.path.join(BLOB_DIR, f"{content}.html.gz"))
+                total -= sizes[content]
+            except FileNotFoundError:
+                pass
+    update_size(total=total)
+    logging.info(f"حجم cache صفحات پس از پاک‌سازی: {total / 1024 / 1024:.1f} MB")
+
+def iter_pages(system=None):
+    """پیمایش همه صفحات ذخیره‌شده (برای بنچمارک و پردازش دوباره)؛ خروجی (ref، HTML) است"""
+    if not os.path.isdir(REF_DIR):
+        return
+    for name in sorted(os.listdir(REF_DIR)):
+        if not name.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(REF_DIR, name), 'r', encoding='utf-8') as f:
+                ref = json.load(f)
+            if system and ref["system"] != system:
+                continue
+            with gzip.open(os.path.join(BLOB_DIR, f"{ref['content']}.html.gz"), 'rt', encoding='utf-8') as f:
+                yield ref, f.read()
+        except Exception as e:
+            logging.error(f"خطا در خواندن صفحه ذخیره‌شده {name}: {str(e)}")
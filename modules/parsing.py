@@ -0,0 +1,71 @@
+import io
+import logging
+from lxml import etree
+
+# عناصری که برای خواندن جدول لازم نیستند و بلافاصله پس از پردازش آزاد می‌شوند
+DISPOSABLE_TAGS = {"script", "style", "noscript", "svg", "iframe", "template", "head"}
+
+def has_class(element, name):
+    """بررسی وجود یک کلاس CSS در عنصر"""
+    return name in (element.get("class") or "").split()
+
+def find_by_class(element, tag, name):
+    """اولین زیرعنصر با برچسب و کلاس CSS مشخص"""
+    for child in element.iter(tag):
+        if has_class(child, name):
+            return child
+    return None
+
+def text(element):
+    """متن کامل عنصر با فاصله‌های یکسان‌شده"""
+    if element is None:
+        return ""
+    return " ".join("".join(element.itertext()).split())
+
+def matches_container(element, spec):
+    """بررسی تطابق عنصر با مشخصات ظرف جدول (برچسب، id، کلاس‌ها و صفت)"""
+    if element.tag != spec["tag"]:
+        return False
+    if "id" in spec and element.get("id") != spec["id"]:
+        return False
+    if any(not has_class(element, name) for name in spec.get("classes", [])):
+        return False
+    if "attribute" in spec and spec["attribute"] not in element.attrib:
+        return False
+    return True
+
+def find_containers(html, spec):
+    """استخراج فقط ظرف(های) جدول هدف از HTML با پردازش جریانی lxml
+
+    برخلاف ساختن درخت کامل BeautifulSoup، اسکریپت‌ها و استایل‌ها در حین پردازش آزاد می‌شوند
+    و اگر فقط یک ظرف لازم باشد پردازش سند پس از یافتن آن متوقف می‌شود.
+    """
+    containers = []
+    if not html:
+        return containers
+    source = io.BytesIO(html.encode('utf-8') if isinstance(html, str) else html)
+    try:
+        for _, element in etree.iterparse(source, events=("end",), html=True, recover=True,
+                                          huge_tree=True, encoding='utf-8'):
+            if matches_container(element, spec):
+                containers.append(element)
+                if not spec.get("all"):
+                    break
+            elif element.tag in DISPOSABLE_TAGS:
+                element.clear(keep_tail=True)
+    except etree.XMLSyntaxError as e:
+        # پایان ناقص سند؛ ظرف‌های یافت‌شده تا این نقطه معتبرند
+        logging.debug(f"خطای ساختاری HTML هنگام پردازش جریانی: {str(e)}")
+    return containers
+
+def find_rows(html, spec):
+    """همه ردیف‌های جدول(های) هدف به همراه سلول‌های هر ردیف"""
+    rows = []
+    seen = set()
+    for container in find_containers(html, spec):
+        for row in container.iter("tr"):
+            # ردیف‌های جدول‌های تودرتو فقط یک بار شمرده می‌شوند
+            if id(row) not in seen:
+                seen.add(id(row))
+                rows.append((row, row.findall("td")))
+    return rows
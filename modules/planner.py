@@ -0,0 +1,55 @@
+import os
+from modules import scheduler
+
+# سیاست تازگی هر نظام: تعداد آخرین دوره‌هایی که هنوز نهایی نشده‌اند و همیشه دوباره استخراج می‌شوند
+FRESHNESS_POLICY = {
+    "leiden": {"current_cycle": 1},
+    "scimago": {"current_cycle": 1},
+    "isc": {"current_cycle": 1},
+    "times": {"current_cycle": 1},
+    "shanghai": {"current_cycle": 1},
+}
+
+def is_finalized(system, year, years, stored_rank):
+    """سالی نهایی است که رتبه معتبر ذخیره‌شده دارد و جزو دوره جاری نظام نیست"""
+    if stored_rank is None:
+        return False
+    current_cycle = FRESHNESS_POLICY.get(system, {}).get("current_cycle", 1)
+    if current_cycle <= 0:
+        return True
+    return year not in years[-current_cycle:]
+
+def plan_tasks(universities, previous_ranks, incremental=True, systems=None):
+    """تعیین وظایفی که باید اجرا شوند؛ در حالت افزایشی سال‌های نهایی از داده ذخیره‌شده خوانده می‌شوند
+
+    previous_ranks به تفکیک دانشگاه است و هر وظیفه فقط دانشگاه‌هایی را شامل می‌شود که رتبه نهایی ندارند.
+    """
+    tasks = []
+    skipped = []
+    for system in systems or scheduler.SYSTEMS:
+        years = scheduler.SYSTEMS[system].get_years()
+        for year in years:
+            pending = [
+                name for name in universities
+                if not incremental
+                or not is_finalized(system, year, years, previous_ranks.get(name, {}).get(system, {}).get(year))
+            ]
+            task = {"system": system, "year": year, "universities": pending}
+            if pending:
+                tasks.append(task)
+            else:
+                skipped.append({**task, "universities": list(universities)})
+    return tasks, skipped
+
+def print_plan(tasks, skipped, file=None):
+    """چاپ برنامه اجرا (dry-run) همراه با هزینه تخمینی هر وظیفه در file (پیش‌فرض stdout)"""
+    durations = scheduler.load_durations()
+    total = 0.0
+    tasks = scheduler.group_sessions(tasks)
+    print(f"{len(tasks)} وظیفه اجرا می‌شود و {len(skipped)} وظیفه از داده ذخیره‌شده خوانده می‌شود", file=file)
+    for task in sorted(tasks, key=lambda t: scheduler.task_duration(durations, t), reverse=True):
+        cost = scheduler.task_duration(durations, task)
+        total += cost
+        print(f"  {task['system']:<10} {task['year']:<10} ~{cost:.1f}s ({len(task['universities'])} دانشگاه)", file=file)
+    num_processes = int(os.getenv('NUM_PROCESSES', 3))
+    print(f"مجموع هزینه تخمینی: {total:.1f}s (حدود {total / max(1, num_processes):.1f}s با {num_processes} پردازش)", file=file)
@@ -0,0 +1,154 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from contextlib import contextmanager, asynccontextmanager
+from dotenv import load_dotenv
+
+try:
+    import fcntl
+except ImportError:
+    # ویندوز: قفل فایل با msvcrt
+    fcntl = None
+    import msvcrt
+
+# بارگذاری متغیرهای محیطی
+load_dotenv()
+
+# وضعیت سطل توکن و قفل‌های جایگاه هر میزبان بین همه پردازش‌ها در این پوشه مشترک است
+RATE_LIMIT_DIR = "data/cache/rate_limit"
+POLL_SECONDS = 0.05
+
+def rate_limit_enabled():
+    """فعال بودن محدودیت نرخ درخواست به هر میزبان (RATE_LIMIT در .env)"""
+    return os.getenv('RATE_LIMIT', 'True') == 'True'
+
+def parse_budgets(value):
+    """تبدیل رشته‌ای مانند 'host=0.5,host2=2' به دیکشنری بودجه عددی هر میزبان"""
+    budgets = {}
+    for item in (value or "").split(','):
+        if '=' in item:
+            host, budget = item.split('=', 1)
+            budgets[host.strip()] = float(budget)
+    return budgets
+
+def host_rps(host):
+    """حداکثر تعداد درخواست در ثانیه به یک میزبان"""
+    return parse_budgets(os.getenv('HOST_RPS')).get(host, float(os.getenv('DEFAULT_HOST_RPS', 1)))
+
+def host_burst(host):
+    """حداکثر تعداد درخواست پشت‌سرهم مجاز پس از یک دوره بیکاری"""
+    return max(1.0, parse_budgets(os.getenv('HOST_BURST')).get(host, float(os.getenv('DEFAULT_HOST_BURST', 2))))
+
+def host_in_flight(host):
+    """حداکثر تعداد درخواست هم‌زمان به یک میزبان در همه پردازش‌ها (سقف وظایف هم‌زمان زمان‌بند هم از همین گرفته می‌شود)"""
+    return max(1, int(parse_budgets(os.getenv('HOST_IN_FLIGHT')).get(host, float(os.getenv('DEFAULT_HOST_IN_FLIGHT', 2)))))
+
+def lock_file(f, blocking=True):
+    """قفل انحصاری فایل؛ در حالت غیرمسدودکننده اگر قفل آزاد نباشد False برمی‌گرداند"""
+    try:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        if blocking:
+            raise
+        return False
+
+def unlock_file(f):
+    """آزاد کردن قفل فایل"""
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+def reserve_token(host):
+    """برداشتن یک توکن از سطل میزبان؛ خروجی مدت انتظار لازم پیش از ارسال درخواست (ثانیه)
+
+    اگر توکنی نباشد توکن آینده رزرو می‌شود (موجودی منفی) تا درخواست‌های بعدی پشت همین صف قرار بگیرند.
+    """
+    rps = host_rps(host)
+    if rps <= 0:
+        return 0.0
+    os.makedirs(RATE_LIMIT_DIR, exist_ok=True)
+    with open(os.path.join(RATE_LIMIT_DIR, f"{host}.bucket"), 'a+', encoding='utf-8') as f:
+        lock_file(f)
+        try:
+            f.seek(0)
+            try:
+                state = json.loads(f.read() or "{}")
+            except ValueError:
+                state = {}
+            now = time.time()
+            burst = host_burst(host)
+            tokens = min(burst, state.get("tokens", burst) + (now - state.get("updated", now)) * rps)
+            tokens -= 1
+            f.seek(0)
+            f.truncate()
+            f.write(json.dumps({"tokens": tokens, "updated": now}))
+            f.flush()
+        finally:
+            unlock_file(f)
+    return max(0.0, -tokens / rps)
+
+def try_slot(host):
+    """گرفتن یکی از جایگاه‌های هم‌زمانی میزبان؛ خروجی فایل قفل‌شده یا None (قفل با خروج پردازش خودکار آزاد می‌شود)"""
+    os.makedirs(RATE_LIMIT_DIR, exist_ok=True)
+    for index in range(host_in_flight(host)):
+        f = open(os.path.join(RATE_LIMIT_DIR, f"{host}.slot{index}"), 'a+', encoding='utf-8')
+        if lock_file(f, blocking=False):
+            return f
+        f.close()
+    return None
+
+def release_slot(slot):
+    """آزاد کردن جایگاه هم‌زمانی"""
+    try:
+        unlock_file(slot)
+    finally:
+        slot.close()
+
+@contextmanager
+def request(host):
+    """انتظار برای جایگاه هم‌زمانی و توکن میزبان پیش از یک درخواست (همگام)"""
+    if not rate_limit_enabled():
+        yield
+        return
+    start = time.time()
+    slot = try_slot(host)
+    while slot is None:
+        time.sleep(POLL_SECONDS)
+        slot = try_slot(host)
+    try:
+        time.sleep(reserve_token(host))
+        waited = time.time() - start
+        if waited > 1:
+            logging.debug(f"درخواست به {host} {waited:.2f} ثانیه برای محدودیت نرخ منتظر ماند")
+        yield
+    finally:
+        release_slot(slot)
+
+@asynccontextmanager
+async def request_async(host):
+    """انتظار برای جایگاه هم‌زمانی و توکن میزبان پیش از یک درخواست (بدون مسدود کردن حلقه رویداد)
+
+    قفل فایل سطل توکن و جایگاه‌ها در thread جداگانه گرفته می‌شود تا رقابت روی یک میزبان بقیه coroutineها را متوقف نکند.
+    """
+    if not rate_limit_enabled():
+        yield
+        return
+    loop = asyncio.get_running_loop()
+    slot = await loop.run_in_executor(None, try_slot, host)
+    while slot is None:
+        await asyncio.sleep(POLL_SECONDS)
+        slot = await loop.run_in_executor(None, try_slot, host)
+    try:
+        await asyncio.sleep(await loop.run_in_executor(None, reserve_token, host))
+        yield
+    finally:
+        release_slot(slot)
@@ -0,0 +1,172 @@
+import json
+import logging
+import os
+import time
+from collections import deque
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from dotenv import load_dotenv
+from modules import metrics
+
+# بارگذاری متغیرهای محیطی
+load_dotenv()
+
+READINESS_FILE = os.path.join(metrics.METRICS_DIR, "readiness.jsonl")
+# مدت سکوت DOM و شبکه که صفحه پس از آن آماده فرض می‌شود (میلی‌ثانیه)
+QUIET_MS = int(os.getenv('READINESS_QUIET_MS', 300))
+# حداقل نمونه برای جایگزینی مهلت پیش‌فرض با مهلت یادگرفته‌شده
+MIN_SAMPLES = 5
+TIMEOUT_PERCENTILE = 95
+TIMEOUT_FACTOR = float(os.getenv('READINESS_TIMEOUT_FACTOR', 3))
+MIN_TIMEOUT = float(os.getenv('READINESS_MIN_TIMEOUT', 2))
+MAX_TIMEOUT = float(os.getenv('READINESS_MAX_TIMEOUT', 60))
+# تعداد آخرین رکوردهای نگه‌داشته‌شده برای هر (منبع، مرحله)؛ فایل وقتی دو برابر رکوردهای لازم شود فشرده می‌شود
+WINDOW = int(os.getenv('READINESS_WINDOW', 200))
+
+# شمارش درخواست‌های fetch/XHR در جریان؛ با Page.addScriptToEvaluateOnNewDocument پیش از اسکریپت‌های صفحه اجرا می‌شود
+NETWORK_TRACKER = """
+(() => {
+    if (window.__readiness) return;
+    const state = window.__readiness = {inflight: 0, lastNetwork: performance.now()};
+    const started = () => { state.inflight++; state.lastNetwork = performance.now(); };
+    const finished = () => { state.inflight = Math.max(0, state.inflight - 1); state.lastNetwork = performance.now(); };
+    if (window.fetch) {
+        const originalFetch = window.fetch;
+        window.fetch = function () {
+            started();
+            return originalFetch.apply(this, arguments).finally(finished);
+        };
+    }
+    const originalSend = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function () {
+        started();
+        this.addEventListener('loadend', finished, {once: true});
+        return originalSend.apply(this, arguments);
+    };
+})();
+"""
+
+# انتظار تا وجود ردیف‌ها، ثابت ماندن تعداد آن‌ها، سکوت MutationObserver و بیکاری شبکه
+WAIT_SCRIPT = """
+const [selector, minRows, quietMs, timeoutMs, done] = arguments;
+const start = performance.now();
+let lastMutation = start;
+let lastCount = -1;
+const observer = new MutationObserver(() => { lastMutation = performance.now(); });
+observer.observe(document.documentElement, {childList: true, subtree: true, characterData: true});
+const timer = setInterval(() => {
+    const now = performance.now();
+    const count = document.querySelectorAll(selector).length;
+    if (count !== lastCount) { lastCount = count; lastMutation = now; }
+    const network = window.__readiness || {inflight: 0, lastNetwork: 0};
+    const quiet = now - lastMutation >= quietMs && now - network.lastNetwork >= quietMs;
+    if ((count >= minRows && quiet && network.inflight === 0) || now - start >= timeoutMs) {
+        clearInterval(timer);
+        observer.disconnect();
+        done({rows: count, ready: count >= minRows && quiet, elapsed_ms: now - start});
+    }
+}, 50);
+"""
+
+_samples = None
+
+def install(driver):
+    """نصب ردیاب درخواست‌های شبکه برای همه صفحاتی که این مرورگر باز می‌کند"""
+    try:
+        driver.execute_cdp_cmd("Page.addScriptToEvaluateOnNewDocument", {"source": NETWORK_TRACKER})
+    except Exception as e:
+        logging.warning(f"نصب ردیاب شبکه ناموفق بود؛ فقط سکوت DOM بررسی می‌شود: {str(e)}")
+
+def compact(records):
+    """بازنویسی اتمی فایل زمان‌های آمادگی فقط با آخرین رکوردهای هر (منبع، مرحله)"""
+    tmp_file = f"{READINESS_FILE}.{os.getpid()}.tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    os.replace(tmp_file, READINESS_FILE)
+
+def load_samples():
+    """آخرین WINDOW زمان آمادگی ثبت‌شده به تفکیک (منبع، مرحله)؛ فقط یک بار در هر پردازش خوانده می‌شود"""
+    global _samples
+    if _samples is None:
+        records = metrics.load_records(READINESS_FILE)
+        recent = {}
+        for record in records:
+            recent.setdefault((record["system"], record["step"]), deque(maxlen=WINDOW)).append(record)
+        kept = sum(len(window) for window in recent.values())
+        if len(records) > 2 * kept:
+            # رکوردهای قدیمی‌تر از پنجره دیگر در محاسبه مهلت‌ها استفاده نمی‌شوند
+            kept_ids = {id(record) for window in recent.values() for record in window}
+            try:
+                compact([record for record in records if id(record) in kept_ids])
+            except Exception as e:
+                logging.error(f"خطا در فشرده‌سازی فایل زمان‌های آمادگی: {str(e)}")
+        _samples = {
+            key: deque((record["seconds"] for record in window if record.get("ready")), maxlen=WINDOW)
+            for key, window in recent.items()
+        }
+    return _samples
+
+def timeout(system, step, default):
+    """مهلت انتظار یک مرحله: صدک ۹۵ زمان‌های ثبت‌شده ضربدر ضریب اطمینان، محدود به بازه مجاز"""
+    samples = load_samples().get((system, step), [])
+    if len(samples) < MIN_SAMPLES:
+        return default
+    learned = metrics.percentile(samples, TIMEOUT_PERCENTILE) * TIMEOUT_FACTOR
+    return min(MAX_TIMEOUT, max(MIN_TIMEOUT, learned))
+
+def record(system, step, seconds, ready):
+    """ثبت زمان آمادگی یک مرحله برای یادگیری مهلت‌ها"""
+    if ready:
+        load_samples().setdefault((system, step), deque(maxlen=WINDOW)).append(seconds)
+    try:
+        metrics.append_record(READINESS_FILE, {
+            "system": system, "step": step, "seconds": round(seconds, 3), "ready": ready, "recorded_at": time.time(),
+        })
+    except Exception as e:
+        logging.error(f"خطا در ثبت زمان آمادگی: {str(e)}")
+
+def wait_for(driver, system, step, condition, default=10, budget=None):
+    """انتظار برای یک شرط WebDriverWait با مهلت یادگرفته‌شده برای این منبع و مرحله (حداکثر budget ثانیه، در صورت ارسال)"""
+    limit = timeout(system, step, default)
+    if budget is not None:
+        limit = max(0.0, min(limit, budget))
+    start = time.time()
+    try:
+        result = WebDriverWait(driver, limit, poll_frequency=0.1).until(condition)
+    except Exception:
+        record(system, step, time.time() - start, False)
+        raise
+    record(system, step, time.time() - start, True)
+    return result
+
+def wait_for_element(driver, system, step, locator, default=10):
+    """انتظار برای حضور یک عنصر با مهلت یادگرفته‌شده"""
+    return wait_for(driver, system, step, EC.presence_of_element_located(locator), default)
+
+def wait_for_rows(driver, system, step, selector, default=10, min_rows=1):
+    """انتظار تا ردیف‌های جدول حاضر و پایدار شوند و DOM و شبکه ساکت شوند؛ خروجی تعداد ردیف‌ها
+
+    اگر اجرای اسکریپت ناهمگام ممکن نباشد (مثلاً جابه‌جایی صفحه در حین انتظار)، به انتظار ساده حضور ردیف بازمی‌گردد؛
+    این انتظار فقط باقی‌مانده همان مهلت را دارد تا کل انتظار از مهلت یادگرفته‌شده بیشتر نشود.
+    """
+    limit = timeout(system, step, default)
+    start = time.time()
+    try:
+        driver.set_script_timeout(limit + 5)
+        status = driver.execute_async_script(WAIT_SCRIPT, selector, min_rows, QUIET_MS, limit * 1000)
+    except Exception as e:
+        logging.debug(f"انتظار رویدادمحور برای {system}/{step} ممکن نشد: {str(e)}")
+        elapsed = time.time() - start
+        record(system, step, elapsed, False)
+        rows = wait_for(driver, system, f"{step}:presence", EC.presence_of_all_elements_located((By.CSS_SELECTOR, selector)),
+                        default, budget=limit - elapsed)
+        return len(rows)
+    record(system, step, time.time() - start, status["ready"])
+    if status["rows"] < min_rows:
+        raise TimeoutError(f"ردیف‌های {selector} برای {system} در {limit:.1f} ثانیه آماده نشدند ({status['rows']} ردیف)")
+    if not status["ready"]:
+        # ردیف‌ها حاضرند ولی صفحه هرگز ساکت نشد (مثلاً انیمیشن دائمی)؛ با همین ردیف‌ها ادامه داده می‌شود
+        logging.warning(f"صفحه {system}/{step} در {limit:.1f} ثانیه ساکت نشد؛ ادامه با {status['rows']} ردیف")
+    return status["rows"]
@@ -0,0 +1,49 @@
+import logging
+import os
+from dotenv import load_dotenv
+
+# بارگذاری متغیرهای محیطی
+load_dotenv()
+
+# الگوهای درخواست‌هایی که برای خواندن رتبه لازم نیستند (قالب Network.setBlockedURLs)
+RESOURCE_PATTERNS = {
+    "images": ["*.png", "*.jpg", "*.jpeg", "*.gif", "*.webp", "*.svg", "*.ico", "*.bmp"],
+    "fonts": ["*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot", "*fonts.googleapis.com*", "*fonts.gstatic.com*"],
+    "css": ["*.css", "*.css?*"],
+    "media": ["*.mp4", "*.webm", "*.mp3"],
+    "analytics": [
+        "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*", "*googlesyndication.com*",
+        "*facebook.net*", "*connect.facebook.com*", "*hotjar.com*", "*clarity.ms*", "*cookiebot.com*",
+        "*onetrust.com*", "*cookielaw.org*", "*scorecardresearch.com*", "*quantserve.com*", "*twitter.com/i/*",
+        "*linkedin.com/px*", "*cdn.segment.com*", "*yandex.ru/metrika*", "*mc.yandex.ru*", "*baidu.com/hm.js*",
+    ],
+}
+# سیاست هر منبع؛ در صفحاتی که با فرم‌ها تعامل داریم (ISC و ARWU) CSS حذف نمی‌شود تا عناصر قابل تعامل بمانند
+RESOURCE_POLICY = {
+    "leiden": ["images", "fonts", "css", "media", "analytics"],
+    "scimago": ["images", "fonts", "css", "media", "analytics"],
+    "isc": ["images", "fonts", "media", "analytics"],
+    "times": ["images", "fonts", "css", "media", "analytics"],
+    "shanghai": ["images", "fonts", "media", "analytics"],
+}
+
+def blocking_enabled():
+    """فعال بودن حذف منابع غیرضروری (BLOCK_RESOURCES در .env)"""
+    return os.getenv('BLOCK_RESOURCES', 'True') == 'True'
+
+def blocked_urls(system):
+    """الگوهای URL مسدودشده برای یک منبع"""
+    if not blocking_enabled():
+        return []
+    patterns = []
+    for category in RESOURCE_POLICY.get(system, []):
+        patterns.extend(RESOURCE_PATTERNS[category])
+    return patterns
+
+def apply(driver, system):
+    """اعمال سیاست منبع روی مرورگر با Chrome DevTools Protocol (برای هر وظیفه دوباره تنظیم می‌شود)"""
+    try:
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": blocked_urls(system)})
+    except Exception as e:
+        logging.warning(f"اعمال سیاست منابع برای {system} ناموفق بود: {str(e)}")
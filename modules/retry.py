@@ -0,0 +1,110 @@
+import json
+import logging
+import os
+import random
+import threading
+import time
+import httpx
+from dotenv import load_dotenv
+from selenium.common.exceptions import (
+    TimeoutException, WebDriverException, NoSuchElementException,
+    InvalidSelectorException, StaleElementReferenceException
+)
+
+# بارگذاری متغیرهای محیطی
+load_dotenv()
+
+# دسته‌های خطا
+TRANSIENT = "transient"
+RENDER_TIMEOUT = "render_timeout"
+PERMANENT = "permanent"
+CIRCUIT_OPEN = "circuit_open"
+# صفحه وظیفه در حالت --from-cache ذخیره نشده است؛ نتیجه‌ای ندارد و سایت هم درخواستی دریافت نکرده است
+CACHE_MISS = "cache_miss"
+# حداکثر تعداد تلاش برای هر دسته؛ خطای دائمی (نبود داده، تغییر ساختار صفحه) تکرار نمی‌شود
+MAX_ATTEMPTS = {
+    TRANSIENT: int(os.getenv('RETRY_MAX_ATTEMPTS', 3)),
+    RENDER_TIMEOUT: int(os.getenv('RETRY_RENDER_ATTEMPTS', 2)),
+    PERMANENT: 1,
+}
+BACKOFF_BASE = float(os.getenv('RETRY_BACKOFF_BASE', 1.0))
+BACKOFF_MAX = float(os.getenv('RETRY_BACKOFF_MAX', 30.0))
+# تعداد شکست‌های پیاپی یک میزبان که مدار آن را باز می‌کند و مدت باز ماندن مدار
+CIRCUIT_THRESHOLD = int(os.getenv('CIRCUIT_THRESHOLD', 3))
+CIRCUIT_COOLDOWN = float(os.getenv('CIRCUIT_COOLDOWN', 300))
+
+# آخرین شکست نهایی در همین thread (برای گزارش به زمان‌بند بدون تغییر خروجی توابع استخراج)
+_local = threading.local()
+
+def classify(error):
+    """دسته خطا: شبکه گذرا، پایان مهلت رندر یا دائمی (پردازش یا نبود داده)"""
+    if isinstance(error, httpx.HTTPStatusError):
+        status = error.response.status_code
+        return TRANSIENT if status == 429 or status >= 500 else PERMANENT
+    if isinstance(error, (httpx.TransportError, ConnectionError)):
+        return TRANSIENT
+    if isinstance(error, (TimeoutException, TimeoutError, StaleElementReferenceException)):
+        return RENDER_TIMEOUT
+    if isinstance(error, (NoSuchElementException, InvalidSelectorException)):
+        return PERMANENT
+    if isinstance(error, (WebDriverException, OSError)):
+        return TRANSIENT
+    if isinstance(error, (KeyError, IndexError, ValueError, TypeError, AttributeError, json.JSONDecodeError)):
+        return PERMANENT
+    return TRANSIENT
+
+def delay(attempt):
+    """مکث پیش از تلاش مجدد: backoff نمایی با jitter کامل"""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+def fail(category, error):
+    """ثبت شکست نهایی یک وظیفه در thread جاری"""
+    _local.failure = (category, str(error))
+
+def take_failure():
+    """خواندن و پاک کردن آخرین شکست نهایی thread جاری؛ خروجی (دسته، پیام) یا None"""
+    failure = getattr(_local, "failure", None)
+    _local.failure = None
+    return failure
+
+def call(attempt_fn, system, label):
+    """اجرای یک تلاش با تکرار بر اساس دسته خطا؛ پس از آخرین تلاش خطا دوباره برانگیخته می‌شود"""
+    attempt = 0
+    while True:
+        try:
+            return attempt_fn()
+        except Exception as e:
+            category = classify(e)
+            logging.error(f"خطای {category} در {system} سال {label}، تلاش {attempt + 1}: {str(e)}")
+            attempt += 1
+            if attempt >= MAX_ATTEMPTS[category]:
+                fail(category, e)
+                raise
+            time.sleep(delay(attempt - 1))
+
+def circuit_open(breakers, host):
+    """آیا مدار میزبان باز است؛ پس از CIRCUIT_COOLDOWN یک وظیفه آزمایشی اجازه اجرا می‌گیرد"""
+    state = breakers.get(host)
+    if not state or state["opened_at"] is None:
+        return False
+    if time.time() - state["opened_at"] >= CIRCUIT_COOLDOWN:
+        # نیمه‌باز: یک شکست دیگر مدار را دوباره باز می‌کند
+        state["opened_at"] = None
+        state["failures"] = CIRCUIT_THRESHOLD - 1
+        logging.info(f"مدار {host} نیمه‌باز شد")
+        return False
+    return True
+
+def record_result(breakers, host, category):
+    """به‌روزرسانی مدار میزبان با نتیجه یک وظیفه (category=None برای موفقیت)"""
+    if category in (CIRCUIT_OPEN, CACHE_MISS):
+        return
+    state = breakers.setdefault(host, {"failures": 0, "opened_at": None})
+    if category is None or category == PERMANENT:
+        # خطای دائمی یعنی سایت پاسخ داده است
+        state["failures"] = 0
+        return
+    state["failures"] += 1
+    if state["failures"] >= CIRCUIT_THRESHOLD and state["opened_at"] is None:
+        state["opened_at"] = time.time()
+        logging.error(f"مدار {host} پس از {state['failures']} شکست پیاپی باز شد؛ وظایف باقی‌مانده این میزبان فوراً رد می‌شوند")
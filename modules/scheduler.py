@@ -0,0 +1,272 @@
+import json
+import logging
+import os
+import queue
+import time
+from collections import Counter
+from multiprocessing import Pool
+from dotenv import load_dotenv
+from modules import leiden, scimago, isc, times, shanghai, driver_pool, retry, rate_limit, storage, events
+
+# بارگذاری متغیرهای محیطی
+load_dotenv()
+
+# ترتیب نظام‌ها همان ترتیب خروجی JSON است
+SYSTEMS = {
+    "leiden": leiden,
+    "scimago": scimago,
+    "isc": isc,
+    "times": times,
+    "shanghai": shanghai,
+}
+DURATIONS_FILE = "data/task_durations.json"
+DEFAULT_TASK_SECONDS = 30.0
+# وزن اندازه‌گیری جدید در میانگین نمایی مدت وظایف
+DURATION_SMOOTHING = 0.5
+
+def host_limit(host):
+    """سقف تعداد وظایف هم‌زمان برای یک میزبان؛ همان سقف درخواست‌های هم‌زمان محدودکننده نرخ (HOST_IN_FLIGHT)"""
+    return rate_limit.host_in_flight(host)
+
+def load_durations():
+    """خواندن مدت اجرای تاریخی هر وظیفه (نظام، سال)"""
+    if os.path.exists(DURATIONS_FILE):
+        try:
+            with open(DURATIONS_FILE, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logging.error(f"خطا در خواندن فایل مدت وظایف: {str(e)}")
+    return {}
+
+def save_durations(durations):
+    """ذخیره مدت اجرای وظایف برای زمان‌بندی اجراهای بعدی"""
+    os.makedirs(os.path.dirname(DURATIONS_FILE), exist_ok=True)
+    tmp_file = f"{DURATIONS_FILE}.tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(durations, f, indent=2, ensure_ascii=False)
+    os.replace(tmp_file, DURATIONS_FILE)
+
+def estimate_duration(durations, system, year):
+    """تخمین مدت یک وظیفه از روی سابقه؛ در نبود سابقه میانگین همان نظام به کار می‌رود"""
+    history = durations.get(system, {})
+    if year in history:
+        return history[year]
+    if history:
+        return sum(history.values()) / len(history)
+    return DEFAULT_TASK_SECONDS
+
+def task_years(task):
+    """سال‌های یک وظیفه؛ وظیفه جلسه‌ای چند سال را در یک جلسه مرورگر پوشش می‌دهد"""
+    return task["years"] if "years" in task else [task["year"]]
+
+def task_duration(durations, task):
+    """تخمین مدت یک وظیفه (برای وظیفه جلسه‌ای مجموع تخمین سال‌های آن)"""
+    return sum(estimate_duration(durations, task["system"], year) for year in task_years(task))
+
+def group_sessions(tasks):
+    """ادغام وظایف سال‌به‌سال نظام‌هایی که حالت جلسه دارند در یک وظیفه برای هر مجموعه دانشگاه"""
+    grouped = []
+    sessions = {}
+    for task in tasks:
+        module = SYSTEMS[task["system"]]
+        if not (hasattr(module, "scrape_years_batch") and module.session_sweep_enabled()):
+            grouped.append(task)
+            continue
+        key = (task["system"], tuple(task["universities"]))
+        if key not in sessions:
+            sessions[key] = {"system": task["system"], "years": [], "universities": list(task["universities"])}
+            grouped.append(sessions[key])
+        sessions[key]["years"].extend(task_years(task))
+    for session in sessions.values():
+        session["year"] = f"{session['years'][0]}..{session['years'][-1]}" if len(session["years"]) > 1 else session["years"][0]
+    return grouped
+
+def remove_completed(tasks, completed):
+    """حذف (نظام، سال، دانشگاه)هایی که در اجرای ادامه‌داده‌شده تکمیل شده‌اند؛ وظایف خالی حذف می‌شوند"""
+    remaining = []
+    for task in tasks:
+        universities = [
+            name for name in task["universities"]
+            if any((task["system"], year, name) not in completed for year in task_years(task))
+        ]
+        if universities:
+            remaining.append({**task, "universities": universities})
+    return remaining
+
+def build_tasks(universities, systems=None):
+    """ساخت گراف وظایف: یک وظیفه برای هر (نظام، سال) که همه دانشگاه‌ها را با یک بار بارگذاری صفحه پوشش می‌دهد"""
+    tasks = []
+    for system in systems or SYSTEMS:
+        for year in SYSTEMS[system].get_years():
+            tasks.append({"system": system, "year": year, "universities": list(universities)})
+    return tasks
+
+def run_task(task):
+    """اجرای یک وظیفه در worker و اندازه‌گیری مدت آن؛ رتبه‌ها به صورت {سال: {دانشگاه: رتبه}} برگردانده می‌شوند"""
+    start_time = time.time()
+    module = SYSTEMS[task["system"]]
+    retry.take_failure()
+    storage.take_indicators()
+    try:
+        if "years" in task:
+            ranks = module.scrape_years_batch((task["universities"], task["years"]))
+        else:
+            ranks = {task["year"]: module.scrape_year_batch((task["universities"], task["year"]))}
+        # توابع استخراج خطا را برنمی‌انگیزند؛ شکست نهایی پس از تلاش‌های مجدد از retry خوانده می‌شود
+        category, error = retry.take_failure() or (None, None)
+    except Exception as e:
+        ranks = {}
+        category, error = retry.classify(e), str(e)
+    return {**task, "ranks": ranks, "indicators": storage.take_indicators(), "error": error, "category": category,
+            "duration": time.time() - start_time}
+
+def split_session(outcome):
+    """جدا کردن سال‌هایی از وظیفه جلسه‌ای که نتیجه‌ای نداشتند (مثلاً خروجی SCImago ناموفق)؛ خروجی (نتیجه، وظایف سال‌به‌سال)"""
+    if "years" not in outcome or outcome["error"]:
+        return outcome, []
+    missing = [year for year in outcome["years"] if year not in outcome["ranks"]]
+    if not missing:
+        return outcome, []
+    tasks = [{"system": outcome["system"], "year": year, "universities": list(outcome["universities"])} for year in missing]
+    return {**outcome, "years": [year for year in outcome["years"] if year in outcome["ranks"]]}, tasks
+
+def circuit_outcome(task):
+    """نتیجه فوری وظیفه‌ای که مدار میزبانش باز است (بدون اجرای مرورگر)"""
+    host = SYSTEMS[task["system"]].HOST
+    return {**task, "ranks": {}, "error": f"مدار {host} باز است", "category": retry.CIRCUIT_OPEN, "duration": 0.0}
+
+def record_circuit(breakers, outcome):
+    """به‌روزرسانی مدار میزبان یک وظیفه با نتیجه آن"""
+    category = outcome.get("category", retry.TRANSIENT) if outcome["error"] else None
+    retry.record_result(breakers, SYSTEMS[outcome["system"]].HOST, category)
+
+def empty_rankings(universities, systems, tasks):
+    """ساختار خروجی {دانشگاه: {نظام: {سال: None}}} برای همه سال‌های وظایف"""
+    rankings = {name: {system: {} for system in (systems or SYSTEMS)} for name in universities}
+    for task in tasks:
+        for name in task["universities"]:
+            for year in task_years(task):
+                rankings[name].setdefault(task["system"], {})[year] = None
+    return rankings
+
+def add_ranks(outcome, rankings):
+    """افزودن رتبه‌های یک وظیفه به خروجی {دانشگاه: {نظام: {سال: رتبه}}}"""
+    for year, ranks in outcome["ranks"].items():
+        for name, rank in ranks.items():
+            rankings[name][outcome["system"]][year] = rank
+
+def record_outcome(outcome, durations, rankings=None):
+    """ثبت نتیجه یک وظیفه در جدول رتبه‌ها (و خروجی، در صورت ارسال) و به‌روزرسانی میانگین نمایی مدت سال‌های آن"""
+    if outcome["error"]:
+        logging.error(f"خطا در وظیفه {outcome['system']} سال {outcome['year']}: {outcome['error']}")
+        events.emit("failed", system=outcome["system"], year=outcome["year"], category=outcome.get("category"), error=outcome["error"])
+    else:
+        # مدت وظیفه جلسه‌ای به طور مساوی بین سال‌های آن تقسیم می‌شود
+        years = task_years(outcome)
+        measured = outcome["duration"] / max(1, len(years))
+        for year in years:
+            previous = durations.setdefault(outcome["system"], {}).get(year)
+            durations[outcome["system"]][year] = (
+                measured if previous is None
+                else DURATION_SMOOTHING * measured + (1 - DURATION_SMOOTHING) * previous
+            )
+        events.emit("completed", system=outcome["system"], year=outcome["year"], ranks=outcome["ranks"], seconds=round(outcome["duration"], 3))
+    if rankings is not None:
+        add_ranks(outcome, rankings)
+    # رتبه‌های هر وظیفه بلافاصله در جدول رتبه‌ها ثبت می‌شوند؛ وظیفه بدون خطا نقطه بازیابی هم دارد
+    completed_years = [] if outcome["error"] else task_years(outcome)
+    ranks = outcome["ranks"]
+    if outcome["error"]:
+        # رتبه None در وظیفه ناموفق یعنی نامعلوم، نه خارج شدن از رتبه‌بندی؛ رتبه قبلی نباید با آن جایگزین شود
+        ranks = {year: {name: rank for name, rank in by_name.items() if rank is not None} for year, by_name in ranks.items()}
+    indicators = outcome.get("indicators")
+    if ranks or completed_years or indicators:
+        try:
+            storage.record_task(outcome["system"], ranks, completed_years, outcome["universities"], indicators)
+        except Exception as e:
+            logging.error(f"خطا در ثبت رتبه‌های {outcome['system']} سال {outcome['year']}: {str(e)}")
+
+def dispatch(pool, pending, workers, runner=run_task):
+    """ارسال وظایف به pool با سقف هم‌زمانی هر میزبان؛ نتیجه‌ها به ترتیب پایان تولید (yield) می‌شوند
+
+    پس از CIRCUIT_THRESHOLD شکست پیاپی یک میزبان، وظایف باقی‌مانده آن بدون اجرا رد می‌شوند.
+    """
+    completed = queue.Queue()
+    in_flight = Counter()
+    breakers = {}
+    running = 0
+    while pending or running:
+        # ارسال وظایفی که میزبانشان هنوز به سقف هم‌زمانی نرسیده است
+        index = 0
+        while running < workers and index < len(pending):
+            task = pending[index]
+            host = SYSTEMS[task["system"]].HOST
+            if in_flight[host] >= host_limit(host):
+                index += 1
+                continue
+            if retry.circuit_open(breakers, host):
+                yield circuit_outcome(pending.pop(index))
+                continue
+            pending.pop(index)
+            in_flight[host] += 1
+            running += 1
+            events.emit("started", system=task["system"], year=task["year"], universities=len(task["universities"]))
+            pool.apply_async(
+                runner, (task,),
+                callback=completed.put,
+                error_callback=lambda e, task=task: completed.put({**task, "ranks": {}, "error": str(e), "category": retry.classify(e), "duration": 0.0})
+            )
+
+        if not running:
+            continue
+        outcome = completed.get()
+        running -= 1
+        in_flight[SYSTEMS[outcome["system"]].HOST] -= 1
+        record_circuit(breakers, outcome)
+        # سال‌های بی‌نتیجه وظیفه جلسه‌ای به صورت وظایف جداگانه به صف برمی‌گردند تا موازی اجرا شوند
+        outcome, retries = split_session(outcome)
+        pending.extend(retries)
+        yield outcome
+
+def stream(universities, systems=None, tasks=None, pool=None, workers=None, runner=run_task):
+    """مولد نتیجه وظایف به محض پایان هر کدام (رتبه‌ها پیش از yield در جدول رتبه‌ها ثبت شده‌اند)
+
+    وظایف روی یک Pool مشترک با سقف هم‌زمانی هر میزبان و ترتیب طولانی‌ترین-اول اجرا می‌شوند؛ در صورت ارسال pool
+    (مثلاً ThreadPool پشتیبان چندزمینه‌ای مرورگر)، وظایف با runner روی همان pool اجرا می‌شوند.
+    """
+    durations = load_durations()
+    if tasks is None:
+        tasks = build_tasks(universities, systems)
+    tasks = group_sessions(tasks)
+    pending = sorted(tasks, key=lambda t: task_duration(durations, t), reverse=True)
+    start_time = time.time()
+
+    try:
+        if pool is None:
+            num_processes = int(os.getenv('NUM_PROCESSES', 3))
+            with Pool(processes=num_processes, initializer=driver_pool.init_worker) as own_pool:
+                for outcome in dispatch(own_pool, pending, num_processes, runner):
+                    record_outcome(outcome, durations)
+                    yield outcome
+                # بستن منظم workerها تا مرورگرها هنگام خروج بسته شوند
+                own_pool.close()
+                own_pool.join()
+        else:
+            for outcome in dispatch(pool, pending, workers, runner):
+                record_outcome(outcome, durations)
+                yield outcome
+    finally:
+        try:
+            save_durations(durations)
+        except Exception as e:
+            logging.error(f"خطا در ذخیره مدت وظایف: {str(e)}")
+    logging.info(f"اجرای {len(tasks)} وظیفه برای {len(universities)} دانشگاه تکمیل شد. زمان اجرا: {time.time() - start_time:.2f} ثانیه")
+
+def run(universities, systems=None, tasks=None, pool=None, workers=None, runner=run_task):
+    """اجرای همه وظایف و جمع‌آوری نتیجه‌ها؛ خروجی به تفکیک دانشگاه است"""
+    if tasks is None:
+        tasks = build_tasks(universities, systems)
+    rankings = empty_rankings(universities, systems, tasks)
+    for outcome in stream(universities, systems, tasks, pool, workers, runner):
+        add_ranks(outcome, rankings)
+    return rankings
@@ -1,18 +1,13 @@
+import asyncio
+import csv
+import io
 import logging
 import time
-import json
 import os
-from multiprocessing import Pool
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from bs4 import BeautifulSoup
-import random
+from urllib.parse import quote
 from dotenv import load_dotenv
+from modules import driver_pool, page_cache, parsing, extraction, metrics, resource_policy, readiness, retry, rate_limit, storage, events, http_client, year_discovery
+from modules.matcher import assign_ranks
 
 # بارگذاری متغیرهای محیطی
 load_dotenv()
@@ -26,145 +21,352 @@ logging.basicConfig(
 )
 
 UNIVERSITY_NAME = "Ferdowsi University of Mashhad"
-MAX_RETRIES = 3
-JSON_FILE = "data/university_rankings.json"
+HOST = "www.scimagoir.com"
+# نشانی پایه سایت (SCIMAGO_BASE_URL برای اجرا روی سرور نمونه محلی)
+BASE_URL = os.getenv('SCIMAGO_BASE_URL') or f"https://{HOST}"
+SYSTEM = "scimago"
+# ظرف جدول رتبه‌بندی در صفحه
+CONTAINER = {"tag": "div", "id": "tablewrapper"}
+# ردیف‌هایی که آماده بودن صفحه با پایدار شدن تعداد آن‌ها سنجیده می‌شود
+ROW_SELECTOR = "#tablewrapper tr"
+# جدول در HTML سرور رندر می‌شود و بدون مرورگر قابل دریافت است
+HTTP_FETCHABLE = True
+SECTOR = "Higher educ"
+# خروجی CSV/XLSX همان جدول (out=xls) که رتبه جهانی و کشوری همه مؤسسات را دارد
+EXPORT_STATE = "export"
+# شاخص‌های جدول رتبه‌ها برای رتبه جهانی و کشوری همه مؤسسات جدول (با نام منتشرشده مؤسسه)
+GLOBAL_INDICATOR = "global_rank"
+COUNTRY_INDICATOR = "country_rank"
+EXPORT_CONCURRENCY = int(os.getenv('SCIMAGO_EXPORT_CONCURRENCY', 4))
+# استخراج‌کننده درون مرورگر: فقط (رتبه جهانی، نام، رتبه کشوری) ردیف‌های جدول برگردانده می‌شود
+JS_EXTRACTOR = """
+const rows = [];
+document.querySelectorAll('#tablewrapper tr').forEach(tr => {
+    const cells = tr.querySelectorAll(':scope > td');
+    if (cells.length >= 3 && cells[1].classList.contains('ranknumber')) {
+        const span = cells[1].querySelector('span.global_ranking');
+        const match = span ? span.textContent.trim().match(/^\\((\\d+)\\)$/) : null;
+        if (match) {
+            const country = cells[1].firstChild ? (cells[1].firstChild.textContent || '').trim() : '';
+            rows.push([match[1], cells[2].textContent.replace(/\\s+/g, ' ').trim(), country]);
+        }
+    }
+});
+return rows;
+"""
 
-def load_previous_rankings():
-    """خواندن رتبه‌های قبلی از فایل JSON"""
-    if os.path.exists(JSON_FILE):
+def load_previous_rankings(university_name):
+    """خواندن آخرین رتبه‌های ذخیره‌شده یک دانشگاه در این نظام از جدول رتبه‌ها"""
+    try:
+        return storage.system_rankings(university_name, SYSTEM)
+    except Exception as e:
+        logging.error(f"خطا در خواندن جدول رتبه‌ها: {str(e)}")
+        return {}
+
+# فهرست سال‌ها در صورت ناموفق بودن کشف سال‌های منتشرشده
+DEFAULT_YEARS = [str(year) for year in range(2011, 2025)]
+
+def discover_years():
+    """سال‌های منتشرشده از گزینه‌های فهرست سال صفحه rankings.php (سال داده + ۵)"""
+    html = http_client.get_text(f"{BASE_URL}/rankings.php?country=IRN&sector={quote(SECTOR)}")
+    years = [str(int(value) + 5) for value, _ in year_discovery.select_options(html, "year") if value.isdigit()]
+    return [year for year in years if year_discovery.valid_year(year)], {}
+
+def get_years():
+    """فهرست سال‌هایی که باید استخراج شوند (کشف‌شده از سایت با cache دارای TTL)"""
+    return year_discovery.discover(SYSTEM, discover_years, DEFAULT_YEARS)[0]
+
+def url_year(year):
+    """سال داده در آدرس SCImago (سال انتشار ۵ سال پس از سال داده است)"""
+    return str(int(year) - 5)
+
+def page_url(year):
+    """آدرس جدول SCImago برای یک سال"""
+    return f"{BASE_URL}/rankings.php?country=IRN&year={url_year(year)}&sector={quote(SECTOR)}"
+
+def export_url(year):
+    """آدرس خروجی CSV/XLSX جدول یک سال"""
+    return f"{page_url(year)}&out=xls"
+
+def export_enabled():
+    """دریافت خروجی جدول به جای صفحه HTML (SCIMAGO_EXPORT در .env)"""
+    return os.getenv('SCIMAGO_EXPORT', 'True') == 'True' and http_client.http_enabled()
+
+def session_sweep_enabled():
+    """در حالت خروجی، همه سال‌ها در یک وظیفه و یک دسته درخواست HTTP دریافت می‌شوند"""
+    return export_enabled()
+
+def find_column(header, *names):
+    """اندیس اولین ستونی که نامش با یکی از نام‌ها برابر است یا آن را شامل می‌شود"""
+    for name in names:
+        for index, column in enumerate(header):
+            if column == name:
+                return index
+    for name in names:
+        for index, column in enumerate(header):
+            if name in column:
+                return index
+    return None
+
+def export_table(content):
+    """ردیف‌های خام خروجی: XLSX (در صورت نصب openpyxl) یا CSV با جداکننده تشخیص داده‌شده"""
+    if content[:2] == b"PK":
         try:
-            with open(JSON_FILE, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                return data.get("rankings", {}).get("scimago", {})
-        except Exception as e:
-            logging.error(f"خطا در خواندن فایل JSON: {str(e)}")
-            return {}
-    return {}
-
-def setup_driver():
-    """تنظیم WebDriver با سرکوب کامل لاگ‌ها"""
-    chrome_options = Options()
-    chrome_options.add_argument("--headless=new")  # استفاده از headless جدید
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--disable-extensions")
-    chrome_options.add_argument("--disable-notifications")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--ignore-certificate-errors")
-    chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/91.0.4472.124")
-    chrome_options.add_argument("--log-level=3")
-    chrome_options.add_argument("--mute-audio")
-    chrome_options.add_argument("--disable-features=VoiceTranscription,MediaSession,MediaSessionService")
-    chrome_options.add_argument("--disable-logging")  # غیرفعال کردن لاگ‌های اضافی
-    chrome_options.add_argument("--disable-background-timer-throttling")
-    chrome_options.add_argument("--disable-backgrounding-occluded-windows")
-    chrome_options.add_argument("--disable-renderer-backgrounding")
-    chrome_options.add_experimental_option('excludeSwitches', ['enable-logging', 'enable-automation'])
-    chrome_options.add_experimental_option('prefs', {
-        'loggingPrefs': {'browser': 'OFF', 'driver': 'OFF', 'server': 'OFF'},  # غیرفعال کردن لاگ‌های مرورگر
-        'profile.default_content_setting_values.media_stream': 2,  # غیرفعال کردن دسترسی به رسانه
-    })
+            from openpyxl import load_workbook
+        except ImportError:
+            logging.error("خواندن خروجی XLSX به بسته openpyxl نیاز دارد (pip install openpyxl)")
+            return []
+        workbook = load_workbook(io.BytesIO(content), read_only=True, data_only=True)
+        table = [["" if value is None else str(value) for value in row] for row in workbook.worksheets[0].iter_rows(values_only=True)]
+        workbook.close()
+        return table
+    text = content.decode('utf-8-sig', errors='replace')
     try:
-        driver_path = ChromeDriverManager(log_level=0).install()  # log_level=0 برای سرکوب لاگ‌های webdriver-manager
-        service = Service(driver_path, log_output=os.devnull)
-        return webdriver.Chrome(service=service, options=chrome_options)
-    except PermissionError as e:
-        logging.error(f"خطای دسترسی در نصب درایور کروم: {str(e)}")
-        raise
+        dialect = csv.Sniffer().sniff(text[:4096], delimiters=";,\t")
+    except csv.Error:
+        dialect = csv.excel
+    return list(csv.reader(io.StringIO(text), dialect))
+
+def export_rows(content, year):
+    """ردیف‌های (رتبه جهانی، نام، رتبه کشوری) همه مؤسسات از خروجی جدول با خواندن ستونی"""
+    table = export_table(content)
+    if not table:
+        return []
+    header = [column.strip().lower() for column in table[0]]
+    name_column = find_column(header, "institution", "name")
+    global_column = find_column(header, "global rank", "global")
+    country_column = find_column(header, "rank", "country rank")
+    if country_column == global_column:
+        country_column = None
+    if name_column is None or global_column is None:
+        logging.warning(f"ستون‌های نام و رتبه جهانی در خروجی سال {year} (URL year={url_year(year)}) یافت نشدند: {header}")
+        return []
+    rows = []
+    for record in table[1:]:
+        if len(record) <= max(name_column, global_column):
+            continue
+        global_rank = record[global_column].strip().strip("()")
+        country_rank = record[country_column].strip() if country_column is not None and country_column < len(record) else ""
+        if global_rank.isdigit() and record[name_column].strip():
+            rows.append((global_rank, " ".join(record[name_column].split()), country_rank))
+    return rows
+
+async def fetch_exports_async(years):
+    """دریافت خروجی همه سال‌ها در یک دسته با کلاینت ناهمگام مشترک؛ خروجی {سال: ردیف‌های JSON یا None}"""
+    semaphore = asyncio.Semaphore(EXPORT_CONCURRENCY)
+
+    async def fetch(client, year):
+        async with semaphore:
+            start_time = time.time()
+            try:
+                response = await http_client.get_async(client, export_url(year))
+            except Exception as e:
+                logging.warning(f"دریافت خروجی SCImago سال {year} ناموفق بود: {str(e)}")
+                return year, None
+        metrics.record_http_fetch(SYSTEM, year, time.time() - start_time, len(response.content))
+        rows = export_rows(response.content, year)
+        return year, extraction.dump_rows(rows) if rows else None
+
+    async with http_client.async_client() as client:
+        return dict(await asyncio.gather(*(fetch(client, year) for year in years)))
+
+def fetch_page(driver, year):
+    """بارگذاری صفحه یک سال در مرورگر؛ خروجی HTML صفحه یا ردیف‌های JSON است"""
+    with rate_limit.request(HOST):
+        driver.get(page_url(year))
+    readiness.wait_for_rows(driver, SYSTEM, "load", ROW_SELECTOR)
+    return extraction.capture(driver, JS_EXTRACTOR)
+
+def parse_http(raw, year):
+    """ردیف‌های JSON از HTML دریافت‌شده با HTTP؛ اگر جدول یافت نشود None (برای بازگشت به مرورگر) است"""
+    rows = parse_rows(raw, year)
+    if not rows:
+        logging.warning(f"جدول در پاسخ HTTP سال {year} یافت نشد و از مرورگر استفاده می‌شود")
+        return None
+    return extraction.dump_rows(rows)
+
+def http_key(year):
+    """آدرس و وضعیت cache پاسخ HTTP یک سال"""
+    return page_url(year), extraction.page_state()
+
+def fetch_http(year):
+    """دریافت صفحه یک سال با HTTP بدون مرورگر؛ خروجی ردیف‌های JSON یا None (برای بازگشت به مرورگر) است"""
+    start_time = time.time()
+    try:
+        response = http_client.get(page_url(year))
+    except Exception as e:
+        logging.warning(f"دریافت HTTP سال {year} ناموفق بود و از مرورگر استفاده می‌شود: {str(e)}")
+        return None
+    metrics.record_http_fetch(SYSTEM, year, time.time() - start_time, len(response.content))
+    return parse_http(response.text, year)
+
+async def fetch_http_async(client, year):
+    """دریافت ناهمگام HTML صفحه یک سال برای موتور asyncio"""
+    response = await http_client.get_async(client, page_url(year))
+    return response.text
+
+def parse_rows(html, year):
+    """ردیف‌های (رتبه جهانی، نام، رتبه کشوری) جدول از HTML صفحه"""
+    rows = parsing.find_rows(html, CONTAINER)
+    if not rows:
+        logging.warning(f"جدول با id 'tablewrapper' برای سال {year} (URL year={url_year(year)}) یافت نشد")
+        return []
+
+    logging.debug(f"تعداد ردیف‌ها در جدول سال {year}: {len(rows)}")
+    candidates = []
+    for row, cells in rows:
+        try:
+            if len(cells) >= 3 and parsing.has_class(cells[1], 'ranknumber'):
+                global_span = parsing.find_by_class(cells[1], 'span', 'global_ranking')
+                global_text = parsing.text(global_span)
+                if global_text.startswith('(') and global_text.endswith(')'):
+                    global_rank_text = global_text[1:-1]
+                    if global_rank_text.isdigit():
+                        country_rank = (cells[1].text or "").strip()
+                        candidates.append((global_rank_text, parsing.text(cells[2]), country_rank))
+        except Exception as e:
+            logging.error(f"خطا در پردازش ردیف برای سال {year}: {str(e)}")
+            continue
+    return candidates
+
+def institution_ranks(rows):
+    """رتبه جهانی و کشوری همه مؤسسات جدول به صورت {شاخص: {مؤسسه: رتبه}}"""
+    values = {GLOBAL_INDICATOR: {}, COUNTRY_INDICATOR: {}}
+    for global_rank, name, country_rank in rows:
+        values[GLOBAL_INDICATOR].setdefault(name, int(global_rank))
+        if country_rank.isdigit():
+            values[COUNTRY_INDICATOR].setdefault(name, int(country_rank))
+    return values
+
+def parse_page(page, universities, year):
+    """استخراج رتبه جهانی دانشگاه‌ها از صفحه یک سال (HTML یا خروجی استخراج‌کننده جاوااسکریپت) با یک اسکن خطی
+
+    رتبه جهانی و کشوری همه مؤسسات همان جدول هم در همین پردازش برای ذخیره همراه نتیجه وظیفه نگه داشته می‌شود.
+    """
+    rows = extraction.load_rows(page, parse_rows, year)
+    events.emit("parsed", system=SYSTEM, year=year, rows=len(rows))
+    storage.stage_indicators(year, institution_ranks(rows))
+    ranks = {}
+    for name, row in assign_ranks(rows, universities).items():
+        ranks[name] = int(row[0]) if row else None
+        if row:
+            logging.info(f"رتبه جهانی {name} برای سال {year}: {row[0]} (ردیف: {row[1]})")
+        else:
+            logging.warning(f"دانشگاه {name} در سال {year} (URL year={url_year(year)}) یافت نشد")
+    events.emit("matched", system=SYSTEM, year=year, ranks=ranks)
+    return ranks
 
 def scrape_year(args):
     """اسکریپینگ رتبه برای یک سال خاص"""
     university_name, year = args
-    logging.info(f"استخراج رتبه برای سال {year} (SCImago)")
-    driver = None
-    result = {year: None}
-    
-    for attempt in range(MAX_RETRIES):
+    return {year: scrape_year_batch(([university_name], year))[university_name]}
+
+def scrape_year_batch(args):
+    """اسکریپینگ رتبه چند دانشگاه برای یک سال خاص با یک بار بارگذاری صفحه"""
+    universities, year = args
+    logging.info(f"استخراج رتبه {len(universities)} دانشگاه برای سال {year} (SCImago)")
+    result = {name: None for name in universities}
+
+    # در صورت وجود صفحه معتبر در cache، مرورگری اجرا نمی‌شود
+    url = page_url(year)
+    state = extraction.page_state()
+    html = page_cache.get(SYSTEM, year, url, state)
+    if html is None and page_cache.from_cache_only():
+        page_cache.report_miss(SYSTEM, year)
+        return result
+
+    # دریافت مستقیم با HTTP؛ مرورگر فقط در صورت شکست آن اجرا می‌شود
+    if html is None and HTTP_FETCHABLE and http_client.http_enabled():
+        html = fetch_http(year)
+        if html is not None:
+            page_cache.put(SYSTEM, year, url, html, state)
+
+    def attempt():
+        if html is not None:
+            return parse_page(html, universities, year)
+        driver = driver_pool.acquire_driver(SYSTEM)
         try:
-            driver = setup_driver()
-            url_year = str(int(year) - 5)
-            url = f"https://www.scimagoir.com/rankings.php?country=IRN&year={url_year}§or=Higher educ"
-            driver.get(url)
-            WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.ID, "tablewrapper"))
-            )
-
-            # استخراج HTML
-            soup = BeautifulSoup(driver.page_source, 'lxml')
-            table_wrapper = soup.find('div', id='tablewrapper')
-            if not table_wrapper:
-                logging.warning(f"جدول با id 'tablewrapper' برای سال {year} (URL year={url_year}) یافت نشد")
-                return result
-
-            rows = table_wrapper.find_all('tr')
-            logging.debug(f"تعداد ردیف‌ها در جدول سال {year}: {len(rows)}")
-            found = False
-            for row in rows:
-                try:
-                    cells = row.find_all('td')
-                    if len(cells) >= 3:
-                        rank_cell = cells[1].get('class', [])
-                        university_cell = cells[2].text.lower().strip()
-                        if 'ranknumber' in rank_cell:
-                            logging.debug(f"نام دانشگاه در ردیف: {university_cell}")
-                            keywords = [
-                                university_name.lower(), "ferdowsi univ", "ferdowsi university",
-                                "ferdowsi", "mashhad", "mashhad university", "um.ac.ir",
-                                "ferdosi", "ferdousi", "ferdowsi mashhad"
-                            ]
-                            if any(keyword in university_cell for keyword in keywords):
-                                global_rank = None
-                                global_span = cells[1].find('span', class_='global_ranking')
-                                if global_span and global_span.text.strip().startswith('(') and global_span.text.strip().endswith(')'):
-                                    global_rank_text = global_span.text.strip()[1:-1]
-                                    global_rank = int(global_rank_text) if global_rank_text.isdigit() else None
-                                if global_rank:
-                                    result[year] = global_rank
-                                    logging.info(f"رتبه جهانی برای سال {year}: {global_rank}")
-                                    found = True
-                                    break
-                except Exception as e:
-                    logging.error(f"خطا در پردازش ردیف برای سال {year}: {str(e)}")
-                    continue
-
-            if not found:
-                logging.warning(f"دانشگاه {university_name} در سال {year} (URL year={url_year}) یافت نشد")
-            break
+            fetch_start = time.time()
+            page = fetch_page(driver, year)
+            metrics.record_page_load(driver, SYSTEM, year, time.time() - fetch_start, resource_policy.blocking_enabled())
+        finally:
+            driver_pool.release_driver(driver)
+        if page is None:
+            # صفحه‌ای بارگذاری نشد؛ رتبه‌ها نامعلوم‌اند و نباید به عنوان null ذخیره شوند
+            raise TimeoutError(f"صفحه سال {year} بارگذاری نشد")
+        # صفحه فقط پس از پردازش موفق جدول در cache ذخیره می‌شود
+        ranks = parse_page(page, universities, year)
+        page_cache.put(SYSTEM, year, url, page, state)
+        return ranks
 
-        except Exception as e:
-            logging.error(f"خطا در اسکریپینگ برای سال {year}، تلاش {attempt + 1}: {str(e)}")
-            if attempt < MAX_RETRIES - 1:
-                time.sleep(random.uniform(3, 5))
+    # تکرار فقط برای خطاهای گذرا و پایان مهلت رندر؛ خطای دائمی بلافاصله گزارش می‌شود
+    try:
+        return retry.call(attempt, SYSTEM, year)
+    except Exception:
+        logging.error(f"تلاش‌های مجدد برای سال {year} به پایان رسید")
+        return result
+
+def scrape_years_batch(args):
+    """رتبه چند دانشگاه برای چند سال از خروجی جدول؛ خروجی فقط سال‌هایی را دارد که خروجی‌شان دریافت شد
+
+    سال‌های بدون خروجی به فراخوان برگردانده نمی‌شوند تا هر کدام جداگانه و موازی از مسیر صفحه HTML اجرا شوند
+    (زمان‌بند آن‌ها را وظیفه‌های سال‌به‌سال می‌کند).
+    """
+    universities, years = args
+    logging.info(f"استخراج رتبه {len(universities)} دانشگاه برای {len(years)} سال از خروجی SCImago")
+    result = {}
+    missing = []
+    for year in years:
+        page = page_cache.get(SYSTEM, year, export_url(year), EXPORT_STATE)
+        if page is not None:
+            try:
+                result[year] = parse_page(page, universities, year)
                 continue
-            else:
-                logging.error(f"تلاش‌های مجدد برای سال {year} به پایان رسید")
-                break
-        finally:
-            if driver:
-                try:
-                    driver.quit()
-                except Exception as e:
-                    logging.error(f"خطا در بستن WebDriver برای سال {year}: {str(e)}")
+            except Exception as e:
+                logging.warning(f"خروجی ذخیره‌شده SCImago سال {year} پردازش نشد: {str(e)}")
+        missing.append(year)
 
+    if missing and not page_cache.from_cache_only():
+        for year, page in asyncio.run(fetch_exports_async(missing)).items():
+            if page is not None:
+                page_cache.put(SYSTEM, year, export_url(year), page, EXPORT_STATE)
+                result[year] = parse_page(page, universities, year)
     return result
 
-def get_rank(university_name):
-    """تابع اصلی برای استخراج رتبه‌ها با ادغام نتایج قبلی"""
-    previous_ranks = load_previous_rankings()
-    logging.info(f"رتبه‌های قبلی لود شدند: {previous_ranks}")
+def iter_ranks(universities, pool=None):
+    """مولد (سال، {دانشگاه: رتبه}) هر سال به محض پایان استخراج آن"""
+    years = get_years()
+    if session_sweep_enabled():
+        # خروجی همه سال‌ها در یک دسته درخواست HTTP
+        batch = pool.apply(scrape_years_batch, ((universities, years),)) if pool is not None else scrape_years_batch((universities, years))
+        yield from batch.items()
+        # سال‌هایی که خروجی نداشتند موازی از مسیر صفحه HTML
+        missing = [year for year in years if year not in batch]
+        if missing:
+            yield from driver_pool.stream_years(scrape_year_batch, [(universities, year) for year in missing], pool)
+        return
+    yield from driver_pool.stream_years(scrape_year_batch, [(universities, year) for year in years], pool)
 
-    years = [str(year) for year in range(2011, 2025)]
-    ranks = {year: previous_ranks.get(year, None) for year in years}
+def get_ranks(universities, pool=None):
+    """استخراج رتبه چند دانشگاه؛ هر صفحه فقط یک بار بارگذاری و پردازش می‌شود"""
+    years = get_years()
+    ranks = {name: {year: None for year in years} for name in universities}
 
     start_time = time.time()
-    with Pool(processes=int(os.getenv('NUM_PROCESSES', 3))) as pool:
-        args = [(university_name, year) for year in years]
-        results = pool.map(scrape_year, args)
-    
-    for result in results:
-        for year, rank in result.items():
-            if rank is not None:
-                ranks[year] = rank
-    
-    logging.info(f"استخراج رتبه‌های SCImago برای {university_name} تکمیل شد. زمان اجرا: {time.time() - start_time:.2f} ثانیه")
-    return ranks
\ No newline at end of file
+    for year, result in iter_ranks(universities, pool):
+        for name, rank in result.items():
+            ranks[name][year] = rank
+
+    logging.info(f"استخراج رتبه‌های SCImago برای {len(universities)} دانشگاه تکمیل شد. زمان اجرا: {time.time() - start_time:.2f} ثانیه")
+    return ranks
+
+def get_rank(university_name, pool=None):
+    """تابع اصلی برای استخراج رتبه‌ها با ادغام نتایج قبلی (در صورت ارسال pool، مرورگرهای workerهای آن بازاستفاده می‌شوند)"""
+    previous_ranks = load_previous_rankings(university_name)
+    logging.info(f"رتبه‌های قبلی لود شدند: {previous_ranks}")
+
+    ranks = get_ranks([university_name], pool)[university_name]
+    for year, rank in ranks.items():
+        if rank is None:
+            ranks[year] = previous_ranks.get(year, None)
+    return ranks
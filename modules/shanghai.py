@@ -2,18 +2,12 @@ import logging
 import time
 import json
 import os
-from multiprocessing import Pool
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
 from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.keys import Keys
-from bs4 import BeautifulSoup
-import random
 from dotenv import load_dotenv
+from modules import driver_pool, page_cache, parsing, extraction, metrics, resource_policy, readiness, retry, rate_limit, storage, events, http_client, year_discovery
+from modules.matcher import assign_ranks, build_index, lookup_rows
+from modules.universities import search_term as university_search_term
 
 # بارگذاری متغیرهای محیطی
 load_dotenv()
@@ -27,157 +21,324 @@ logging.basicConfig(
 )
 
 UNIVERSITY_NAME = "Ferdowsi University of Mashhad"
-MAX_RETRIES = 3
-JSON_FILE = "data/university_rankings.json"
+HOST = "www.shanghairanking.com"
+# نشانی پایه سایت (ARWU_BASE_URL برای اجرا روی سرور نمونه محلی)
+BASE_URL = os.getenv('ARWU_BASE_URL') or f"https://{HOST}"
+SYSTEM = "shanghai"
+# داده کامل هر سال از API عمومی ARWU (همان JSON که برنامه Vue بارگذاری می‌کند) بدون مرورگر قابل دریافت است
+HTTP_FETCHABLE = True
+API_URL = BASE_URL + "/api/pub/v1/arwu/rank?version={year}"
+# وضعیت cache داده کامل سال (مستقل از دانشگاه‌های درخواستی)
+DATASET_STATE = "dataset"
+# بدنه(های) جدول نتایج جستجو
+CONTAINER = {"tag": "tbody", "attribute": "data-v-ae1ab4a8", "all": True}
+# ردیف‌هایی که آماده بودن صفحه با پایدار شدن تعداد آن‌ها سنجیده می‌شود
+ROW_SELECTOR = "tbody[data-v-ae1ab4a8] tr"
+# ردیف‌ها و نمایه داده کامل هر سال (به تفکیک منبع واقعی یا فایل نمونه) در حافظه این پردازش
+_datasets = {}
+# استخراج‌کننده درون مرورگر: فقط (رتبه، نام، ستون سوم) ردیف‌های نتیجه جستجو برگردانده می‌شود
+JS_EXTRACTOR = """
+const rows = [];
+document.querySelectorAll('tbody[data-v-ae1ab4a8] tr').forEach(tr => {
+    const cells = tr.querySelectorAll(':scope > td');
+    if (cells.length >= 2) {
+        const rank = cells[0].querySelector('div.ranking');
+        const name = cells[1].querySelector('span.univ-name');
+        if (rank && rank.textContent.trim() && name) {
+            rows.push([rank.textContent.trim(), name.textContent.replace(/\\s+/g, ' ').trim(), cells.length > 2 ? cells[2].textContent.trim() : '']);
+        }
+    }
+});
+return rows;
+"""
 
-def load_previous_rankings():
-    """خواندن رتبه‌های قبلی از فایل JSON"""
-    if os.path.exists(JSON_FILE):
+def load_previous_rankings(university_name):
+    """خواندن آخرین رتبه‌های ذخیره‌شده یک دانشگاه در این نظام از جدول رتبه‌ها"""
+    try:
+        return storage.system_rankings(university_name, SYSTEM)
+    except Exception as e:
+        logging.error(f"خطا در خواندن جدول رتبه‌ها: {str(e)}")
+        return {}
+
+# فهرست سال‌ها در صورت ناموفق بودن کشف سال‌های منتشرشده
+DEFAULT_YEARS = [str(year) for year in range(2013, 2025)]
+
+def index_years():
+    """سال‌هایی که صفحه آن‌ها برای کشف نسخه‌ها امتحان می‌شود: سال جاری و آخرین سال شناخته‌شده (کشف‌شده قبلی یا پیش‌فرض)"""
+    known = (year_discovery.load().get(SYSTEM) or {}).get("years") or DEFAULT_YEARS
+    return list(dict.fromkeys([str(time.localtime().tm_year), max(known)]))
+
+def discover_years():
+    """سال‌های منتشرشده از پیوندهای نسخه‌ها در صفحه ARWU تازه‌ترین نسخه موجود"""
+    error = None
+    for year in index_years():
         try:
-            with open(JSON_FILE, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                return data.get("rankings", {}).get("shanghai", {})
+            years = year_discovery.link_years(http_client.get_text(page_url(year)), r'/rankings/arwu/(\d{4})\b')
         except Exception as e:
-            logging.error(f"خطا در خواندن فایل JSON: {str(e)}")
-            return {}
-    return {}
-
-def setup_driver():
-    """تنظیم WebDriver با سرکوب کامل لاگ‌ها"""
-    chrome_options = Options()
-    chrome_options.add_argument("--headless=new")  # استفاده از headless جدید
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--disable-extensions")
-    chrome_options.add_argument("--disable-notifications")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--ignore-certificate-errors")
-    chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/91.0.4472.124")
-    chrome_options.add_argument("--log-level=3")
-    chrome_options.add_argument("--mute-audio")
-    chrome_options.add_argument("--disable-features=VoiceTranscription,MediaSession,MediaSessionService")
-    chrome_options.add_argument("--disable-logging")  # غیرفعال کردن لاگ‌های اضافی
-    chrome_options.add_argument("--disable-background-timer-throttling")
-    chrome_options.add_argument("--disable-backgrounding-occluded-windows")
-    chrome_options.add_argument("--disable-renderer-backgrounding")
-    chrome_options.add_experimental_option('excludeSwitches', ['enable-logging', 'enable-automation'])
-    chrome_options.add_experimental_option('prefs', {
-        'loggingPrefs': {'browser': 'OFF', 'driver': 'OFF', 'server': 'OFF'},  # غیرفعال کردن لاگ‌های مرورگر
-        'profile.default_content_setting_values.media_stream': 2,  # غیرفعال کردن دسترسی به رسانه
-    })
+            error = e
+            continue
+        if years:
+            return years, {}
+    if error is not None:
+        raise error
+    return [], {}
+
+def get_years():
+    """فهرست سال‌هایی که باید استخراج شوند (کشف‌شده از سایت با cache دارای TTL)"""
+    return year_discovery.discover(SYSTEM, discover_years, DEFAULT_YEARS)[0]
+
+def page_url(year):
+    """آدرس صفحه ARWU یک سال"""
+    return f"{BASE_URL}/rankings/arwu/{year}"
+
+def api_url(year):
+    """آدرس داده JSON کامل ARWU یک سال"""
+    return API_URL.format(year=year)
+
+def fixture_file(year):
+    """فایل نمونه JSON برای اجرای آفلاین (ARWU_FIXTURE در .env)؛ {year} در مسیر با سال جایگزین می‌شود و بدون آن همه سال‌ها یک داده دارند"""
+    path = os.getenv('ARWU_FIXTURE')
+    return path.replace("{year}", str(year)) if path else None
+
+def http_key(year):
+    """آدرس و وضعیت cache داده کامل یک سال (داده هر فایل نمونه جدا از داده واقعی ذخیره می‌شود)"""
+    return api_url(year), f"{DATASET_STATE};fixture={fixture_file(year)}" if fixture_file(year) else DATASET_STATE
+
+def page_state(universities):
+    """عبارت‌های جستجو که بخشی از کلید cache هستند"""
+    terms = sorted({university_search_term(name, SYSTEM) for name in universities})
+    return f"search={'|'.join(terms)}"
+
+def fetch_page(driver, year, universities):
+    """بارگذاری صفحه یک سال و جستجوی هر دانشگاه در همان صفحه؛ خروجی HTML نتایج، ردیف‌های JSON یا None است"""
+    with rate_limit.request(HOST):
+        driver.get(page_url(year))
+    # صفحه ARWU با Vue رندر می‌شود و در اجرای نخست (بدون زمان‌های ثبت‌شده) مهلت بیشتری می‌گیرد
+    readiness.wait_for_element(driver, SYSTEM, "load", (By.CSS_SELECTOR, "input.search-input"), 20)
+
+    # جستجوی نام هر دانشگاه و نگه‌داشتن بدنه جدول نتیجه
+    fragments = []
+    rows = []
+    for term in sorted({university_search_term(name, SYSTEM) for name in universities}):
+        try:
+            search_input = readiness.wait_for_element(driver, SYSTEM, "search_input", (By.CSS_SELECTOR, "input.search-input"), 5)
+            search_input.clear()
+            search_input.send_keys(term)
+            # جستجو یک درخواست XHR به سایت می‌فرستد و مانند بارگذاری صفحه از محدودیت نرخ میزبان می‌گذرد
+            with rate_limit.request(HOST):
+                search_input.send_keys(Keys.RETURN)
+            logging.debug(f"جستجو برای '{term}' در سال {year} انجام شد")
+            # تا پایان درخواست جستجو و پایدار شدن ردیف‌ها صبر می‌شود تا نتیجه جستجوی قبلی خوانده نشود
+            readiness.wait_for_rows(driver, SYSTEM, "search", ROW_SELECTOR)
+            table_body = driver.find_element(By.TAG_NAME, "tbody")
+            if extraction.js_mode():
+                # در حالت js فقط ردیف‌ها نگه داشته می‌شوند؛ در صورت خطای استخراج‌کننده، همان جدول در پایتون پردازش می‌شود
+                rows.extend(extraction.run_extractor(driver, JS_EXTRACTOR) or parse_rows('<table>' + table_body.get_attribute('outerHTML') + '</table>', year))
+            else:
+                fragments.append(table_body.get_attribute('outerHTML'))
+        except Exception as e:
+            logging.warning(f"خطا در جستجوی '{term}' برای سال {year}: {str(e)}")
+    if rows:
+        return extraction.dump_rows(rows)
+    if not fragments:
+        return None
+
+    return "<html><body><table>" + "".join(fragments) + "</table></body></html>"
+
+def api_rows(data):
+    """ردیف‌های (رتبه، نام، کشور/منطقه) همه دانشگاه‌ها از پاسخ API"""
+    payload = data.get("data", data) if isinstance(data, dict) else {}
+    rankings = payload.get("rankings", []) if isinstance(payload, dict) else payload
+    rows = []
+    for item in rankings or []:
+        rank = str(item.get("ranking") or item.get("rank") or "").strip()
+        name = str(item.get("univNameEn") or item.get("univUp") or item.get("univName") or "").strip()
+        if rank and name:
+            rows.append((rank, name, str(item.get("region") or "").strip()))
+    return rows
+
+def parse_http(raw, year):
+    """ردیف‌های JSON همه دانشگاه‌ها از پاسخ API؛ اگر ردیفی یافت نشود None (برای بازگشت به مرورگر) است"""
+    try:
+        rows = api_rows(json.loads(raw))
+    except ValueError as e:
+        logging.warning(f"پاسخ API ARWU سال {year} معتبر نیست و از مرورگر استفاده می‌شود: {str(e)}")
+        return None
+    if not rows:
+        logging.warning(f"ردیفی در پاسخ API ARWU سال {year} یافت نشد و از مرورگر استفاده می‌شود")
+        return None
+    return extraction.dump_rows(rows)
+
+def read_fixture(year):
+    """متن فایل نمونه JSON یک سال"""
+    with open(fixture_file(year), 'r', encoding='utf-8') as f:
+        return f.read()
+
+def fetch_http(year):
+    """دریافت داده کامل یک سال از API یا فایل نمونه؛ خروجی ردیف‌های JSON یا None (برای بازگشت به مرورگر) است"""
+    start_time = time.time()
     try:
-        driver_path = ChromeDriverManager(log_level=0).install()  # log_level=0 برای سرکوب لاگ‌های webdriver-manager
-        service = Service(driver_path, log_output=os.devnull)
-        return webdriver.Chrome(service=service, options=chrome_options)
-    except PermissionError as e:
-        logging.error(f"خطای دسترسی در نصب درایور کروم: {str(e)}")
-        raise
+        if fixture_file(year):
+            raw = read_fixture(year)
+        else:
+            response = http_client.get(api_url(year), headers={"Accept": "application/json"})
+            raw = response.text
+            metrics.record_http_fetch(SYSTEM, year, time.time() - start_time, len(response.content))
+    except Exception as e:
+        logging.warning(f"دریافت API ARWU سال {year} ناموفق بود و از مرورگر استفاده می‌شود: {str(e)}")
+        return None
+    return parse_http(raw, year)
 
+async def fetch_http_async(client, year):
+    """دریافت ناهمگام داده کامل یک سال برای موتور asyncio"""
+    if fixture_file(year):
+        return read_fixture(year)
+    response = await http_client.get_async(client, api_url(year), headers={"Accept": "application/json"})
+    return response.text
+
+def dataset(year, page):
+    """ردیف‌ها و نمایه نام‌های داده کامل یک سال (یک بار در هر پردازش ساخته می‌شود)
+
+    کلید cache همان کلید http_key (آدرس سال و منبع واقعی یا فایل نمونه) است تا داده منابع مختلف جای هم برنگردد.
+    """
+    key = http_key(year)
+    if key not in _datasets:
+        rows = extraction.load_rows(page, parse_rows, year)
+        _datasets[key] = (rows, build_index(rows))
+    return _datasets[key]
+
+def dataset_ranks(universities, year):
+    """رتبه چند دانشگاه از داده کامل سال (cache یا API)؛ در صورت نبود داده None (برای بازگشت به جستجو در مرورگر)"""
+    url, state = http_key(year)
+    page = page_cache.get(SYSTEM, year, url, state)
+    if page is None and not page_cache.from_cache_only():
+        page = fetch_http(year)
+        if page is not None:
+            page_cache.put(SYSTEM, year, url, page, state)
+    if page is None:
+        return None
+    rows, index = dataset(year, page)
+    events.emit("parsed", system=SYSTEM, year=year, rows=len(rows))
+    ranks = {}
+    for name, row in lookup_rows(index, rows, universities).items():
+        ranks[name] = row[0] if row else None
+        if row:
+            logging.info(f"رتبه {name} برای سال {year} از داده کامل ARWU: {row[0]} (ردیف: {row[1]})")
+        else:
+            logging.warning(f"دانشگاه {name} در داده کامل ARWU سال {year} یافت نشد")
+    events.emit("matched", system=SYSTEM, year=year, ranks=ranks)
+    return ranks
+
+def parse_rows(html, year):
+    """ردیف‌های (رتبه، نام، ستون سوم) نتایج جستجو از HTML"""
+    rows = parsing.find_rows(html, CONTAINER)
+    if not rows:
+        logging.warning(f"جدول با tbody[data-v-ae1ab4a8] برای سال {year} یافت نشد")
+        return []
+
+    logging.debug(f"تعداد ردیف‌ها در جدول سال {year}: {len(rows)}")
+    candidates = []
+    for row, cells in rows:
+        try:
+            if len(cells) >= 2:
+                rank_text = parsing.text(parsing.find_by_class(cells[0], 'div', 'ranking'))
+                university_span = parsing.find_by_class(cells[1], 'span', 'univ-name')
+                if rank_text and university_span is not None:
+                    extra = parsing.text(cells[2]) if len(cells) > 2 else ""
+                    candidates.append((rank_text, parsing.text(university_span), extra))
+        except Exception as e:
+            logging.error(f"خطا در پردازش ردیف برای سال {year}: {str(e)}")
+            continue
+    return candidates
+
+def parse_page(page, universities, year):
+    """استخراج رتبه دانشگاه‌ها از صفحه یک سال (HTML یا خروجی استخراج‌کننده جاوااسکریپت) با یک اسکن خطی"""
+    rows = extraction.load_rows(page, parse_rows, year)
+    events.emit("parsed", system=SYSTEM, year=year, rows=len(rows))
+    ranks = {}
+    for name, row in assign_ranks(rows, universities).items():
+        ranks[name] = row[0] if row else None
+        if row:
+            logging.info(f"رتبه {name} برای سال {year}: {row[0]} (ردیف: {row[1]})")
+        else:
+            logging.warning(f"دانشگاه {name} در سال {year} یافت نشد")
+    events.emit("matched", system=SYSTEM, year=year, ranks=ranks)
+    return ranks
 
 def scrape_year(args):
     """اسکریپینگ رتبه برای یک سال خاص"""
     university_name, year = args
-    logging.info(f"استخراج رتبه برای سال {year} (Shanghai)")
-    driver = None
-    result = {year: None}
-    
-    for attempt in range(MAX_RETRIES):
-        try:
-            driver = setup_driver()
-            url = f"https://www.shanghairanking.com/rankings/arwu/{year}"
-            driver.get(url)
-            WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.CSS_SELECTOR, "input.search-input"))
-            )
-
-            # جستجوی نام دانشگاه
-            try:
-                search_input = WebDriverWait(driver, 5).until(
-                    EC.presence_of_element_located((By.CSS_SELECTOR, "input.search-input"))
-                )
-                search_input.clear()
-                search_input.send_keys("Ferdowsi")
-                search_input.send_keys(Keys.RETURN)
-                logging.debug(f"جستجو برای 'Ferdowsi' در سال {year} انجام شد")
-                WebDriverWait(driver, 5).until(
-                    EC.presence_of_element_located((By.TAG_NAME, "tbody"))
-                )
-            except Exception as e:
-                logging.warning(f"خطا در جستجوی دانشگاه برای سال {year}: {str(e)}")
-                return result
-
-            # استخراج HTML
-            soup = BeautifulSoup(driver.page_source, 'lxml')
-            table_body = soup.find('tbody', {'data-v-ae1ab4a8': ''})
-            if not table_body:
-                logging.warning(f"جدول با tbody[data-v-ae1ab4a8] برای سال {year} یافت نشد")
-                return result
-
-            rows = table_body.find_all('tr')
-            logging.debug(f"تعداد ردیف‌ها در جدول سال {year}: {len(rows)}")
-            found = False
-            for row in rows:
-                try:
-                    cells = row.find_all('td')
-                    if len(cells) >= 2:
-                        rank_div = cells[0].find('div', class_='ranking')
-                        rank = rank_div.text.strip() if rank_div else None
-                        university_span = cells[1].find('span', class_='univ-name')
-                        university_cell = university_span.text.lower().strip() if university_span else ""
-                        logging.debug(f"نام دانشگاه در ردیف: {university_cell}")
-                        keywords = [
-                            university_name.lower(), "ferdowsi univ", "ferdowsi university",
-                            "ferdowsi", "mashhad", "mashhad university", "um.ac.ir",
-                            "ferdosi", "ferdousi", "ferdowsi mashhad"
-                        ]
-                        if any(keyword in university_cell for keyword in keywords):
-                            if rank:
-                                result[year] = rank
-                                logging.info(f"رتبه برای سال {year}: {rank}")
-                                found = True
-                                break
-                except Exception as e:
-                    logging.error(f"خطا در پردازش ردیف برای سال {year}: {str(e)}")
-                    continue
-
-            if not found:
-                logging.warning(f"دانشگاه {university_name} در سال {year} یافت نشد")
-            break
+    return {year: scrape_year_batch(([university_name], year))[university_name]}
 
-        except Exception as e:
-            logging.error(f"خطا در اسکریپینگ برای سال {year}، تلاش {attempt + 1}: {str(e)}")
-            if attempt < MAX_RETRIES - 1:
-                time.sleep(random.uniform(3, 5))
-                continue
-            else:
-                logging.error(f"تلاش‌های مجدد برای سال {year} به پایان رسید")
-                break
+def scrape_year_batch(args):
+    """اسکریپینگ رتبه چند دانشگاه برای یک سال خاص با یک بار بارگذاری صفحه"""
+    universities, year = args
+    logging.info(f"استخراج رتبه {len(universities)} دانشگاه برای سال {year} (Shanghai)")
+    result = {name: None for name in universities}
+
+    # داده کامل سال از cache یا API؛ جستجو در برنامه Vue فقط در صورت نبود آن انجام می‌شود
+    if HTTP_FETCHABLE and (http_client.http_enabled() or fixture_file(year)):
+        ranks = dataset_ranks(universities, year)
+        if ranks is not None:
+            return ranks
+
+    # در صورت وجود صفحه معتبر در cache، مرورگری اجرا نمی‌شود
+    url = page_url(year)
+    state = extraction.page_state(page_state(universities))
+    html = page_cache.get(SYSTEM, year, url, state)
+    if html is None and page_cache.from_cache_only():
+        page_cache.report_miss(SYSTEM, year)
+        return result
+
+    def attempt():
+        if html is not None:
+            return parse_page(html, universities, year)
+        driver = driver_pool.acquire_driver(SYSTEM)
+        try:
+            fetch_start = time.time()
+            page = fetch_page(driver, year, universities)
+            metrics.record_page_load(driver, SYSTEM, year, time.time() - fetch_start, resource_policy.blocking_enabled())
         finally:
-            if driver:
-                try:
-                    driver.quit()
-                except Exception as e:
-                    logging.error(f"خطا در بستن WebDriver برای سال {year}: {str(e)}")
+            driver_pool.release_driver(driver)
+        if page is None:
+            # صفحه‌ای بارگذاری نشد؛ رتبه‌ها نامعلوم‌اند و نباید به عنوان null ذخیره شوند
+            raise TimeoutError(f"صفحه سال {year} بارگذاری نشد")
+        # صفحه فقط پس از پردازش موفق جدول در cache ذخیره می‌شود
+        ranks = parse_page(page, universities, year)
+        page_cache.put(SYSTEM, year, url, page, state)
+        return ranks
 
-    return result
+    # تکرار فقط برای خطاهای گذرا و پایان مهلت رندر؛ خطای دائمی بلافاصله گزارش می‌شود
+    try:
+        return retry.call(attempt, SYSTEM, year)
+    except Exception:
+        logging.error(f"تلاش‌های مجدد برای سال {year} به پایان رسید")
+        return result
 
-def get_rank(university_name):
-    """تابع اصلی برای استخراج رتبه‌ها با ادغام نتایج قبلی"""
-    previous_ranks = load_previous_rankings()
-    logging.info(f"رتبه‌های قبلی لود شدند: {previous_ranks}")
+def iter_ranks(universities, pool=None):
+    """مولد (سال، {دانشگاه: رتبه}) هر سال به محض پایان استخراج آن (بدون انتظار برای کندترین سال)"""
+    yield from driver_pool.stream_years(scrape_year_batch, [(universities, year) for year in get_years()], pool)
 
-    years = [str(year) for year in range(2013, 2025)]
-    ranks = {year: previous_ranks.get(year, None) for year in years}
+def get_ranks(universities, pool=None):
+    """استخراج رتبه چند دانشگاه؛ هر صفحه فقط یک بار بارگذاری و پردازش می‌شود"""
+    years = get_years()
+    ranks = {name: {year: None for year in years} for name in universities}
 
     start_time = time.time()
-    with Pool(processes=int(os.getenv('NUM_PROCESSES', 3))) as pool:
-        args = [(university_name, year) for year in years]
-        results = pool.map(scrape_year, args)
-    
-    for result in results:
-        for year, rank in result.items():
-            if rank is not None:
-                ranks[year] = rank
-    
-    logging.info(f"استخراج رتبه‌های Shanghai برای {university_name} تکمیل شد. زمان اجرا: {time.time() - start_time:.2f} ثانیه")
-    return ranks
\ No newline at end of file
+    for year, result in iter_ranks(universities, pool):
+        for name, rank in result.items():
+            ranks[name][year] = rank
+
+    logging.info(f"استخراج رتبه‌های Shanghai برای {len(universities)} دانشگاه تکمیل شد. زمان اجرا: {time.time() - start_time:.2f} ثانیه")
+    return ranks
+
+def get_rank(university_name, pool=None):
+    """تابع اصلی برای استخراج رتبه‌ها با ادغام نتایج قبلی (در صورت ارسال pool، مرورگرهای workerهای آن بازاستفاده می‌شوند)"""
+    previous_ranks = load_previous_rankings(university_name)
+    logging.info(f"رتبه‌های قبلی لود شدند: {previous_ranks}")
+
+    ranks = get_ranks([university_name], pool)[university_name]
+    for year, rank in ranks.items():
+        if rank is None:
+            ranks[year] = previous_ranks.get(year, None)
+    return ranks
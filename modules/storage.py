@@ -0,0 +1,201 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from dotenv import load_dotenv
+
+# بارگذاری متغیرهای محیطی
+load_dotenv()
+
+STORE_FILE = os.getenv('RANKINGS_DB', "data/rankings.sqlite")
+# خروجی‌های JSON قبلی که در اولین اجرا به جدول منتقل می‌شوند
+LEGACY_JSON_FILES = ("data/university_rankings.json", "data/batch_rankings.json")
+# شاخص ذخیره‌شده برای رتبه‌ای که هر ماژول برمی‌گرداند
+RANK_INDICATOR = "rank"
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rankings (
+    university TEXT NOT NULL,
+    system TEXT NOT NULL,
+    year TEXT NOT NULL,
+    indicator TEXT NOT NULL,
+    value TEXT NOT NULL,
+    scraped_at REAL NOT NULL,
+    PRIMARY KEY (university, system, year, indicator, scraped_at)
+);
+CREATE INDEX IF NOT EXISTS rankings_system_year ON rankings (system, year);
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    started_at REAL NOT NULL,
+    finished_at REAL
+);
+CREATE TABLE IF NOT EXISTS checkpoints (
+    run_id TEXT NOT NULL,
+    system TEXT NOT NULL,
+    year TEXT NOT NULL,
+    university TEXT NOT NULL,
+    completed_at REAL NOT NULL,
+    PRIMARY KEY (run_id, system, year, university)
+);
+"""
+# آخرین مقدار هر (دانشگاه، نظام، سال، شاخص)؛ ردیف‌های قدیمی‌تر تاریخچه تغییرات هستند
+LATEST_QUERY = """
+SELECT university, system, year, indicator, value FROM rankings AS r
+WHERE scraped_at = (
+    SELECT MAX(scraped_at) FROM rankings
+    WHERE university = r.university AND system = r.system AND year = r.year AND indicator = r.indicator
+)
+"""
+
+# اتصال این پردازش؛ نوشتن فقط از پردازش اصلی (نتیجه وظایف) انجام می‌شود
+_connection = None
+_lock = threading.RLock()
+# اجرای جاری که وظایف تکمیل‌شده‌اش ثبت می‌شوند (None یعنی بدون ثبت نقطه بازیابی)
+_run_id = None
+# شاخص‌های اضافه‌ای که worker در کنار رتبه‌های وظیفه برمی‌گرداند (مثلاً رتبه جهانی و کشوری همه مؤسسات SCImago)
+_local = threading.local()
+
+def connect():
+    """اتصال به جدول رتبه‌ها در حالت WAL؛ در اولین ساخت، خروجی‌های JSON قبلی منتقل می‌شوند"""
+    global _connection
+    with _lock:
+        if _connection is None:
+            os.makedirs(os.path.dirname(STORE_FILE) or ".", exist_ok=True)
+            connection = sqlite3.connect(STORE_FILE, timeout=30, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.executescript(SCHEMA)
+            if connection.execute("SELECT COUNT(*) FROM rankings").fetchone()[0] == 0:
+                import_json(connection)
+            _connection = connection
+    return _connection
+
+def import_json(connection):
+    """انتقال رتبه‌های فایل‌های JSON قبلی به جدول (با زمان تغییر فایل به عنوان زمان استخراج)"""
+    for json_file in LEGACY_JSON_FILES:
+        if not os.path.exists(json_file):
+            continue
+        try:
+            with open(json_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            logging.error(f"خطا در خواندن فایل JSON: {str(e)}")
+            continue
+        scraped_at = os.path.getmtime(json_file)
+        with connection:
+            for entry in data.get("universities", [data]):
+                for system, ranks in entry.get("rankings", {}).items():
+                    insert_ranks(connection, system, {year: {entry.get("university"): rank} for year, rank in ranks.items()}, scraped_at)
+        logging.info(f"رتبه‌های فایل {json_file} به جدول رتبه‌ها منتقل شدند")
+
+def insert_ranks(connection, system, ranks, scraped_at, indicator=RANK_INDICATOR):
+    """درج رتبه‌های {سال: {دانشگاه: رتبه}}؛ فقط مقدارهای تازه یا تغییرکرده ردیف جدید می‌سازند
+
+    رتبه None هم به صورت 'null' ذخیره می‌شود تا خارج شدن دانشگاه از رتبه‌بندی جایگزین آخرین رتبه قبلی شود.
+    """
+    for year, by_name in ranks.items():
+        for name, value in by_name.items():
+            if name is None:
+                continue
+            encoded = json.dumps(value, ensure_ascii=False)
+            latest = connection.execute(
+                "SELECT value FROM rankings WHERE university = ? AND system = ? AND year = ? AND indicator = ? "
+                "ORDER BY scraped_at DESC LIMIT 1",
+                (name, system, year, indicator)
+            ).fetchone()
+            if latest is not None and latest[0] == encoded:
+                continue
+            connection.execute(
+                "INSERT OR REPLACE INTO rankings (university, system, year, indicator, value, scraped_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (name, system, year, indicator, encoded, scraped_at)
+            )
+
+def unfinished_run():
+    """شناسه آخرین اجرای ناتمام یا None"""
+    with _lock:
+        row = connect().execute(
+            "SELECT run_id FROM runs WHERE finished_at IS NULL ORDER BY started_at DESC LIMIT 1"
+        ).fetchone()
+    return row[0] if row else None
+
+def start_run(run_id=None):
+    """شروع اجرای تازه یا ادامه اجرای run_id؛ وظایف تکمیل‌شده از این پس برای همین اجرا ثبت می‌شوند"""
+    global _run_id
+    if run_id is not None:
+        _run_id = run_id
+        logging.info(f"ادامه اجرای ناتمام {run_id}")
+        return _run_id
+    connection = connect()
+    with _lock, connection:
+        _run_id = f"{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}"
+        connection.execute("INSERT INTO runs (run_id, started_at) VALUES (?, ?)", (_run_id, time.time()))
+    return _run_id
+
+def finish_run():
+    """ثبت پایان اجرای جاری (اجرای پایان‌یافته دیگر با --resume ادامه داده نمی‌شود)"""
+    global _run_id
+    if _run_id is None:
+        return
+    connection = connect()
+    with _lock, connection:
+        connection.execute("UPDATE runs SET finished_at = ? WHERE run_id = ?", (time.time(), _run_id))
+    _run_id = None
+
+def completed_tasks(run_id):
+    """مجموعه (نظام، سال، دانشگاه)هایی که در یک اجرا تکمیل شده‌اند"""
+    with _lock:
+        rows = connect().execute("SELECT system, year, university FROM checkpoints WHERE run_id = ?", (run_id,)).fetchall()
+    return set(rows)
+
+def stage_indicators(year, values):
+    """نگه‌داشتن شاخص‌های {شاخص: {مؤسسه: مقدار}} یک سال در thread جاری تا همراه نتیجه وظیفه به پردازش اصلی برسند"""
+    staged = getattr(_local, "indicators", None) or {}
+    for indicator, by_name in values.items():
+        staged.setdefault(indicator, {}).setdefault(year, {}).update(by_name)
+    _local.indicators = staged
+
+def take_indicators():
+    """خواندن و پاک کردن شاخص‌های نگه‌داشته‌شده thread جاری؛ خروجی {شاخص: {سال: {مؤسسه: مقدار}}}"""
+    staged = getattr(_local, "indicators", None) or {}
+    _local.indicators = None
+    return staged
+
+def record_task(system, ranks, completed_years=(), universities=(), indicators=None):
+    """ثبت رتبه‌ها و شاخص‌های اضافه یک وظیفه و نقطه بازیابی سال‌های تکمیل‌شده آن در یک تراکنش"""
+    connection = connect()
+    now = time.time()
+    with _lock, connection:
+        insert_ranks(connection, system, ranks, now)
+        for indicator, values in (indicators or {}).items():
+            insert_ranks(connection, system, values, now, indicator)
+        if _run_id is not None:
+            connection.executemany(
+                "INSERT OR REPLACE INTO checkpoints (run_id, system, year, university, completed_at) VALUES (?, ?, ?, ?, ?)",
+                [(_run_id, system, year, name, now) for year in completed_years for name in universities]
+            )
+
+def load_rankings(universities=None, indicator=RANK_INDICATOR):
+    """آخرین رتبه‌ها به صورت {دانشگاه: {نظام: {سال: رتبه}}} با یک پرس‌وجو"""
+    wanted = set(universities) if universities is not None else None
+    rankings = {}
+    with _lock:
+        rows = connect().execute(f"SELECT * FROM ({LATEST_QUERY}) WHERE indicator = ?", (indicator,)).fetchall()
+    for name, system, year, _, value in rows:
+        if wanted is None or name in wanted:
+            rankings.setdefault(name, {}).setdefault(system, {})[year] = json.loads(value)
+    return rankings
+
+def system_rankings(university, system):
+    """آخرین رتبه‌های یک دانشگاه در یک نظام به صورت {سال: رتبه}"""
+    return load_rankings([university]).get(university, {}).get(system, {})
+
+def write_json(path, data):
+    """نوشتن خروجی JSON با جایگزینی اتمی (فایل قبلی تا پایان نوشتن دست‌نخورده می‌ماند)"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_file = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_file, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_file, path)
@@ -1,18 +1,11 @@
 import logging
+import re
 import time
 import json
 import os
-from multiprocessing import Pool
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from webdriver_manager.chrome import ChromeDriverManager
-from selenium.webdriver.common.by import By
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from bs4 import BeautifulSoup
-import random
 from dotenv import load_dotenv
+from modules import driver_pool, page_cache, parsing, extraction, metrics, resource_policy, readiness, retry, rate_limit, storage, events, http_client, year_discovery
+from modules.matcher import assign_ranks, build_index, lookup_rows
 
 # بارگذاری متغیرهای محیطی
 load_dotenv()
@@ -26,140 +19,275 @@ logging.basicConfig(
 )
 
 UNIVERSITY_NAME = "Ferdowsi University of Mashhad"
-MAX_RETRIES = 3
-JSON_FILE = "data/university_rankings.json"
+HOST = "www.timeshighereducation.com"
+# نشانی پایه سایت (THE_BASE_URL برای اجرا روی سرور نمونه محلی)
+BASE_URL = os.getenv('THE_BASE_URL') or f"https://{HOST}"
+SYSTEM = "times"
+# ظرف جدول رتبه‌بندی در صفحه
+CONTAINER = {"tag": "table", "id": "datatable-1"}
+# ردیف‌هایی که آماده بودن صفحه با پایدار شدن تعداد آن‌ها سنجیده می‌شود
+ROW_SELECTOR = "#datatable-1 tr"
+# جدول از یک فایل JSON با همه مؤسسات سال پر می‌شود که آدرس آن در HTML صفحه آمده است؛ بدون مرورگر قابل دریافت است
+HTTP_FETCHABLE = True
+DATA_URL_PATTERN = re.compile(r'(?:https?://www\.timeshighereducation\.com)?(/sites/default/files/the_data_rankings/[^"\'\s]+?\.json)')
+# وضعیت cache داده کامل سال (مستقل از دانشگاه‌های درخواستی)
+DATASET_STATE = "dataset"
+# ردیف‌ها و نمایه داده کامل هر سال (به تفکیک منبع واقعی یا فایل نمونه) در حافظه این پردازش
+_datasets = {}
+# استخراج‌کننده درون مرورگر: فقط (رتبه، نام، ستون سوم) ردیف‌های جدول برگردانده می‌شود
+JS_EXTRACTOR = """
+const rows = [];
+document.querySelectorAll('#datatable-1 tr').forEach(tr => {
+    const cells = tr.querySelectorAll(':scope > td');
+    if (cells.length >= 2 && cells[0].classList.contains('rank') && cells[0].textContent.trim()) {
+        rows.push([cells[0].textContent.trim(), cells[1].textContent.replace(/\\s+/g, ' ').trim(), '']);
+    }
+});
+return rows;
+"""
 
-def load_previous_rankings():
-    """خواندن رتبه‌های قبلی از فایل JSON"""
-    if os.path.exists(JSON_FILE):
+def load_previous_rankings(university_name):
+    """خواندن آخرین رتبه‌های ذخیره‌شده یک دانشگاه در این نظام از جدول رتبه‌ها"""
+    try:
+        return storage.system_rankings(university_name, SYSTEM)
+    except Exception as e:
+        logging.error(f"خطا در خواندن جدول رتبه‌ها: {str(e)}")
+        return {}
+
+# فهرست سال‌ها در صورت ناموفق بودن کشف سال‌های منتشرشده
+DEFAULT_YEARS = [str(year) for year in range(2013, 2025)]
+INDEX_URL = f"{BASE_URL}/world-university-rankings/latest/world-ranking"
+
+def discover_years():
+    """سال‌های منتشرشده از پیوندهای نسخه‌ها در صفحه آخرین رتبه‌بندی جهانی"""
+    html = http_client.get_text(INDEX_URL)
+    return year_discovery.link_years(html, r'world-university-rankings/(\d{4})/world-ranking'), {}
+
+def get_years():
+    """فهرست سال‌هایی که باید استخراج شوند (کشف‌شده از سایت با cache دارای TTL)"""
+    return year_discovery.discover(SYSTEM, discover_years, DEFAULT_YEARS)[0]
+
+def page_url(year):
+    """آدرس جدول THE یک سال با همه دانشگاه‌های ایران در یک صفحه (length/-1)"""
+    return f"{BASE_URL}/world-university-rankings/{year}/world-ranking#!/length/-1/locations/IRN/sort_by/rank/sort_order/asc/cols/scores"
+
+def fetch_page(driver, year):
+    """بارگذاری صفحه یک سال در مرورگر؛ خروجی HTML صفحه یا ردیف‌های JSON است"""
+    with rate_limit.request(HOST):
+        driver.get(page_url(year))
+    readiness.wait_for_rows(driver, SYSTEM, "load", ROW_SELECTOR)
+    return extraction.capture(driver, JS_EXTRACTOR)
+
+def find_data_url(html):
+    """آدرس فایل JSON جدول که در HTML صفحه رتبه‌بندی آمده است"""
+    found = DATA_URL_PATTERN.search(html.replace('\\/', '/'))
+    return f"{BASE_URL}{found.group(1)}" if found else None
+
+def data_url(year):
+    """آدرس فایل JSON جدول یک سال"""
+    return find_data_url(http_client.get_text(page_url(year).split('#')[0]))
+
+def json_rows(data):
+    """ردیف‌های (رتبه، نام، کشور) همه مؤسسات از فایل JSON جدول"""
+    return [
+        (str(item.get("rank", "")).strip(), str(item.get("name", "")).strip(), item.get("location", ""))
+        for item in data.get("data", [])
+        if item.get("rank") and item.get("name")
+    ]
+
+def fixture_file(year):
+    """فایل نمونه JSON برای اجرای آفلاین (THE_FIXTURE در .env)؛ {year} در مسیر با سال جایگزین می‌شود و بدون آن همه سال‌ها یک داده دارند"""
+    path = os.getenv('THE_FIXTURE')
+    return path.replace("{year}", str(year)) if path else None
+
+def http_key(year):
+    """آدرس و وضعیت cache داده کامل یک سال (داده هر فایل نمونه جدا از داده واقعی ذخیره می‌شود)"""
+    return page_url(year), f"{DATASET_STATE};fixture={fixture_file(year)}" if fixture_file(year) else DATASET_STATE
+
+def read_fixture(year):
+    """متن فایل نمونه JSON یک سال"""
+    with open(fixture_file(year), 'r', encoding='utf-8') as f:
+        return f.read()
+
+def fetch_http(year):
+    """دریافت داده جدول یک سال با HTTP بدون مرورگر؛ خروجی ردیف‌های JSON یا None (برای بازگشت به مرورگر) است"""
+    start_time = time.time()
+    if fixture_file(year):
+        return parse_http(read_fixture(year), year)
+    try:
+        url = data_url(year)
+        if url is None:
+            logging.warning(f"آدرس داده JSON سال {year} در صفحه یافت نشد و از مرورگر استفاده می‌شود")
+            return None
+        response = http_client.get(url, headers={"Accept": "application/json"})
+    except Exception as e:
+        logging.warning(f"دریافت HTTP سال {year} ناموفق بود و از مرورگر استفاده می‌شود: {str(e)}")
+        return None
+    metrics.record_http_fetch(SYSTEM, year, time.time() - start_time, len(response.content))
+    return parse_http(response.text, year)
+
+def parse_http(raw, year):
+    """ردیف‌های JSON از داده جدول دریافت‌شده با HTTP؛ اگر ردیفی یافت نشود None (برای بازگشت به مرورگر) است"""
+    try:
+        rows = json_rows(json.loads(raw))
+    except ValueError as e:
+        logging.warning(f"داده JSON سال {year} معتبر نیست و از مرورگر استفاده می‌شود: {str(e)}")
+        return None
+    if not rows:
+        logging.warning(f"ردیفی در داده JSON سال {year} یافت نشد و از مرورگر استفاده می‌شود")
+        return None
+    return extraction.dump_rows(rows)
+
+async def fetch_http_async(client, year):
+    """دریافت ناهمگام داده JSON جدول یک سال برای موتور asyncio؛ اگر آدرس داده یافت نشود None است"""
+    if fixture_file(year):
+        return read_fixture(year)
+    page = await http_client.get_async(client, page_url(year).split('#')[0])
+    url = find_data_url(page.text)
+    if url is None:
+        return None
+    response = await http_client.get_async(client, url, headers={"Accept": "application/json"})
+    return response.text
+
+def dataset(year, page):
+    """ردیف‌ها و نمایه نام‌های داده کامل یک سال (یک بار در هر پردازش ساخته می‌شود)
+
+    کلید cache همان کلید http_key (آدرس سال و منبع واقعی یا فایل نمونه) است تا داده منابع مختلف جای هم برنگردد.
+    """
+    key = http_key(year)
+    if key not in _datasets:
+        rows = extraction.load_rows(page, parse_rows, year)
+        _datasets[key] = (rows, build_index(rows))
+    return _datasets[key]
+
+def dataset_ranks(universities, year):
+    """رتبه چند دانشگاه از داده کامل سال (cache یا HTTP)؛ در صورت نبود داده None (برای بازگشت به مرورگر)"""
+    url, state = http_key(year)
+    page = page_cache.get(SYSTEM, year, url, state)
+    if page is None and not page_cache.from_cache_only():
+        page = fetch_http(year)
+        if page is not None:
+            page_cache.put(SYSTEM, year, url, page, state)
+    if page is None:
+        return None
+    rows, index = dataset(year, page)
+    events.emit("parsed", system=SYSTEM, year=year, rows=len(rows))
+    ranks = {}
+    for name, row in lookup_rows(index, rows, universities).items():
+        ranks[name] = row[0] if row else None
+        if row:
+            logging.info(f"رتبه {name} برای سال {year} از داده کامل THE: {row[0]} (ردیف: {row[1]})")
+        else:
+            logging.warning(f"دانشگاه {name} در داده کامل THE سال {year} یافت نشد")
+    events.emit("matched", system=SYSTEM, year=year, ranks=ranks)
+    return ranks
+
+def parse_rows(html, year):
+    """ردیف‌های (رتبه، نام، کشور) جدول از HTML صفحه"""
+    rows = parsing.find_rows(html, CONTAINER)
+    if not rows:
+        logging.warning(f"جدول با id 'datatable-1' برای سال {year} یافت نشد")
+        return []
+
+    logging.debug(f"تعداد ردیف‌ها در جدول سال {year}: {len(rows)}")
+    candidates = []
+    for row, cells in rows:
         try:
-            with open(JSON_FILE, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-                return data.get("rankings", {}).get("times", {})
+            if len(cells) >= 2 and parsing.has_class(cells[0], 'rank') and parsing.text(cells[0]):
+                candidates.append((parsing.text(cells[0]), parsing.text(cells[1]), ""))
         except Exception as e:
-            logging.error(f"خطا در خواندن فایل JSON: {str(e)}")
-            return {}
-    return {}
-
-def setup_driver():
-    """تنظیم WebDriver با سرکوب کامل لاگ‌ها"""
-    chrome_options = Options()
-    chrome_options.add_argument("--headless=new")  # استفاده از headless جدید
-    chrome_options.add_argument("--disable-gpu")
-    chrome_options.add_argument("--disable-extensions")
-    chrome_options.add_argument("--disable-notifications")
-    chrome_options.add_argument("--no-sandbox")
-    chrome_options.add_argument("--disable-dev-shm-usage")
-    chrome_options.add_argument("--ignore-certificate-errors")
-    chrome_options.add_argument("user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) Chrome/91.0.4472.124")
-    chrome_options.add_argument("--log-level=3")
-    chrome_options.add_argument("--mute-audio")
-    chrome_options.add_argument("--disable-features=VoiceTranscription,MediaSession,MediaSessionService")
-    chrome_options.add_argument("--disable-logging")  # غیرفعال کردن لاگ‌های اضافی
-    chrome_options.add_argument("--disable-background-timer-throttling")
-    chrome_options.add_argument("--disable-backgrounding-occluded-windows")
-    chrome_options.add_argument("--disable-renderer-backgrounding")
-    chrome_options.add_experimental_option('excludeSwitches', ['enable-logging', 'enable-automation'])
-    chrome_options.add_experimental_option('prefs', {
-        'loggingPrefs': {'browser': 'OFF', 'driver': 'OFF', 'server': 'OFF'},  # غیرفعال کردن لاگ‌های مرورگر
-        'profile.default_content_setting_values.media_stream': 2,  # غیرفعال کردن دسترسی به رسانه
-    })
-    try:
-        driver_path = ChromeDriverManager(log_level=0).install()  # log_level=0 برای سرکوب لاگ‌های webdriver-manager
-        service = Service(driver_path, log_output=os.devnull)
-        return webdriver.Chrome(service=service, options=chrome_options)
-    except PermissionError as e:
-        logging.error(f"خطای دسترسی در نصب درایور کروم: {str(e)}")
-        raise
+            logging.error(f"خطا در پردازش ردیف برای سال {year}: {str(e)}")
+            continue
+    return candidates
+
+def parse_page(page, universities, year):
+    """استخراج رتبه دانشگاه‌ها از صفحه یک سال (HTML یا خروجی استخراج‌کننده جاوااسکریپت) با یک اسکن خطی"""
+    rows = extraction.load_rows(page, parse_rows, year)
+    events.emit("parsed", system=SYSTEM, year=year, rows=len(rows))
+    ranks = {}
+    for name, row in assign_ranks(rows, universities).items():
+        ranks[name] = row[0] if row else None
+        if row:
+            logging.info(f"رتبه {name} برای سال {year}: {row[0]} (ردیف: {row[1]})")
+        else:
+            logging.warning(f"دانشگاه {name} در سال {year} یافت نشد")
+    events.emit("matched", system=SYSTEM, year=year, ranks=ranks)
+    return ranks
 
 def scrape_year(args):
     """اسکریپینگ رتبه برای یک سال خاص"""
     university_name, year = args
-    logging.info(f"استخراج رتبه برای سال {year} (Times Higher Education)")
-    driver = None
-    result = {year: None}
-    
-    for attempt in range(MAX_RETRIES):
-        try:
-            driver = setup_driver()
-            url = f"https://www.timeshighereducation.com/world-university-rankings/{year}/world-ranking#!/length/25/locations/IRN/name/ferdowsi/sort_by/rank/sort_order/asc/cols/scores"
-            driver.get(url)
-            WebDriverWait(driver, 10).until(
-                EC.presence_of_element_located((By.ID, "datatable-1"))
-            )
-
-            # استخراج HTML
-            soup = BeautifulSoup(driver.page_source, 'lxml')
-            table = soup.find('table', id='datatable-1')
-            if not table:
-                logging.warning(f"جدول با id 'datatable-1' برای سال {year} یافت نشد")
-                return result
-
-            rows = table.find_all('tr')
-            logging.debug(f"تعداد ردیف‌ها در جدول سال {year}: {len(rows)}")
-            found = False
-            for row in rows:
-                try:
-                    cells = row.find_all('td')
-                    if len(cells) >= 2:
-                        rank_cell = cells[0].get('class', [])
-                        university_cell = cells[1].text.lower().strip()
-                        if 'rank' in rank_cell:
-                            logging.debug(f"نام دانشگاه در ردیف: {university_cell}")
-                            keywords = [
-                                university_name.lower(), "ferdowsi univ", "ferdowsi university",
-                                "ferdowsi", "mashhad", "mashhad university", "um.ac.ir",
-                                "ferdosi", "ferdousi", "ferdowsi mashhad"
-                            ]
-                            if any(keyword in university_cell for keyword in keywords):
-                                rank = cells[0].text.strip()
-                                if rank:
-                                    result[year] = rank
-                                    logging.info(f"رتبه برای سال {year}: {rank}")
-                                    found = True
-                                    break
-                except Exception as e:
-                    logging.error(f"خطا در پردازش ردیف برای سال {year}: {str(e)}")
-                    continue
-
-            if not found:
-                logging.warning(f"دانشگاه {university_name} در سال {year} یافت نشد")
-            break
+    return {year: scrape_year_batch(([university_name], year))[university_name]}
 
-        except Exception as e:
-            logging.error(f"خطا در اسکریپینگ برای سال {year}، تلاش {attempt + 1}: {str(e)}")
-            if attempt < MAX_RETRIES - 1:
-                time.sleep(random.uniform(3, 5))
-                continue
-            else:
-                logging.error(f"تلاش‌های مجدد برای سال {year} به پایان رسید")
-                break
+def scrape_year_batch(args):
+    """اسکریپینگ رتبه چند دانشگاه برای یک سال خاص با یک بار بارگذاری صفحه"""
+    universities, year = args
+    logging.info(f"استخراج رتبه {len(universities)} دانشگاه برای سال {year} (Times Higher Education)")
+    result = {name: None for name in universities}
+
+    # داده کامل سال از cache یا HTTP؛ مرورگر فقط در صورت نبود آن اجرا می‌شود
+    if HTTP_FETCHABLE and (http_client.http_enabled() or fixture_file(year)):
+        ranks = dataset_ranks(universities, year)
+        if ranks is not None:
+            return ranks
+
+    # در صورت وجود صفحه معتبر در cache، مرورگری اجرا نمی‌شود
+    url = page_url(year)
+    state = extraction.page_state()
+    html = page_cache.get(SYSTEM, year, url, state)
+    if html is None and page_cache.from_cache_only():
+        page_cache.report_miss(SYSTEM, year)
+        return result
+
+    def attempt():
+        if html is not None:
+            return parse_page(html, universities, year)
+        driver = driver_pool.acquire_driver(SYSTEM)
+        try:
+            fetch_start = time.time()
+            page = fetch_page(driver, year)
+            metrics.record_page_load(driver, SYSTEM, year, time.time() - fetch_start, resource_policy.blocking_enabled())
         finally:
-            if driver:
-                try:
-                    driver.quit()
-                except Exception as e:
-                    logging.error(f"خطا در بستن WebDriver برای سال {year}: {str(e)}")
+            driver_pool.release_driver(driver)
+        if page is None:
+            # صفحه‌ای بارگذاری نشد؛ رتبه‌ها نامعلوم‌اند و نباید به عنوان null ذخیره شوند
+            raise TimeoutError(f"صفحه سال {year} بارگذاری نشد")
+        # صفحه فقط پس از پردازش موفق جدول در cache ذخیره می‌شود
+        ranks = parse_page(page, universities, year)
+        page_cache.put(SYSTEM, year, url, page, state)
+        return ranks
 
-    return result
+    # تکرار فقط برای خطاهای گذرا و پایان مهلت رندر؛ خطای دائمی بلافاصله گزارش می‌شود
+    try:
+        return retry.call(attempt, SYSTEM, year)
+    except Exception:
+        logging.error(f"تلاش‌های مجدد برای سال {year} به پایان رسید")
+        return result
 
-def get_rank(university_name):
-    """تابع اصلی برای استخراج رتبه‌ها با ادغام نتایج قبلی"""
-    previous_ranks = load_previous_rankings()
-    logging.info(f"رتبه‌های قبلی لود شدند: {previous_ranks}")
+def iter_ranks(universities, pool=None):
+    """مولد (سال، {دانشگاه: رتبه}) هر سال به محض پایان استخراج آن (بدون انتظار برای کندترین سال)"""
+    yield from driver_pool.stream_years(scrape_year_batch, [(universities, year) for year in get_years()], pool)
 
-    years = [str(year) for year in range(2013, 2025)]
-    ranks = {year: previous_ranks.get(year, None) for year in years}
+def get_ranks(universities, pool=None):
+    """استخراج رتبه چند دانشگاه؛ هر صفحه فقط یک بار بارگذاری و پردازش می‌شود"""
+    years = get_years()
+    ranks = {name: {year: None for year in years} for name in universities}
 
     start_time = time.time()
-    with Pool(processes=int(os.getenv('NUM_PROCESSES', 3))) as pool:
-        args = [(university_name, year) for year in years]
-        results = pool.map(scrape_year, args)
-    
-    for result in results:
-        for year, rank in result.items():
-            if rank is not None:
-                ranks[year] = rank
-    
-    logging.info(f"استخراج رتبه‌های Times Higher Education برای {university_name} تکمیل شد. زمان اجرا: {time.time() - start_time:.2f} ثانیه")
-    return ranks
\ No newline at end of file
+    for year, result in iter_ranks(universities, pool):
+        for name, rank in result.items():
+            ranks[name][year] = rank
+
+    logging.info(f"استخراج رتبه‌های Times Higher Education برای {len(universities)} دانشگاه تکمیل شد. زمان اجرا: {time.time() - start_time:.2f} ثانیه")
+    return ranks
+
+def get_rank(university_name, pool=None):
+    """تابع اصلی برای استخراج رتبه‌ها با ادغام نتایج قبلی (در صورت ارسال pool، مرورگرهای workerهای آن بازاستفاده می‌شوند)"""
+    previous_ranks = load_previous_rankings(university_name)
+    logging.info(f"رتبه‌های قبلی لود شدند: {previous_ranks}")
+
+    ranks = get_ranks([university_name], pool)[university_name]
+    for year, rank in ranks.items():
+        if rank is None:
+            ranks[year] = previous_ranks.get(year, None)
+    return ranks
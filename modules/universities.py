@@ -0,0 +1,35 @@
+import json
+import logging
+import os
+
+UNIVERSITIES_FILE = "data/universities.json"
+
+_universities = None
+
+def load_universities():
+    """خواندن فهرست دانشگاه‌های پیگیری‌شده و نام‌های جایگزین آن‌ها"""
+    global _universities
+    if _universities is None:
+        _universities = []
+        if os.path.exists(UNIVERSITIES_FILE):
+            try:
+                with open(UNIVERSITIES_FILE, 'r', encoding='utf-8') as f:
+                    _universities = json.load(f).get("universities", [])
+            except Exception as e:
+                logging.error(f"خطا در خواندن فایل دانشگاه‌ها: {str(e)}")
+    return _universities
+
+def get_names():
+    """نام همه دانشگاه‌های پیگیری‌شده"""
+    return [university["name"] for university in load_universities()]
+
+def get_university(name):
+    """تنظیمات یک دانشگاه؛ برای نام‌های ناشناخته فقط خود نام به کار می‌رود"""
+    for university in load_universities():
+        if university["name"] == name:
+            return university
+    return {"name": name, "aliases": [], "search_terms": {}}
+
+def search_term(name, system):
+    """عبارت جستجوی یک دانشگاه در فرم جستجوی یک نظام"""
+    return get_university(name).get("search_terms", {}).get(system, name)
@@ -0,0 +1,98 @@
+import json
+import logging
+import os
+import re
+import time
+from dotenv import load_dotenv
+from modules import page_cache, http_client, rate_limit
+
+# بارگذاری متغیرهای محیطی
+load_dotenv()
+
+YEARS_FILE = "data/cache/years.json"
+# قفل خواندن-تغییر-نوشتن فایل سال‌ها بین پردازش‌ها (مثلاً workerهای مرورگر که گزینه‌های فرم ISC را ثبت می‌کنند)
+LOCK_FILE = f"{YEARS_FILE}.lock"
+YEARS_TTL_DAYS = float(os.getenv('YEARS_TTL_DAYS', 7))
+# ارقام فارسی و عربی در گزینه‌های فهرست سال‌ها
+DIGITS = str.maketrans("۰۱۲۳۴۵۶۷۸۹٠١٢٣٤٥٦٧٨٩", "01234567890123456789")
+SELECT_PATTERN = r'<select[^>]*(?:id|name)="{name}"[^>]*>(.*?)</select>'
+OPTION_PATTERN = re.compile(r'<option[^>]*value="([^"]*)"[^>]*>(.*?)</option>', re.S | re.I)
+# منابعی که کشف سالشان در همین پردازش شکست خورده است (برای جلوگیری از تلاش دوباره در هر فراخوانی)
+_failed = set()
+
+def load():
+    """خواندن سال‌های کشف‌شده همه منابع"""
+    if os.path.exists(YEARS_FILE):
+        try:
+            with open(YEARS_FILE, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logging.error(f"خطا در خواندن فایل سال‌ها: {str(e)}")
+    return {}
+
+def store(system, years, mapping=None):
+    """ذخیره سال‌های کشف‌شده یک منبع (و نگاشت سال به مقدار گزینه فرم، در صورت وجود)
+
+    خواندن، تغییر و نوشتن فایل زیر قفل فایل انجام می‌شود تا به‌روزرسانی پردازش‌های هم‌زمان از دست نرود.
+    """
+    os.makedirs(os.path.dirname(YEARS_FILE), exist_ok=True)
+    with open(LOCK_FILE, 'a') as lock:
+        rate_limit.lock_file(lock)
+        try:
+            data = load()
+            data[system] = {"years": years, "mapping": mapping or {}, "discovered_at": time.time()}
+            tmp_file = f"{YEARS_FILE}.{os.getpid()}.tmp"
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_file, YEARS_FILE)
+        finally:
+            rate_limit.unlock_file(lock)
+
+def cached(system):
+    """سال‌های ذخیره‌شده یک منبع در صورت تازه بودن (در حالت --from-cache بدون توجه به TTL)"""
+    entry = load().get(system)
+    if not entry or not entry.get("years"):
+        return None
+    if page_cache.from_cache_only() or time.time() - entry.get("discovered_at", 0) < YEARS_TTL_DAYS * 86400:
+        return entry
+    return None
+
+def discover(system, discover_years, default_years, default_mapping=None):
+    """سال‌های معتبر یک منبع: از cache، یا با یک بار کشف از صفحه منبع، یا در صورت شکست فهرست پیش‌فرض
+
+    discover_years باید (سال‌ها، نگاشت) برگرداند؛ خروجی این تابع هم (سال‌ها، نگاشت) است.
+    """
+    entry = cached(system)
+    if entry is not None:
+        return entry["years"], entry["mapping"] or default_mapping or {}
+    if system not in _failed and not page_cache.from_cache_only() and http_client.http_enabled():
+        try:
+            years, mapping = discover_years()
+            if years:
+                years = sorted(set(years))
+                store(system, years, mapping)
+                logging.info(f"سال‌های {system} کشف شدند: {years}")
+                return years, mapping or default_mapping or {}
+            logging.warning(f"هیچ سالی برای {system} کشف نشد؛ فهرست پیش‌فرض استفاده می‌شود")
+        except Exception as e:
+            logging.warning(f"کشف سال‌های {system} ناموفق بود؛ فهرست پیش‌فرض استفاده می‌شود: {str(e)}")
+        _failed.add(system)
+    return default_years, default_mapping or {}
+
+def valid_year(year):
+    """سال میلادی معقول برای یک نسخه رتبه‌بندی"""
+    return 2000 <= int(year) <= time.localtime().tm_year + 1
+
+def link_years(html, pattern):
+    """سال‌های موجود در پیوندهای یک صفحه (مثلاً /ranking/2024)"""
+    return sorted({year for year in re.findall(pattern, html) if valid_year(year)})
+
+def select_options(html, name):
+    """گزینه‌های (مقدار، متن) یک فهرست کشویی با id یا name مشخص"""
+    found = re.search(SELECT_PATTERN.format(name=re.escape(name)), html, re.S | re.I)
+    if not found:
+        return []
+    return [
+        (value.strip(), " ".join(re.sub(r"<[^>]+>", "", text).split()).translate(DIGITS))
+        for value, text in OPTION_PATTERN.findall(found.group(1))
+    ]
@@ -0,0 +1,36 @@
+import os
+import pytest
+from modules import matcher
+from modules.matcher import assign_ranks
+
+FERDOWSI = "Ferdowsi University of Mashhad"
+MUMS = "Mashhad University of Medical Sciences"
+ROWS = [
+    ("1", "Mashhad University of Medical Sciences", ""),
+    ("2", "Sadjad University of Technology, Mashhad", ""),
+    ("3", "Ferdowsi University of Mashhad", ""),
+]
+
+@pytest.fixture(autouse=True)
+def repo_dir(monkeypatch):
+    """اجرا از ریشه مخزن تا data/universities.json خوانده شود، با cache خالی الگوها"""
+    monkeypatch.chdir(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    monkeypatch.setattr(matcher, "_compiled", {})
+
+@pytest.mark.parametrize("universities", [[FERDOWSI, MUMS], [MUMS, FERDOWSI]])
+def test_result_does_not_depend_on_order(universities):
+    assigned = assign_ranks(ROWS, universities)
+    assert assigned[FERDOWSI] == ROWS[2]
+    assert assigned[MUMS] == ROWS[0]
+
+def test_other_mashhad_universities_are_not_ferdowsi():
+    assert assign_ranks(ROWS[:2], [FERDOWSI]) == {FERDOWSI: None}
+
+@pytest.mark.parametrize("universities", [[FERDOWSI, MUMS], [MUMS, FERDOWSI]])
+def test_overlapping_alias_does_not_hide_other_university(monkeypatch, universities):
+    # نام جایگزین کوتاه یک دانشگاه که بخشی از نام دانشگاه دیگر است
+    configs = {FERDOWSI: {"name": FERDOWSI, "aliases": ["mashhad university"], "exclude": ["medical sciences"]}}
+    monkeypatch.setattr("modules.matcher.get_university", lambda name: configs.get(name, {"name": name, "aliases": []}))
+    assigned = assign_ranks(ROWS, universities)
+    assert assigned[FERDOWSI] == ROWS[2]
+    assert assigned[MUMS] == ROWS[0]
@@ -0,0 +1,54 @@
+import pytest
+from modules import scheduler, storage, page_cache, leiden, leiden_bulk, retry
+
+FERDOWSI = "Ferdowsi University of Mashhad"
+YEAR = "2020"
+TABLE = """<html><body><table class="pagedtable ranking">
+<tr><td class="rank">1</td><td class="university"><span data-tooltip="Tehran">University of Tehran</span></td><td></td><td></td><td>0.2</td></tr>
+</table></body></html>"""
+
+@pytest.fixture(autouse=True)
+def store(tmp_path, monkeypatch):
+    """جدول رتبه‌ها و cache صفحات در پوشه موقت، بدون داده کامل Leiden و در حالت --from-cache"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(storage, "STORE_FILE", str(tmp_path / "rankings.sqlite"))
+    monkeypatch.setattr(storage, "_connection", None)
+    monkeypatch.setattr(storage, "_run_id", None)
+    monkeypatch.setattr(leiden_bulk, "_connection", None)
+    monkeypatch.setenv("LEIDEN_BULK_FILE", "")
+    monkeypatch.setenv("LEIDEN_BULK_URL", "")
+    monkeypatch.setenv("EXTRACT_MODE", "html")
+    monkeypatch.setenv("FROM_CACHE", "True")
+    monkeypatch.delenv("EVENTS", raising=False)
+    storage.record_task(leiden.SYSTEM, {YEAR: {FERDOWSI: 500}})
+    run_id = storage.start_run()
+    yield run_id
+    storage.connect().close()
+
+def cache_page(html):
+    page_cache.put(leiden.SYSTEM, YEAR, leiden.page_url(YEAR), html, leiden.PAGE_STATE)
+
+def run(run_id):
+    outcome = scheduler.run_task({"system": leiden.SYSTEM, "year": YEAR, "universities": [FERDOWSI]})
+    scheduler.record_outcome(outcome, {})
+    return outcome, storage.system_rankings(FERDOWSI, leiden.SYSTEM), storage.completed_tasks(run_id)
+
+def test_absent_from_parsed_table_stores_null(store):
+    cache_page(TABLE)
+    outcome, ranks, completed = run(store)
+    assert outcome["error"] is None
+    assert ranks == {YEAR: None}
+    assert completed == {(leiden.SYSTEM, YEAR, FERDOWSI)}
+
+def test_cache_miss_keeps_previous_rank(store):
+    outcome, ranks, completed = run(store)
+    assert outcome["category"] == retry.CACHE_MISS
+    assert ranks == {YEAR: 500}
+    assert completed == set()
+
+def test_missing_table_keeps_previous_rank(store):
+    cache_page("<html><body><p>no table</p></body></html>")
+    outcome, ranks, completed = run(store)
+    assert outcome["category"] == retry.PERMANENT
+    assert ranks == {YEAR: 500}
+    assert completed == set()